@@ -0,0 +1,38 @@
+import redis.asyncio as redis
+
+from config import settings
+
+
+# Callers wait up to redis_pool_timeout seconds for a free connection instead of failing once the cap is reached
+redis_pool = redis.BlockingConnectionPool(
+    host=settings.redis_host,
+    port=settings.redis_port,
+    password=settings.redis_password,
+    db=0,
+    max_connections=settings.redis_max_connections,
+    timeout=settings.redis_pool_timeout,
+)
+
+redis_client = redis.Redis(connection_pool=redis_pool)
+
+# The user cache subscriber holds its connection for the lifetime of the worker, so it is kept out of the capped pool
+redis_pubsub_pool = redis.ConnectionPool(
+    host=settings.redis_host,
+    port=settings.redis_port,
+    password=settings.redis_password,
+    db=0,
+)
+
+redis_pubsub_client = redis.Redis(connection_pool=redis_pubsub_pool)
+
+
+async def get_redis() -> redis.Redis:
+    """
+    The get_redis function is a dependency that returns the shared asyncio Redis client.
+    All clients use the same connection pool, so the rate limiter, the auth service and
+    the routes never open more than redis_max_connections connections per worker;
+    past that, they wait for a connection to be released.
+
+    :return: A redis client bound to the shared connection pool
+    """
+    return redis_client
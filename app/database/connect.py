@@ -1,21 +1,139 @@
-from sqlalchemy.orm import sessionmaker
+import time
+
+from fastapi import Request
+from sqlalchemy import exc, event
+from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from config import settings
 
 
-async_engine = create_async_engine(settings.db_url, future=True)
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    Connection pool that measures how long every checkout waits for a connection
+
+    The checked-out and overflow connections come from the pool itself; the wait is timed around the
+    checkout from the queue, so it grows as soon as requests start queueing for a connection.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.acquires = 0
+        self.timeouts = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            self.acquires += 1
+            self.wait_time += waited
+            self.max_wait = max(self.max_wait, waited)
+
+    def stats(self) -> dict:
+        """
+        The stats function returns the occupancy of the pool and the wait counters of the checkouts.
+
+        :param self: Represent the instance of the object itself
+        :return: A dictionary with the counters
+        """
+        return {
+            "size": self.size(),
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            "overflow": self.overflow(),
+            "acquires": self.acquires,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": self.wait_time / self.acquires * 1000 if self.acquires else 0.0,
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+
+def connect_args(read_only: bool = False) -> dict:
+    """
+    The connect_args function returns the asyncpg options of every new connection.
+
+    :param read_only: bool: Make every transaction of the connection read-only
+    :return: A dictionary of connection arguments
+    """
+    args = {}
+    server_settings = {}
+    if settings.db_statement_timeout:
+        server_settings["statement_timeout"] = str(settings.db_statement_timeout)
+    if read_only:
+        server_settings["default_transaction_read_only"] = "on"
+    if server_settings:
+        args["server_settings"] = server_settings
+    if settings.db_prepared_statement_cache_size is not None:
+        args["prepared_statement_cache_size"] = settings.db_prepared_statement_cache_size
+
+    return args
+
+
+def create_engine(url: str, read_only: bool = False):
+    """
+    The create_engine function creates an engine with the pool configured by the settings.
+
+    :param url: str: The database url
+    :param read_only: bool: Make every transaction of the engine read-only
+    :return: An async engine
+    """
+    return create_async_engine(
+        url,
+        future=True,
+        poolclass=InstrumentedPool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_pool_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        connect_args=connect_args(read_only),
+    )
+
+
+class PrimarySession(Session):
+    """
+    Session of the primary database
+
+    It notes in its info that it has committed, so the request that wrote can be routed back to the primary
+    for its next reads.
+    """
+
+
+@event.listens_for(PrimarySession, "after_commit")
+def mark_committed(session: Session) -> None:
+    session.info["committed"] = True
+
+
+async_engine = create_engine(settings.db_url)
+
+AsyncSessionLocal = sessionmaker(async_engine, autocommit=False, autoflush=False, class_=AsyncSession,  # noqa
+                                 sync_session_class=PrimarySession)
+
+# Without a replica, the reads go to the primary
+replica_engine = create_engine(settings.db_replica_url, read_only=True) if settings.db_replica_url else None
 
-AsyncSessionLocal = sessionmaker(async_engine, autocommit=False, autoflush=False, class_=AsyncSession)  # noqa
+AsyncReadSessionLocal = sessionmaker(replica_engine, autocommit=False, autoflush=False,  # noqa
+                                     class_=AsyncSession) if replica_engine is not None else None
 
 
 # Dependency
-async def get_db():
+async def get_db(request: Request):
     """
     The get_db function is a context manager that returns the database session.
     It also ensures that the connection to the database is closed after each request.
+    The session is kept on the request state, so the request can tell afterwards whether it wrote.
 
+    :param request: Request: The current request
     :return: A database session
     """
     async with AsyncSessionLocal() as session:
+        request.state.db = session
         yield session
@@ -12,9 +12,10 @@ class ImageComment(Base):
     __tablename__ = "image_comments"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    data: Mapped[str] = mapped_column(String(500), index=True)
-    user_id: Mapped[int] = mapped_column(ForeignKey(User.id, ondelete="CASCADE", onupdate="CASCADE"))
-    image_id: Mapped[int] = mapped_column(ForeignKey("images.id", ondelete="CASCADE", onupdate="CASCADE"))
+    data: Mapped[str] = mapped_column(String(500))
+    user_id: Mapped[int] = mapped_column(ForeignKey(User.id, ondelete="CASCADE", onupdate="CASCADE"), index=True)
+    image_id: Mapped[int] = mapped_column(ForeignKey("images.id", ondelete="CASCADE", onupdate="CASCADE"),
+                                          index=True)
     created_at: Mapped[datetime] = mapped_column(default=func.now())
     updated_at: Mapped[Optional[datetime]] = mapped_column(onupdate=func.now())
 
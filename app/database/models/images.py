@@ -8,8 +8,12 @@ from sqlalchemy import (
     Integer,
     Table,
     Column,
+    Index,
+    Computed,
+    Float,
 )
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import Mapped, mapped_column, relationship, query_expression
 
 from .tags import Tag
 from .base import Base
@@ -25,6 +29,8 @@ image_m2m_tag = Table(
     Column("id", Integer, primary_key=True),
     Column("image_id", Integer, ForeignKey("images.id", ondelete="CASCADE")),
     Column("tag_id", Integer, ForeignKey("tags.id", ondelete="CASCADE")),
+    Index("ix_image_m2m_tag_tag_id_image_id", "tag_id", "image_id"),
+    Index("ix_image_m2m_tag_image_id", "image_id"),
 )
 
 
@@ -32,14 +38,42 @@ class Image(Base):
     __tablename__ = 'images'
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    public_id: Mapped[str] = mapped_column(String(255))
+    # Shared by the images uploaded with the same content, the remote deletes worker keeps the file while referenced
+    public_id: Mapped[str] = mapped_column(String(255), index=True)
     description: Mapped[str] = mapped_column(String(1200))
+    description_tsv: Mapped[str] = mapped_column(
+        TSVECTOR, Computed("to_tsvector('simple', description)", persisted=True), deferred=True
+    )
+    # Read from the header of the uploaded file
+    width: Mapped[Optional[int]] = mapped_column()
+    height: Mapped[Optional[int]] = mapped_column()
+    format: Mapped[Optional[str]] = mapped_column(String(10))
+    # Hex SHA-256 of the file, a new upload of the same bytes reuses the public_id instead of uploading again
+    content_hash: Mapped[Optional[str]] = mapped_column(String(64), index=True)
     created_at: Mapped[datetime] = mapped_column(default=func.now())
     updated_at: Mapped[Optional[datetime]] = mapped_column(onupdate=func.now())
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
+    # Kept up to date by the image_ratings repository in the transaction that changes a rating
+    rating_count: Mapped[int] = mapped_column(default=0, server_default='0')
+    rating_sum: Mapped[int] = mapped_column(default=0, server_default='0')
+    rating_avg: Mapped[float] = mapped_column(
+        Float, Computed("CASE WHEN rating_count > 0 THEN rating_sum::float8 / rating_count ELSE 0 END",
+                        persisted=True)
+    )
 
     user: Mapped[User] = relationship(backref="images")
-    tags: Mapped[Tag] = relationship("Tag", secondary=image_m2m_tag, backref="images", lazy='joined')
+    # Batched by default; single image fetches ask for a join instead
+    tags: Mapped[Tag] = relationship("Tag", secondary=image_m2m_tag, backref="images", lazy='selectin')
     comments: Mapped[ImageComment] = relationship(backref="image", cascade="all, delete-orphan")
     formats: Mapped[ImageFormat] = relationship(backref="image", cascade="all, delete-orphan")
     ratings: Mapped[ImageRating] = relationship(backref="image", cascade="all, delete-orphan")
+
+    # Set only by description searches
+    search_rank: Mapped[Optional[float]] = query_expression()
+
+    __table_args__ = (
+        Index('ix_images_created_at_id', 'created_at', 'id'),
+        Index('ix_images_user_id_created_at_id', 'user_id', 'created_at', 'id'),
+        Index('ix_images_description_tsv', 'description_tsv', postgresql_using='gin'),
+        Index('ix_images_rating_avg_created_at_id', 'rating_avg', 'created_at', 'id'),
+    )
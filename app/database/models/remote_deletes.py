@@ -0,0 +1,17 @@
+from datetime import datetime
+
+from sqlalchemy import String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base
+
+
+class PendingRemoteDelete(Base):
+    """Outbox of the Cloudinary files left behind by committed deletes, emptied by the remote deletes worker"""
+    __tablename__ = "pending_remote_deletes"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    public_id: Mapped[str] = mapped_column(String(255), unique=True)
+    attempts: Mapped[int] = mapped_column(default=0, server_default='0')
+    next_attempt_at: Mapped[datetime] = mapped_column(default=func.now(), server_default=func.now(), index=True)
+    created_at: Mapped[datetime] = mapped_column(default=func.now())
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import String, func
+from sqlalchemy import String, func, Index
 from sqlalchemy.orm import Mapped, mapped_column
 
 from .base import Base
@@ -14,3 +14,8 @@ class Tag(Base):
     name: Mapped[str] = mapped_column(String(50), unique=True)
     created_at: Mapped[datetime] = mapped_column(default=func.now())
     updated_at: Mapped[Optional[datetime]] = mapped_column(onupdate=func.now())
+
+    __table_args__ = (
+        # One tag per name whatever its case, the conflict target of the tag upserts
+        Index('ix_tags_name_lower', func.lower(name), unique=True),
+    )
@@ -2,13 +2,17 @@ from enum import StrEnum, auto
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import String, func, event
+from sqlalchemy import String, func, event, select
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.dialects.postgresql import ENUM
 
 from .base import Base
 
 
+# Key of the advisory lock that serializes the signups while the users table is empty
+ADMIN_BOOTSTRAP_LOCK = 0x7573657273
+
+
 class UserRole(StrEnum):
     admin = auto()
     moderator = auto()
@@ -29,6 +33,10 @@ class User(Base):
     refresh_token: Mapped[Optional[str]] = mapped_column(String(255))
     email_verified: Mapped[bool] = mapped_column(default=False)
     is_active: Mapped[bool] = mapped_column(default=True)
+    # Kept up to date by the repository and reconciled by the user counters repair job
+    images_count: Mapped[int] = mapped_column(default=0, server_default='0')
+    comments_count: Mapped[int] = mapped_column(default=0, server_default='0')
+    ratings_count: Mapped[int] = mapped_column(default=0, server_default='0')
     created_at: Mapped[datetime] = mapped_column(default=func.now())
     updated_at: Mapped[Optional[datetime]] = mapped_column(onupdate=func.now())
 
@@ -36,21 +44,27 @@ class User(Base):
     def __set_user_role(mapper, connection, target):
         """
         The __set_user_role function is a SQLAlchemy event listener that will be called
-        when the User model is about to be inserted into the database. The function checks
-        if there are any users in the database, and if not, it sets the role of this user to admin.
-        If there are already users in the database, then this user's role will be set to user.
+        when the User model is about to be inserted into the database. The first user becomes the admin,
+        every other user gets the user role.
+        The check is an EXISTS, which stops at the first row, so it costs the same at any number of users.
+        While the table is still empty, an advisory lock serializes the signups and the check is repeated
+        under it, so two concurrent first signups can't both become admins.
 
         :param mapper: Access the mapper object for the class
         :param connection: Access the database
         :param target: Access the user object that is being saved
         :return: The target object
         """
-        count = connection.execute(func.count(User.id)).scalar()
+        has_users = select(select(User.id).exists())
+
+        if not connection.scalar(has_users):
+            connection.execute(select(func.pg_advisory_xact_lock(ADMIN_BOOTSTRAP_LOCK)))
+
+            if not connection.scalar(has_users):
+                target.role = UserRole.admin
+                return
 
-        if not count:
-            target.role = UserRole.admin
-        else:
-            target.role = UserRole.user
+        target.role = UserRole.user
 
     @classmethod
     def __declare_last__(cls):
@@ -4,6 +4,7 @@ from sqlalchemy import update, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database.models.image_comments import ImageComment
+from app.repository.users import update_user_counters
 
 
 async def create_comment(user_id: int, image_id: int, data: str, db: AsyncSession) -> ImageComment:
@@ -22,6 +23,7 @@ async def create_comment(user_id: int, image_id: int, data: str, db: AsyncSessio
             data=data
         )
     db.add(comment)
+    await update_user_counters(user_id, db, comments=1)
 
     await db.commit()
     await db.refresh(comment)
@@ -99,6 +101,7 @@ async def remove_comment(comment_id: int, db: AsyncSession) -> Optional[ImageCom
     comment = await get_comment_by_id(comment_id, db)
 
     if comment:
+        await update_user_counters(comment.user_id, db, comments=-1)
         await db.delete(comment)
         await db.commit()
 
@@ -1,9 +1,30 @@
 from typing import Optional
 
-from sqlalchemy import select, and_
+from sqlalchemy import select, and_, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.database.models import Image
 from app.database.models.image_raiting import ImageRating
+from app.repository.users import update_user_counters
+
+
+async def update_image_aggregates(image_id: int, count_delta: int, sum_delta: int, db: AsyncSession) -> None:
+    """
+    The update_image_aggregates function shifts the rating count and sum stored on an image.
+    The change is made in SQL, relative to the current values, so concurrent ratings don't overwrite each other.
+    It doesn't commit: it belongs to the transaction that changes the rating.
+
+    :param image_id: int: Specify the image whose rating changed
+    :param count_delta: int: Change of the number of ratings
+    :param sum_delta: int: Change of the sum of the ratings
+    :param db: AsyncSession: Pass the database session to the function
+    :return: None
+    """
+    await db.execute(
+        update(Image)
+        .filter(Image.id == image_id)
+        .values(rating_count=Image.rating_count + count_delta, rating_sum=Image.rating_sum + sum_delta)
+    )
 
 
 async def create_rating(user_id: int, rating: int, image_id: int, db: AsyncSession) -> ImageRating:
@@ -19,6 +40,8 @@ async def create_rating(user_id: int, rating: int, image_id: int, db: AsyncSessi
     rating = ImageRating(rating=rating, image_id=image_id, user_id=user_id)
 
     db.add(rating)
+    await update_image_aggregates(image_id, 1, rating.rating, db)
+    await update_user_counters(user_id, db, ratings=1)
     await db.commit()
     await db.refresh(rating)
 
@@ -79,6 +102,8 @@ async def remove_rating(rating: ImageRating, db: AsyncSession) -> None:
     :param db: AsyncSession: Pass the database session to the function
     :return: None
     """
+    await update_image_aggregates(rating.image_id, -1, -rating.rating, db)
+    await update_user_counters(rating.user_id, db, ratings=-1)
     await db.delete(rating)
     await db.commit()
 
@@ -92,6 +117,7 @@ async def update_rating(rating: ImageRating, new_rating: int, db: AsyncSession)
     :param db: AsyncSession: Pass the database session to the function
     :return: The new rating
     """
+    await update_image_aggregates(rating.image_id, 0, new_rating - rating.rating, db)
     rating.rating = new_rating
     await db.commit()
 
@@ -1,72 +1,159 @@
-from sqlalchemy import select
+import re
+from typing import Optional
+
+from sqlalchemy import select, tuple_, func, Select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import with_expression, selectinload, joinedload
 from app.database.models import Image, Tag
-from typing import Optional
+from app.database.models.images import image_m2m_tag
+from app.schemas.image import TagsMode, ImagesSort
+from app.utils.image_info import ImageInfo
+from app.utils.pagination import Cursor
 
-from .tags import get_or_create_tags
+from .remote_deletes import enqueue_remote_deletes
+from .tags import upsert_tags, normalize_tag_name
+from .users import update_user_counters
 
 
 async def get_image_by_id(image_id: int, db: AsyncSession) -> Image:
     """
     The get_image_by_id function returns an image from the database.
+    The tags are joined in, so a single image costs a single query.
 
     :param image_id: int: Filter the images by id
     :param db: AsyncSession: Pass in the database session to use
     :return: A single image object
     """
-    return await db.scalar(
+    image = await db.scalars(
         select(Image)
+        .options(joinedload(Image.tags))
         .filter(Image.id == image_id)
     )
 
+    return image.unique().first()
+
+
+async def get_public_ids_by_content_hash(content_hashes: list[str], db: AsyncSession) -> dict[str, str]:
+    """
+    The get_public_ids_by_content_hash function finds the files already uploaded with the given contents.
+    The matching images are locked FOR SHARE until the caller commits the images that reuse their files:
+    a concurrent delete waits until then, so the remote deletes worker finds the new references,
+    and an image whose delete committed first isn't matched at all.
+
+    :param content_hashes: list[str]: The SHA-256 hex digests of the new files
+    :param db: AsyncSession: Pass in the database session to use, in the transaction that creates the images
+    :return: The public id of each content that is already stored, keyed by its hash
+    """
+    if not content_hashes:
+        return {}
+
+    rows = await db.execute(
+        select(Image.content_hash, Image.public_id)
+        .filter(Image.content_hash.in_(content_hashes))
+        .with_for_update(read=True)
+    )
+
+    return dict(rows.all())
+
 
-async def create_image(user_id: int, description: str, tags: list[str], public_id: str, db: AsyncSession) -> Image:
+async def create_image(user_id: int, description: str, tags: list[str], public_id: str, db: AsyncSession,
+                       info: Optional[ImageInfo] = None, content_hash: Optional[str] = None) -> Image:
     """
     The create_image function creates a new image in the database.
+    The image, its tags and their association are written in one transaction, so a failure leaves no orphan tags.
 
     :param user_id: int: Specify the user who uploaded the image
     :param description: str: Describe the image
     :param tags: list[str]: Specify that the tags parameter is a list of strings
     :param public_id: str: Store the public id of the image in cloudinary
     :param db: AsyncSession: Pass in the database session
+    :param info: Optional[ImageInfo]: The format and dimensions read from the uploaded file
+    :param content_hash: Optional[str]: The SHA-256 hex digest of the uploaded file
     :return: An image object
     """
     image = Image(
         user_id=user_id,
         description=description,
-        public_id=public_id
+        public_id=public_id,
+        content_hash=content_hash
     )
 
+    if info:
+        image.format, image.width, image.height = info
+
     if tags:
-        image.tags = await get_or_create_tags(tags, db)
+        image.tags = await upsert_tags(tags, db)
 
     db.add(image)
+    await update_user_counters(user_id, db, images=1)
+    await db.flush()
+    image_id = image.id
 
     await db.commit()
 
-    await db.refresh(image)
+    return await get_image_by_id(image_id, db)
 
-    return image
+
+async def create_images(user_id: int, description: str, tags: list[str],
+                        uploads: list[tuple[str, Optional[ImageInfo], Optional[str]]],
+                        db: AsyncSession) -> list[Image]:
+    """
+    The create_images function creates the images of a bulk upload in one transaction.
+    The tags are upserted once and shared by all the images, and the tags of the result are loaded in one query.
+
+    :param user_id: int: Specify the user who uploaded the images
+    :param description: str: Describe the images
+    :param tags: list[str]: The tags of every image
+    :param uploads: list[tuple[str, Optional[ImageInfo], Optional[str]]]: The public id, the file info
+        and the content hash of each image
+    :param db: AsyncSession: Pass in the database session
+    :return: The image objects, in the order of the uploads
+    """
+    tag_rows = await upsert_tags(tags, db) if tags else []
+    images = []
+    for public_id, info, content_hash in uploads:
+        image = Image(user_id=user_id, description=description, public_id=public_id, content_hash=content_hash,
+                      tags=list(tag_rows))
+        if info:
+            image.format, image.width, image.height = info
+        images.append(image)
+
+    db.add_all(images)
+    await update_user_counters(user_id, db, images=len(images))
+    await db.flush()
+    image_ids = [image.id for image in images]
+
+    await db.commit()
+
+    created = await db.scalars(
+        select(Image)
+        .options(selectinload(Image.tags))
+        .filter(Image.id.in_(image_ids))
+        .order_by(Image.id)
+    )
+
+    return created.all()
 
 
-async def update_description(image_id: int, description: str, tags: list[str], db: AsyncSession) -> Optional[Image]:
+async def update_description(image: Image, description: str, tags: Optional[list[str]],
+                             db: AsyncSession) -> Image:
     """
-    The update_description function updates the description and tags of an image.
+    The update_description function updates the description and tags of an image in one transaction.
 
-    :param image_id: int: Specify the image to update
+    :param image: Image: The image to update, loaded with its tags
     :param description: str: Update the description of an image
-    :param tags: list[str]: Pass in a list of tags
+    :param tags: Optional[list[str]]: Pass in a list of tags, None keeps the current ones
     :param db: AsyncSession: Pass in the database session
-    :return: An image object
+    :return: The same image, still loaded
     """
-    tags = await get_or_create_tags(tags, db)
+    image.description = description
 
-    image = await get_image_by_id(image_id, db)
-    if image:
-        image.description = description
-        image.tags = tags
-        await db.commit()
-        await db.refresh(image)
+    if tags is not None:
+        image.tags = await upsert_tags(tags, db)
+
+    await db.commit()
+    # The image the route loaded is refreshed in place, its tags with it
+    await db.refresh(image)
 
     return image
 
@@ -75,52 +162,153 @@ async def delete_image(image: Image, db: AsyncSession) -> None:
     """
     The delete_image function deletes an image from the database.
 
+    The file is queued for removal from Cloudinary in the same transaction, the remote deletes worker removes it
+    once no other image uploaded with the same content uses it.
+
     :param image: Image: Pass the image object to be deleted
     :param db: AsyncSession: Pass in the database session
     :return: None, which is the default return value for a function that doesn't explicitly return anything
     """
+    user_id, public_id = image.user_id, image.public_id
+    # The image row first: it may wait for an upload reusing the file, which also updates the user's counters
     await db.delete(image)
+    await db.flush()
+    await update_user_counters(user_id, db, images=-1)
+    await enqueue_remote_deletes([public_id], db)
     await db.commit()
 
 
-async def get_images(
+def tagged_image_ids(tags: list[str], mode: TagsMode) -> Select:
+    """
+    The tagged_image_ids function selects the ids of the images tagged with all (or any) of the given tags.
+    Tag names are matched case-insensitively through the ix_tags_name_lower index and resolved to ids
+    once per query; the images are then found in ix_image_m2m_tag_tag_id_image_id, and for the all mode
+    only the images holding every one of the tags survive the GROUP BY/HAVING count.
+
+    :param tags: list[str]: The names of the tags
+    :param mode: TagsMode: Whether an image needs all of the tags or any of them
+    :return: A select statement of image ids
+    """
+    names = {normalize_tag_name(tag) for tag in tags}
+    tag_ids = select(Tag.id).filter(func.lower(Tag.name).in_(names))
+    query = select(image_m2m_tag.c.image_id).filter(image_m2m_tag.c.tag_id.in_(tag_ids))
+
+    if mode == TagsMode.all:
+        query = (
+            query.group_by(image_m2m_tag.c.image_id)
+            .having(func.count(image_m2m_tag.c.tag_id.distinct()) == len(names))
+        )
+
+    return query
+
+
+def search_query(text: str) -> str:
+    """
+    The search_query function turns the text typed by the user into a tsquery matching every word,
+    each as a prefix, so "descr" still finds "description" as LIKE used to.
+    Only word characters are kept, so the text can't inject tsquery syntax.
+
+    :param text: str: The text to search for
+    :return: A tsquery string
+    """
+    return ' & '.join(f'{word}:*' for word in re.findall(r'\w+', text.lower()))
+
+
+def images_query(
         skip: int,
         limit: int,
         description: str,
         tags: list[str],
         image_id: int,
         user_id: int,
-        db: AsyncSession
-) -> list[Image]:
+        after: Optional[Cursor] = None,
+        tags_mode: TagsMode = TagsMode.all,
+        sort: ImagesSort = ImagesSort.newest,
+) -> Select:
     """
-    The get_images function is used to retrieve images from the database.
-    It takes in a skip, limit, description, tags and image_id as parameters.
-    The skip parameter is used to determine how many images should be skipped before returning results.
-    The limit parameter determines how many results should be returned after skipping the specified number of images.
-    If no value for either of these parameters are provided then they default to 0 and 10 respectively (i.e., return all).
-    The description parameter allows you to search for an image by its description field using SQL LIKE syntax (e.g., %description% will match any image with
+    The images_query function builds the query of get_images.
+    Pages are read with a keyset: the after parameter holds the sort key of the last image of the
+    previous page, and the ix_images_created_at_id index seeks straight to the next one, however deep the page is.
+    The skip parameter is the legacy offset mode, the database still reads and discards every skipped row.
+    The description parameter is a full-text search over the words of the description, served by the
+    ix_images_description_tsv index; matches are ranked, best first, and carry their search_rank.
+    The tags parameter keeps the images tagged with all of the tags, or any of them in the any mode.
+    The rating sort orders the images by their stored average rating, best first, through the
+    ix_images_rating_avg_created_at_id index; it takes precedence over the search rank.
 
     :param skip: int: Skip the first n images
     :param limit: int: Limit the number of images returned
-    :param description: str: Filter the images by description
-    :param tags: list[str]: Filter the images by tags
+    :param description: str: Search the images by description
+    :param tags: list[str]: Filter the images by tag names
     :param image_id: int: Filter the images by their id
     :param user_id: int: Filter images by user_id
-    :param db: AsyncSession: Pass the database connection
-    :return: A list of image objects
+    :param after: Optional[Cursor]: The sort key of the last image of the previous page
+    :param tags_mode: TagsMode: Whether an image needs all of the tags or any of them
+    :param sort: ImagesSort: Order the images by creation time or by average rating
+    :return: A select statement
     """
-    query = select(Image)
+    # One query for the page, one batched query for the tags of all of its images
+    query = select(Image).options(selectinload(Image.tags))
+    sort_key = (Image.created_at, Image.id)
 
     if description:
-        query = query.filter(Image.description.like(f'%{description}%'))
+        tsquery = func.to_tsquery('simple', search_query(description))
+        rank = func.ts_rank(Image.description_tsv, tsquery)
+        query = query.filter(Image.description_tsv.op('@@')(tsquery)).options(with_expression(Image.search_rank, rank))
+        if sort == ImagesSort.newest:
+            sort_key = (rank, *sort_key)
+    if sort == ImagesSort.rating:
+        sort_key = (Image.rating_avg, *sort_key)
     if tags:
-        for tag in tags:
-            query = query.filter(Image.tags.any(Tag.name.ilike(f'%{tag}%')))
+        query = query.filter(Image.id.in_(tagged_image_ids(tags, tags_mode)))
     if user_id:
         query = query.filter(Image.user_id == user_id)
     if image_id:
         query = query.filter(Image.id == image_id)
 
-    image = await db.scalars(query.offset(skip).limit(limit))
+    if after:
+        values = (after.created_at, after.id) if after.rank is None else (after.rank, after.created_at, after.id)
+        query = query.filter(tuple_(*sort_key) < values)
+    elif skip:
+        query = query.offset(skip)
+
+    return query.order_by(*(column.desc() for column in sort_key)).limit(limit)
+
+
+async def get_images(
+        skip: int,
+        limit: int,
+        description: str,
+        tags: list[str],
+        image_id: int,
+        user_id: int,
+        db: AsyncSession,
+        after: Optional[Cursor] = None,
+        tags_mode: TagsMode = TagsMode.all,
+        sort: ImagesSort = ImagesSort.newest,
+) -> list[Image]:
+    """
+    The get_images function is used to retrieve images from the database, newest first.
+    It takes in a skip, limit, description, tags and image_id as parameters.
+    The after parameter is the cursor of the previous page, the skip parameter the legacy offset;
+    see images_query for how each of them is served.
+    The limit parameter determines how many results should be returned.
+    Description searches are ranked, best match first, unless the images are sorted by rating.
+
+    :param skip: int: Skip the first n images
+    :param limit: int: Limit the number of images returned
+    :param description: str: Search the images by description
+    :param tags: list[str]: Filter the images by tag names
+    :param image_id: int: Filter the images by their id
+    :param user_id: int: Filter images by user_id
+    :param db: AsyncSession: Pass the database connection
+    :param after: Optional[Cursor]: The sort key of the last image of the previous page
+    :param tags_mode: TagsMode: Whether an image needs all of the tags or any of them
+    :param sort: ImagesSort: Order the images by creation time or by average rating
+    :return: A list of image objects
+    """
+    image = await db.scalars(
+        images_query(skip, limit, description, tags, image_id, user_id, after, tags_mode, sort)
+    )
 
-    return image.unique().all()  # noqa
+    return image.all()  # noqa
@@ -0,0 +1,105 @@
+from datetime import timedelta
+
+from sqlalchemy import select, update, delete, func, literal, Row
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.models import Image, PendingRemoteDelete
+
+
+async def enqueue_remote_deletes(public_ids: list[str], db: AsyncSession) -> None:
+    """
+    The enqueue_remote_deletes function records Cloudinary files that are no longer referenced.
+    It doesn't commit: the rows belong to the transaction that drops the references, so a file is queued
+    if and only if that transaction commits.
+
+    :param public_ids: list[str]: The public ids of the files to remove
+    :param db: AsyncSession: Pass the database session to the function
+    :return: Nothing
+    """
+    if not public_ids:
+        return
+
+    await db.execute(
+        insert(PendingRemoteDelete)
+        .values([{"public_id": public_id} for public_id in public_ids])
+        .on_conflict_do_nothing(index_elements=[PendingRemoteDelete.public_id])
+    )
+
+
+async def claim_remote_deletes(limit: int, lease: int, db: AsyncSession) -> list[Row]:
+    """
+    The claim_remote_deletes function takes the next due rows of the outbox for the calling worker.
+    The rows are pushed lease seconds into the future and committed before any remote call,
+    so concurrent workers skip them, and they come back by themselves if the worker dies.
+
+    :param limit: int: Maximum number of rows to claim
+    :param lease: int: Seconds the rows stay reserved
+    :param db: AsyncSession: Pass the database session to the function
+    :return: The id, public_id and attempts of the claimed rows
+    """
+    due = (
+        select(PendingRemoteDelete.id)
+        .filter(PendingRemoteDelete.next_attempt_at <= func.now())
+        .order_by(PendingRemoteDelete.next_attempt_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    rows = await db.execute(
+        update(PendingRemoteDelete)
+        .filter(PendingRemoteDelete.id.in_(due.scalar_subquery()))
+        .values(attempts=PendingRemoteDelete.attempts + 1,
+                next_attempt_at=func.now() + timedelta(seconds=lease))
+        .returning(PendingRemoteDelete.id, PendingRemoteDelete.public_id, PendingRemoteDelete.attempts)
+    )
+    rows = rows.all()
+    await db.commit()
+
+    return rows
+
+
+async def get_referenced_public_ids(public_ids: list[str], db: AsyncSession) -> set[str]:
+    """
+    The get_referenced_public_ids function finds the files that images still use.
+    A file is shared by the uploads of the same content, so it may be queued while another image references it,
+    or be reused by a new upload after it was queued.
+
+    :param public_ids: list[str]: The public ids of the queued files
+    :param db: AsyncSession: Pass the database session to the function
+    :return: The public ids still referenced by an image
+    """
+    public_ids = await db.scalars(select(Image.public_id).filter(Image.public_id.in_(public_ids)).distinct())
+
+    return set(public_ids)
+
+
+async def complete_remote_deletes(ids: list[int], db: AsyncSession) -> None:
+    """
+    The complete_remote_deletes function removes the rows of the files that are gone from Cloudinary.
+
+    :param ids: list[int]: The ids of the done rows
+    :param db: AsyncSession: Pass the database session to the function
+    :return: Nothing
+    """
+    await db.execute(delete(PendingRemoteDelete).filter(PendingRemoteDelete.id.in_(ids)))
+    await db.commit()
+
+
+async def retry_remote_deletes(ids: list[int], base: int, maximum: int, db: AsyncSession) -> None:
+    """
+    The retry_remote_deletes function schedules the next attempt of the failed rows with an exponential backoff:
+    base seconds after the first attempt, doubling with every failure up to maximum seconds.
+
+    :param ids: list[int]: The ids of the failed rows
+    :param base: int: Seconds before the second attempt
+    :param maximum: int: Upper bound of the delay in seconds
+    :param db: AsyncSession: Pass the database session to the function
+    :return: Nothing
+    """
+    delay = func.least(base * func.power(2, PendingRemoteDelete.attempts - 1), maximum)
+    await db.execute(
+        update(PendingRemoteDelete)
+        .filter(PendingRemoteDelete.id.in_(ids))
+        .values(next_attempt_at=func.now() + literal(timedelta(seconds=1)) * delay)
+    )
+    await db.commit()
@@ -1,7 +1,8 @@
 from typing import Optional
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert
 
 from app.database.models import Tag
 from app.schemas.tag import TagBase
@@ -28,7 +29,8 @@ async def get_tags(skip: int, limit: int, db: AsyncSession) -> list[Tag]:
 async def get_tags_by_list_values(values: list[str], db: AsyncSession) -> list[Tag]:
     """
     The get_tags_by_list_values function takes a list of strings and an AsyncSession object as arguments.
-    It returns a list of Tag objects that match the names in the values argument.
+    It returns a list of Tag objects that match the names in the values argument, ignoring case,
+    through the ix_tags_name_lower index.
 
     :param values: list[str]: Pass in a list of strings to the function
     :param db: AsyncSession: Pass in the database session
@@ -36,7 +38,7 @@ async def get_tags_by_list_values(values: list[str], db: AsyncSession) -> list[T
     """
     tags = await db.scalars(
         select(Tag)
-        .filter(Tag.name.in_(values))
+        .filter(func.lower(Tag.name).in_([normalize_tag_name(value) for value in values]))
     )
     return tags.all()  # noqa
 
@@ -55,35 +57,81 @@ async def get_tag_by_id(tag_id: int, db: AsyncSession) -> Optional[Tag]:
     )
 
 
+def normalize_tag_name(value: str) -> str:
+    """
+    The normalize_tag_name function brings a tag name to the form it is stored in,
+    so the same tag typed with different case or padding is a single row.
+    It lowercases like the lower() of the ix_tags_name_lower index, which casefold doesn't always do (e.g. ß).
+
+    :param value: str: The tag name as entered by the user
+    :return: The normalized tag name
+    """
+    return value.strip().lower()
+
+
+def tag_names(values: list[str]) -> list[str]:
+    """
+    The tag_names function normalizes the tag names and drops the blank and repeated ones.
+
+    :param values: list[str]: The tag names as entered by the user
+    :return: The distinct normalized names, in the order given
+    """
+    return list(dict.fromkeys(name for name in map(normalize_tag_name, values) if name))
+
+
+async def insert_tags(names: list[str], db: AsyncSession) -> None:
+    """
+    The insert_tags function inserts the tags that don't exist yet in a single INSERT ... ON CONFLICT DO NOTHING
+    on the unique lower(name) index, so neither a concurrent request creating the same tag
+    nor a tag stored with another case fails the insert.
+
+    :param names: list[str]: Normalized tag names
+    :param db: AsyncSession: Pass the database session to the function
+    :return: Nothing
+    """
+    await db.execute(
+        insert(Tag)
+        .values([{"name": name} for name in names])
+        .on_conflict_do_nothing(index_elements=[func.lower(Tag.name)])
+    )
+
+
+async def upsert_tags(values: list[str], db: AsyncSession) -> list[Tag]:
+    """
+    The upsert_tags function returns the tags with the given names, creating the missing ones.
+    It doesn't commit, so the tags become part of the caller's unit of work.
+
+    :param values: list[str]: Pass in a list of strings
+    :param db: AsyncSession: Pass the database session to the function
+    :return: A list of tag objects
+    """
+    names = tag_names(values)
+    if not names:
+        return []
+
+    await insert_tags(names, db)
+
+    return await get_tags_by_list_values(names, db)
+
+
 async def get_or_create_tags(values: list[str], db: AsyncSession) -> list[Tag]:
     """
     The get_or_create_tags function takes a list of strings and an async database session.
     It returns a list of Tag objects.
-    If the tag already exists in the database, it is returned as-is. If not, it is created and then returned.
+    The missing tags are inserted and committed, then every tag is read back in one select.
 
     :param values: list[str]: Pass in a list of strings
     :param db: AsyncSession: Pass the database session to the function
     :return: A list of tag objects
     """
-    tags = await get_tags_by_list_values(values, db)
-    new_tags = []
-
-    for value in values:
-        for tag in tags:
-            if value == tag.name:
-                break
-        else:
-            new_tags.append(Tag(name=value.strip()))
-
-    db.add_all(new_tags)
+    names = tag_names(values)
+    if not names:
+        return []
 
+    await insert_tags(names, db)
     await db.commit()
-    for new_tag in new_tags:
-        await db.refresh(new_tag)
-
-    tags.extend(new_tags)
 
-    return tags
+    return await get_tags_by_list_values(names, db)
 
 
 async def update_tag(tag_id: int, body: TagBase, db: AsyncSession) -> Optional[Tag]:
@@ -98,7 +146,7 @@ async def update_tag(tag_id: int, body: TagBase, db: AsyncSession) -> Optional[T
     tag = await get_tag_by_id(tag_id, db)
 
     if tag:
-        tag.name = body.name
+        tag.name = normalize_tag_name(body.name)
         await db.commit()
         await db.refresh(tag)
 
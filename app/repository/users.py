@@ -1,12 +1,15 @@
 from typing import Optional
 
-from sqlalchemy import select, update, or_, func, RowMapping
+from sqlalchemy import select, update, or_, func, tuple_, RowMapping
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database.models import User, UserRole, Image
+from app.database.models import User, UserRole, Image, ImageComment, ImageRating
+from app.repository.remote_deletes import enqueue_remote_deletes
 from app.schemas.user import UserCreate, ProfileUpdate
+from app.services import cloudinary
 from app.services.gravatar import get_gravatar
+from app.services.user_cache import UserCache
 
 
 async def create_user(body: UserCreate, db: AsyncSession) -> User:
@@ -104,22 +107,30 @@ async def update_token(user: User, token: Optional[str], db: AsyncSession) -> No
 async def update_avatar(user_id: int, url: str, db: AsyncSession) -> User:
     """
     The update_avatar function updates the avatar of a user.
+    The previous avatar is read from the locked row in the same UPDATE, and its file is queued for removal from
+    Cloudinary: two overlapping updates each queue the avatar the other one replaced.
 
     :param user_id: int: Specify the user's id
     :param url: str: Pass the url of the avatar to be updated
     :param db: AsyncSession: Pass the database session to the function
     :return: A user object
     """
-    user = await db.scalar(
-        update(User)
+    users = User.__table__
+    previous = select(users.c.id, users.c.avatar).filter(users.c.id == user_id).with_for_update().subquery()
+    replaced = await db.scalar(
+        update(users)
         .values(avatar=url)
-        .filter(User.id == user_id)
-        .returning(User)
+        .filter(users.c.id == previous.c.id)
+        .returning(previous.c.avatar)
     )
+    public_id = cloudinary.get_public_id(replaced) if replaced else None
+    if public_id:
+        await enqueue_remote_deletes([public_id], db)
 
     await db.commit()
 
-    await db.refresh(user)
+    user = await db.get(User, user_id)
+    await UserCache.store(user)
 
     return user
 
@@ -167,6 +178,7 @@ async def update_email(user_id: int, email: str, db: AsyncSession) -> Optional[U
         return
 
     await db.refresh(user)
+    await UserCache.store(user)
 
     return user
 
@@ -182,6 +194,9 @@ async def confirmed_email(user: User, db: AsyncSession) -> None:
     user.email_verified = True
     await db.commit()
 
+    await db.refresh(user)
+    await UserCache.store(user)
+
 
 async def update_user_profile(user_id: int, body: ProfileUpdate, db: AsyncSession) -> User:
     """
@@ -204,6 +219,7 @@ async def update_user_profile(user_id: int, body: ProfileUpdate, db: AsyncSessio
     await db.commit()
 
     await db.refresh(user)
+    await UserCache.store(user)
 
     return user
 
@@ -220,6 +236,7 @@ async def user_update_role(user: User, role: UserRole, db: AsyncSession) -> User
     user.role = role
     await db.commit()
     await db.refresh(user)
+    await UserCache.store(user)
 
     return user
 
@@ -237,6 +254,7 @@ async def user_update_is_active(user: User, is_active: bool, db: AsyncSession) -
 
     await db.commit()
     await db.refresh(user)
+    await UserCache.store(user)
 
     return user
 
@@ -244,6 +262,8 @@ async def user_update_is_active(user: User, is_active: bool, db: AsyncSession) -
 async def get_user_profile_by_username(username: str, db: AsyncSession) -> RowMapping:
     """
     The get_user_profile_by_username function returns a user's profile information.
+    The numbers of images, comments and ratings are read from the counters stored on the user,
+    so a profile is a single row looked up by the username index.
 
     :param username: str: Filter the user by username
     :param db: AsyncSession: Pass a database session to the function
@@ -251,10 +271,56 @@ async def get_user_profile_by_username(username: str, db: AsyncSession) -> RowMa
     """
     user = await db.execute(
         select(User.id, User.username, User.first_name, User.last_name, User.avatar, User.created_at,
-               func.count(Image.id).label('number_of_images'))
-        .outerjoin(Image)
+               User.images_count.label('number_of_images'),
+               User.comments_count.label('number_of_comments'),
+               User.ratings_count.label('number_of_ratings'))
         .filter(User.username == username)
-        .group_by(User.id)
     )
 
     return user.mappings().first()
+
+
+async def update_user_counters(user_id: int, db: AsyncSession, images: int = 0, comments: int = 0,
+                               ratings: int = 0) -> None:
+    """
+    The update_user_counters function shifts the counters of a user by the given amounts.
+    The change is made in SQL, relative to the current values, so concurrent requests don't overwrite each other.
+    It doesn't commit: it belongs to the transaction that adds or removes the counted row.
+
+    :param user_id: int: Specify the user whose counters change
+    :param db: AsyncSession: Pass the database session to the function
+    :param images: int: Change of the number of images uploaded
+    :param comments: int: Change of the number of comments written
+    :param ratings: int: Change of the number of ratings given
+    :return: None
+    """
+    await db.execute(
+        update(User)
+        .values(images_count=User.images_count + images,
+                comments_count=User.comments_count + comments,
+                ratings_count=User.ratings_count + ratings)
+        .filter(User.id == user_id)
+    )
+
+
+async def reconcile_user_counters(db: AsyncSession) -> int:
+    """
+    The reconcile_user_counters function recounts the images, comments and ratings of every user
+    and fixes the counters that drifted, e.g. when rows were removed by a cascade.
+
+    :param db: AsyncSession: Pass the database session to the function
+    :return: The number of users whose counters were fixed
+    """
+    images = select(func.count(Image.id)).filter(Image.user_id == User.id).scalar_subquery()
+    comments = select(func.count(ImageComment.id)).filter(ImageComment.user_id == User.id).scalar_subquery()
+    ratings = select(func.count(ImageRating.id)).filter(ImageRating.user_id == User.id).scalar_subquery()
+
+    result = await db.execute(
+        update(User)
+        .values(images_count=images, comments_count=comments, ratings_count=ratings)
+        .filter(tuple_(User.images_count, User.comments_count, User.ratings_count) != tuple_(images, comments, ratings))
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+
+    return result.rowcount
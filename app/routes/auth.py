@@ -7,11 +7,10 @@ from fastapi_limiter.depends import RateLimiter
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database.connect import get_db
-from app.database.models import User
 from app.schemas import user as user_schemas
 from app.schemas.token import TokenResponse
 from app.repository import users as repository_users
-from app.services.auth import AuthService, get_current_active_user
+from app.services.auth import AuthService, Principal, get_current_active_user
 from app.services.email import send_email_confirmed, send_email_reset_password
 from config import Template
 
@@ -44,10 +43,11 @@ async def signup(
         raise HTTPException(status_code=status.HTTP_409_CONFLICT,
                             detail="An account with the same email address or username already exists")
 
-    body.password = AuthService.get_password_hash(body.password)
+    body.password = await AuthService.get_password_hash(body.password)
     new_user = await repository_users.create_user(body, db)
 
-    background_tasks.add_task(send_email_confirmed, new_user.email, new_user.username, request.base_url)
+    background_tasks.add_task(send_email_confirmed, new_user.email, new_user.username, request.base_url,
+                              new_user.id)
 
     return {"user": new_user, "detail": "User successfully created"}
 
@@ -71,11 +71,11 @@ async def login(
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid email")
     if not user.email_verified:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Email not confirmed")
-    if not AuthService.verify_password(body.password, user.password):
+    if not await AuthService.verify_password(body.password, user.password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid password")
 
     # Generate JWT
-    access_token = await AuthService.create_access_token(data={"sub": user.email})
+    access_token = await AuthService.create_access_token(data={"sub": user.email, "uid": user.id})
     refresh_token = await AuthService.create_refresh_token(data={"sub": user.email})
 
     await repository_users.update_token(user, refresh_token, db)
@@ -86,7 +86,7 @@ async def login(
 @router.get("/logout", status_code=status.HTTP_401_UNAUTHORIZED)
 async def logout(
         request: Request,
-        current_user: User = Depends(get_current_active_user),
+        current_user: Principal = Depends(get_current_active_user),
         db: AsyncSession = Depends(get_db)
 ) -> Any:
     """
@@ -95,14 +95,15 @@ async def logout(
     The access token of this user is then added to our blacklist so that it cannot be used again.
 
     :param request: Request: Get the authorization header from the request
-    :param current_user: User: Get the current user from the database
+    :param current_user: Principal: Get the current user from the database
     :param db: AsyncSession: Get the database session
     :return: A message saying that the logout was successful
     """
     access_token = request.headers['Authorization'].split(' ', maxsplit=1)[1]
     await AuthService.add_token_to_blacklist(access_token)
 
-    await repository_users.update_token(current_user, None, db)
+    user = await repository_users.get_user_by_id(current_user.id, db)
+    await repository_users.update_token(user, None, db)
 
     return {"message": "Successful exit"}
 
@@ -123,6 +124,10 @@ async def refresh_token(
     """
     token = credentials.credentials
     email = await AuthService.decode_refresh_token(token)
+
+    if await AuthService.token_is_blacklist(token):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
+
     user = await repository_users.get_user_by_email(email, db)
 
     if user.refresh_token != token:
@@ -130,7 +135,7 @@ async def refresh_token(
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
 
     # Generate JWT
-    access_token = await AuthService.create_access_token(data={"sub": email})
+    access_token = await AuthService.create_access_token(data={"sub": email, "uid": user.id})
     refresh_token = await AuthService.create_refresh_token(data={"sub": email})
 
     await repository_users.update_token(user, refresh_token, db)
@@ -193,7 +198,7 @@ async def reset_password(
     if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid email")
 
-    background_tasks.add_task(send_email_reset_password, user.email, user.username, request.base_url)
+    background_tasks.add_task(send_email_reset_password, user.email, user.username, request.base_url, user.id)
 
     return {"message": "Password reset email sent", "timeout_link": {"seconds": 86_400}}
 
@@ -214,7 +219,7 @@ async def reset_password_template(
     """
     email = await AuthService.get_email_from_token(token)
 
-    if await AuthService.token_is_blacklist(email, token):
+    if await AuthService.token_is_blacklist(token):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="The link is no longer active")
 
     user = await repository_users.get_user_by_email(email, db)
@@ -250,9 +255,11 @@ async def new_password(
     if not user.email_verified:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Email not confirmed")
 
-    password = AuthService.get_password_hash(password)
+    password = await AuthService.get_password_hash(password)
     await repository_users.update_password(user.id, password, db)
 
+    # Sessions opened with the old password end together with the reset link
+    await AuthService.revoke_user_tokens(user.id, user.email)
     await AuthService.add_token_to_blacklist(token)
 
     return {"status": 'ok'}
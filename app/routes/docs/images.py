@@ -1,14 +1,40 @@
 UPLOAD_IMAGE = """
-**Get a list of contacts whose birthday falls within the selected time period. The period cannot exceed 7 days.**
+**Upload an image with a description and up to five tags.**
 
-If the **{from_date}** parameter is not specified, then a list of contacts whose birthday falls within the period
-**{to_date} - 7 days** will be returned.
+PNG, JPEG, GIF, WebP, BMP, TIFF, HEIC and AVIF files are accepted; anything else is rejected with **422**.
+The format, width and height of the image are stored with it (the dimensions of a TIFF, HEIC or AVIF aren't read).
 
-If the **{to_date}** parameter is not specified, then a list of contacts whose birthday falls within the period
-**{from_date} + 7 days** will be returned.
+A file whose content was already uploaded isn't transferred again: the image reuses the stored file.
+"""
+UPLOAD_IMAGES = """
+**Upload several images with the same description and tags, e.g. an album.**
 
-If none of the parameters is specified, then a list of contacts whose birthday falls within the next 7 days
-from the current one will be returned.
+Up to 20 files are accepted per request, in the formats of a single upload. Every file gets its own result, in the
+order of the files: a file that isn't a valid image, or that can't be uploaded, doesn't prevent the others from
+being created.
 
-If the period is longer than 7 days, it will be truncated to 7 days from the **{from_date}** parameter.
-"""
\ No newline at end of file
+The response status is **201** when every file was uploaded and **207** when some of them failed; the
+**status_code** and **detail** of each result tell which ones and why.
+
+A file whose content was already uploaded, by anyone or earlier in the same request, isn't transferred again:
+its image reuses the stored file. If that file is deleted while the other files upload, the result is **409**:
+upload the file again.
+"""
+GET_IMAGES = """
+**Get images, newest first.**
+
+The response carries an **X-Next-Cursor** header whenever a full page was returned. Pass its value as the
+**{cursor}** parameter to get the next page; every page is fetched in the same time, however deep it is.
+A cursor only continues the pages of the same order: the newest images, a search or the rating sort.
+
+The **{description}** parameter searches the words of the descriptions (each word also matches as a prefix).
+Search results are ranked, best match first.
+
+The **{tags}** parameter matches tag names exactly, ignoring case. By default an image needs every one of the tags;
+with **{tags_mode}** set to **any**, one of them is enough.
+
+With **{sort}** set to **rating**, the images are ordered by their average rating, best first (unrated images
+count as 0). Every image carries its **rating_count** and **rating_avg**.
+
+The **{skip}** parameter is kept for older clients. It can't be combined with **{cursor}**.
+"""
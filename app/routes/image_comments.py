@@ -5,12 +5,13 @@ from fastapi_limiter.depends import RateLimiter
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database.connect import get_db
-from app.database.models import UserRole, User
+from app.database.models import UserRole
 from app.schemas.image_comments import CommentBase, CommentPublic, CommentUpdate
 from app.repository import comments as repository_comments
 from app.repository import images as repository_images
 from app.utils.filters import UserRoleFilter
-from app.services.auth import get_current_active_user
+from app.services.auth import Principal, get_current_active_user
+from app.services.read_replica import get_read_db
 
 
 router = APIRouter(prefix='/images/comments', tags=["Image comments"])
@@ -20,14 +21,14 @@ router = APIRouter(prefix='/images/comments', tags=["Image comments"])
 async def create_comment(
         body: CommentBase,
         db: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        current_user: Principal = Depends(get_current_active_user)
 ) -> Any:
     """
     The create_comment function creates a new comment in the database.
 
     :param body: CommentBase: Get the body of the comment
     :param db: AsyncSession: Pass the database session to the repository
-    :param current_user: User: Get the user who is currently logged in
+    :param current_user: Principal: Get the user who is currently logged in
     :return: A comment object
     """
     image = await repository_images.get_image_by_id(body.image_id, db)
@@ -49,8 +50,8 @@ async def get_comments_by_image_or_user_id(
         image_id: Optional[int] = None,
         user_id: Optional[int] = None,
         skip: int = 0,
-        limit: int = 10, db: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        limit: int = 10, db: AsyncSession = Depends(get_read_db),
+        current_user: Principal = Depends(get_current_active_user)
 ) -> Any:
     """
     The get_comments_by_image_or_user_id function is used to get comments by image_id or user_id.
@@ -63,7 +64,7 @@ async def get_comments_by_image_or_user_id(
     :param skip: int: Skip the first n comments
     :param limit: int: Limit the number of comments that are returned
     :param db: AsyncSession: Get the database connection
-    :param current_user: User: Get the current user from the database
+    :param current_user: Principal: Get the current user from the database
     :return: A list of comments
     """
     if user_id is None and image_id is None:
@@ -78,15 +79,15 @@ async def get_comments_by_image_or_user_id(
 @router.get("/{comment_id}", response_model=CommentPublic)
 async def get_comment(
         comment_id: int,
-        db: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        db: AsyncSession = Depends(get_read_db),
+        current_user: Principal = Depends(get_current_active_user)
 ) -> Any:
     """
     The get_comment function returns a comment by its id.
 
     :param comment_id: int: Get the comment id from the url path
     :param db: AsyncSession: Get the database session
-    :param current_user: User: Get the current user from the database
+    :param current_user: Principal: Get the current user from the database
     :return: A comment object
     """
     comment = await repository_comments.get_comment_by_id(comment_id, db)
@@ -103,7 +104,7 @@ async def get_comment(
 async def update_comment(
         body: CommentUpdate,
         db: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        current_user: Principal = Depends(get_current_active_user)
 ) -> Any:
     """
     The update_comment function updates a comment in the database.
@@ -112,7 +113,7 @@ async def update_comment(
 
     :param body: CommentUpdate: Pass the new comment body to the function
     :param db: AsyncSession: Pass the database session to the function
-    :param current_user: User: Get the current user from the database
+    :param current_user: Principal: Get the current user from the database
     :return: The updated comment
     """
     comment = await repository_comments.update_comment(body.comment_id, body.data, db)
@@ -127,7 +128,7 @@ async def update_comment(
 async def remove_comment(
         comment_id: int,
         db: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        current_user: Principal = Depends(get_current_active_user)
 ) -> Any:
     """
     The remove_comment function removes a comment from the database.
@@ -136,7 +137,7 @@ async def remove_comment(
 
     :param comment_id: int: Specify the id of the comment that is to be deleted
     :param db: AsyncSession: Pass the database session to the function
-    :param current_user: User: Get the user that is currently logged in
+    :param current_user: Principal: Get the user that is currently logged in
     :return: A comment
     """
     comment = await repository_comments.remove_comment(comment_id, db)
@@ -7,7 +7,7 @@ from fastapi_limiter.depends import RateLimiter
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database.connect import get_db
-from app.database.models import User, UserRole
+from app.database.models import UserRole
 from app.repository import images as repository_images
 from app.repository import image_formats as repository_image_formats
 from app.repository.images import get_image_by_id
@@ -18,7 +18,7 @@ from app.schemas.image_formats import (
     ImageFormatRemoveResponse,
 )
 from app.services import cloudinary
-from app.services.auth import get_current_active_user
+from app.services.auth import Principal, get_current_active_user
 from app.services.qr_code import create_qr_for_url
 
 router = APIRouter(prefix="/images/formats", tags=["Image formats"])
@@ -31,19 +31,19 @@ router = APIRouter(prefix="/images/formats", tags=["Image formats"])
     dependencies=[Depends(RateLimiter(times=10, seconds=60))])
 async def formatting_image(
         body: ImageTransformation,
-        current_user: User = Depends(get_current_active_user),
+        current_user: Principal = Depends(get_current_active_user),
         db: AsyncSession = Depends(get_db)
 ) -> Any:
     """
     The formatting_image function is used to format an image.
         The function takes in the following parameters:
             - body: ImageTransformation, which contains the id of the image and a transformation string.
-            - current_user: User, which is obtained from AuthService.get_current_user(). This parameter allows us to get
+            - current_user: Principal, which is obtained from AuthService.get_current_user(). This parameter allows us to get
                 information about who made this request (the user). We use this information to ensure that only users with
                 access can make requests on their own images. If no user is found, then we raise a HTTPException with status code 401 (Unauthorized) and detail &quot;
 
     :param body: ImageTransformation: Get the image_id and transformation parameters
-    :param current_user: User: Get the user's id
+    :param current_user: Principal: Get the user's id
     :param db: AsyncSession: Pass the database session to the repository layer
     :return: A formatted image
     """
@@ -73,14 +73,14 @@ async def formatting_image(
 @router.get('/{image_id}', response_model=ImageFormatsResponse, response_model_by_alias=False)
 async def get_image_formats(
         image_id: int,
-        current_user: User = Depends(get_current_active_user),
+        current_user: Principal = Depends(get_current_active_user),
         db: AsyncSession = Depends(get_db)
 ) -> Any:
     """
     The get_image_formats function returns a list of formatted images for the given image_id.
 
     :param image_id: int: Get the image by id
-    :param current_user: User: Get the user id from the token
+    :param current_user: Principal: Get the user id from the token
     :param db: AsyncSession: Get the database session
     :return: The original image and the formatted images
     """
@@ -103,14 +103,14 @@ async def get_image_formats(
 async def delete_image_format(
         image_format_id: int,
         db: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        current_user: Principal = Depends(get_current_active_user)
 ) -> Any:
     """
     The delete_image_format function deletes an image format from the database.
 
     :param image_format_id: int: Get the image format by id
     :param db: AsyncSession: Get the database session
-    :param current_user: User: Get the current user from the database
+    :param current_user: Principal: Get the current user from the database
     :return: A dictionary with a message
     """
     image_format = await repository_image_formats.get_image_format_by_id(image_format_id, db)
@@ -133,7 +133,7 @@ async def get_image_format_qrcode(
         box_size: Optional[int] = 10,
         border: Optional[int] = 5,
         fit: Optional[bool] = True,
-        current_user: User = Depends(get_current_active_user),
+        current_user: Principal = Depends(get_current_active_user),
         db: AsyncSession = Depends(get_db)
 ) -> Any:
     """
@@ -144,7 +144,7 @@ async def get_image_format_qrcode(
     :param box_size: Optional[int]: Specify the size of each box in pixels
     :param border: Optional[int]: Specify the width of the border that will be added around
     :param fit: Optional[bool]: Determine whether the qr code should be resized to fit the size of
-    :param current_user: User: Get the current user from the request
+    :param current_user: Principal: Get the current user from the request
     :param db: AsyncSession: Get the database session
     :return: A qr code for the image format
     """
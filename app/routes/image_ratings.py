@@ -4,9 +4,9 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database.connect import get_db
-from app.database.models import User, UserRole
+from app.database.models import UserRole
 from app.schemas.image_raitings import ImageRatingCreate, ImageRatingUpdate, ImageRatingResponse
-from app.services.auth import get_current_active_user
+from app.services.auth import Principal, get_current_active_user
 from app.repository import image_ratings as repo_image_ratings
 from app.repository import images as repository_images
 
@@ -16,14 +16,14 @@ router = APIRouter(prefix="/images/ratings", tags=["Image ratings"])
 @router.post("/", response_model=ImageRatingResponse, status_code=status.HTTP_201_CREATED)
 async def create_image_rating(
         body: ImageRatingCreate,
-        current_user: User = Depends(get_current_active_user),
+        current_user: Principal = Depends(get_current_active_user),
         db: AsyncSession = Depends(get_db)
 ) -> AsyncSession:
     """
     The create_image_rating function creates a new image rating.
 
     :param body: ImageRatingCreate: Get the rating and image_id from the request body
-    :param current_user: User: Get the user that is currently logged in
+    :param current_user: Principal: Get the user that is currently logged in
     :param db: AsyncSession: Get the database session
     :return: An async session object
     """
@@ -47,14 +47,14 @@ async def create_image_rating(
 async def update_image_rating(
         body: ImageRatingUpdate,
         db: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        current_user: Principal = Depends(get_current_active_user)
 ) -> Any:
     """
     The update_image_rating function updates the rating of an image.
 
     :param body: ImageRatingUpdate: Get the rating from the request body
     :param db: AsyncSession: Get the database session
-    :param current_user: User: Get the user who is currently logged in
+    :param current_user: Principal: Get the user who is currently logged in
     :return: An image rating object
     """
     if not 1 <= body.rating <= 5:
@@ -70,14 +70,14 @@ async def update_image_rating(
 @router.delete("/ratings/{rating_id}")
 async def delete_image_rating(
         rating_id: int,
-        current_user: User = Depends(get_current_active_user),
+        current_user: Principal = Depends(get_current_active_user),
         db_session=Depends(get_db)
 ):
     """
     The delete_image_rating function deletes an image rating.
 
     :param rating_id: int: Specify the id of the rating to be deleted
-    :param current_user: User: Get the current user
+    :param current_user: Principal: Get the current user
     :param db_session: Get the database session
     :return: A dictionary with a message
     """
@@ -97,7 +97,7 @@ async def delete_image_rating(
 async def get_all_image_ratings(
         image_id: int,
         db_session: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        current_user: Principal = Depends(get_current_active_user)
 ) -> Any:
     """
     The get_all_image_ratings function returns all ratings for a given image.
@@ -105,7 +105,7 @@ async def get_all_image_ratings(
 
     :param image_id: int: Get the image id from the url
     :param db_session: AsyncSession: Get the database session from the dependency injection container
-    :param current_user: User: Get the current user who is logged in
+    :param current_user: Principal: Get the current user who is logged in
     :return: A list of all ratings for a given image
     """
     ratings = await repo_image_ratings.get_all_image_ratings(image_id, db_session)
@@ -1,21 +1,53 @@
 import asyncio
 from typing import Optional, Any
 
-from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, status, Query, Body
+from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, status, Query, Body, Response
 from fastapi_limiter.depends import RateLimiter
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database.connect import get_db
-from app.database.models import User, UserRole
+from app.database.models import UserRole
 from app.repository import images as repository_images
-from app.schemas.image import ImageCreateResponse, ImagePublic, ImageRemoveResponse
+from app.schemas.image import (
+    ImageCreateResponse,
+    ImagePublic,
+    ImageRemoveResponse,
+    ImagesBulkCreateResponse,
+    TagsMode,
+    ImagesSort,
+)
 from app.services import cloudinary
-from app.services.auth import get_current_active_user
+from app.services.auth import Principal, get_current_active_user
+from app.services.read_replica import get_read_db
+from app.services.remote_deletes import discard_uploads_on_failure
+from app.services.upload_pool import upload_pool
+from app.utils.image_info import read_image_info, read_content_hash
+from app.utils.pagination import encode_cursor, decode_cursor
+from config import settings
 from .docs import images as docs
 
 router = APIRouter(prefix="/images", tags=["Images"])
 
 
+def check_tags(tags: Optional[list[str]]) -> None:
+    """
+    The check_tags function validates the tags sent with an upload.
+
+    :param tags: Optional[list[str]]: The tags of the upload
+    :return: Nothing
+    :raise HTTPException: 422 if there are more than five tags or a tag isn't 3 to 50 characters long
+    """
+    if tags and len(tags) > 5:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail="Maximum five tags can be added")
+
+    if tags:
+        for tag in tags:
+            if not 3 <= len(tag) <= 50:
+                raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                                    detail=f'Invalid length tag: {tag}')
+
+
 @router.post(
     "/", response_model=ImageCreateResponse, response_model_by_alias=False, status_code=status.HTTP_201_CREATED,
     dependencies=[Depends(RateLimiter(times=10, seconds=60))],
@@ -25,7 +57,7 @@ async def upload_image(
         file: UploadFile = File(), description: str = Form(min_length=10, max_length=1200),
         tags: Optional[list[str]] = Form(None),
         db: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_active_user),
+        current_user: Principal = Depends(get_current_active_user),
 ) -> Any:
     """
     The upload_image function is used to upload an image file to the cloudinary server.
@@ -38,75 +70,234 @@ async def upload_image(
     :param description: str: Get the description of the image from the request body
     :param tags: Optional[list[str]]: Validate the tag list
     :param db: AsyncSession: Get the database session
-    :param current_user: User: Get the current user that is logged in
+    :param current_user: Principal: Get the current user that is logged in
     :param : Get the image id from the url
     :return: A dictionary with the image and detail keys
+    :raise HTTPException: 413 or 422 if the file isn't an acceptable image,
+        503 with a Retry-After header while the upload pool is saturated
     """
-    if tags and len(tags) > 5:
-        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-                            detail="Maximum five tags can be added")
+    check_tags(tags)
 
-    if tags:
-        for tag in tags:
-            if not 3 <= len(tag) <= 50:
-                raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-                                    detail=f'Invalid length tag: {tag}')
+    # Rejects what isn't an image before it takes an upload thread
+    info = await read_image_info(file)
 
-    loop = asyncio.get_event_loop()
-    image = await loop.run_in_executor(None, cloudinary.upload_image, file.file)
+    # The same content is uploaded once, a repeat reuses the stored file
+    content_hash = await read_content_hash(file)
+    stored = await repository_images.get_public_ids_by_content_hash([content_hash], db)
+    public_id = stored.get(content_hash)
+    new_public_ids = []
 
-    if image is None:
-        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Invalid image file")
+    if public_id is None:
+        # Nothing to lock: no transaction holds a connection during the transfer
+        await db.rollback()
+        image = await upload_pool.run(cloudinary.upload_image, file.file)
 
-    image = await repository_images.create_image(current_user.id, description.strip(), tags, image['public_id'], db)
+        if image is None:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Invalid image file")
+
+        public_id = image['public_id']
+        new_public_ids.append(public_id)
+
+    async with discard_uploads_on_failure(new_public_ids, db):
+        image = await repository_images.create_image(current_user.id, description.strip(), tags, public_id, db,
+                                                     info, content_hash)
 
     return {"image": image, "message": "Image successfully uploaded"}
 
 
-@router.get("/", response_model=list[ImagePublic], description="Get all images",
+@router.post(
+    "/bulk", response_model=ImagesBulkCreateResponse, response_model_by_alias=False,
+    status_code=status.HTTP_201_CREATED, dependencies=[Depends(RateLimiter(times=2, seconds=60))],
+    description=docs.UPLOAD_IMAGES
+)
+async def upload_images(
+        response: Response,
+        files: list[UploadFile] = File(), description: str = Form(min_length=10, max_length=1200),
+        tags: Optional[list[str]] = Form(None),
+        db: AsyncSession = Depends(get_db),
+        current_user: Principal = Depends(get_current_active_user),
+) -> Any:
+    """
+    The upload_images function uploads several image files with the same description and tags.
+    Every file is checked first, the contents that aren't stored yet are sent to cloudinary concurrently, at most
+    upload_bulk_concurrency at a time, and the images are created in one transaction.
+    A file that fails doesn't fail the others: the result of each file is returned in the order of the files.
+
+    :param response: Response: Set the status code, 207 if some of the files failed
+    :param files: list[UploadFile]: Receive the image files from the client
+    :param description: str: Get the description of the images from the request body
+    :param tags: Optional[list[str]]: Validate the tag list
+    :param db: AsyncSession: Get the database session
+    :param current_user: Principal: Get the current user that is logged in
+    :return: A dictionary with the images and message keys
+    :raise HTTPException: 422 if there are too many files or the tags are invalid
+    """
+    if len(files) > settings.upload_bulk_max_files:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                            detail=f"Maximum {settings.upload_bulk_max_files} files can be uploaded")
+
+    check_tags(tags)
+
+    async def check(file: UploadFile) -> dict:
+        try:
+            info = await read_image_info(file)
+        except HTTPException as e:
+            return {"filename": file.filename, "status_code": e.status_code, "detail": e.detail}
+
+        return {"filename": file.filename, "status_code": status.HTTP_201_CREATED, "info": info,
+                "content_hash": await read_content_hash(file)}
+
+    results = await asyncio.gather(*(check(file) for file in files))
+
+    # One upload per new content, the files already stored and the copies within the album reuse its public_id
+    valid = [result for result in results if "info" in result]
+    stored = await repository_images.get_public_ids_by_content_hash([result["content_hash"] for result in valid], db)
+    new_files = {}
+    for file, result in zip(files, results):
+        if "info" in result and result["content_hash"] not in stored:
+            new_files.setdefault(result["content_hash"], file)
+
+    semaphore = asyncio.Semaphore(settings.upload_bulk_concurrency)
+    failures = {}
+    new_public_ids = []
+
+    async def upload(content_hash: str, file: UploadFile) -> None:
+        try:
+            async with semaphore:
+                image = await upload_pool.run(cloudinary.upload_image, file.file)
+        except HTTPException as e:
+            failures[content_hash] = (e.status_code, e.detail)
+            return
+
+        if image is None:
+            failures[content_hash] = (status.HTTP_422_UNPROCESSABLE_ENTITY, "Invalid image file")
+        else:
+            stored[content_hash] = image['public_id']
+            new_public_ids.append(image['public_id'])
+
+    if new_files:
+        # No transaction, and no lock on the stored images, is held while the files upload
+        await db.rollback()
+
+        # Every upload settles before an error is raised, so each file that reached cloudinary is discarded
+        outcomes = await asyncio.gather(*(upload(content_hash, file) for content_hash, file in new_files.items()),
+                                        return_exceptions=True)
+        errors = [outcome for outcome in outcomes if isinstance(outcome, BaseException)]
+        if errors:
+            async with discard_uploads_on_failure(new_public_ids, db):
+                raise errors[0]
+
+        # Locked again in the transaction that creates the images, a delete may have committed meanwhile
+        reused = [content_hash for content_hash in stored if content_hash not in new_files]
+        relocked = await repository_images.get_public_ids_by_content_hash(reused, db)
+        for content_hash in reused:
+            if content_hash in relocked:
+                stored[content_hash] = relocked[content_hash]
+            else:
+                failures[content_hash] = (status.HTTP_409_CONFLICT, "The stored file was removed, upload it again")
+
+    uploaded = []
+    for result in valid:
+        if result["content_hash"] in failures:
+            result["status_code"], result["detail"] = failures[result["content_hash"]]
+        else:
+            uploaded.append(result)
+
+    if uploaded:
+        async with discard_uploads_on_failure(new_public_ids, db):
+            images = await repository_images.create_images(
+                current_user.id, description.strip(), tags,
+                [(stored[result["content_hash"]], result["info"], result["content_hash"]) for result in uploaded], db
+            )
+        for result, image in zip(uploaded, images):
+            result["image"] = image
+
+    if len(uploaded) < len(results):
+        response.status_code = status.HTTP_207_MULTI_STATUS
+
+    return {"images": results, "message": f"{len(uploaded)} of {len(results)} images successfully uploaded"}
+
+
+@router.get("/", response_model=list[ImagePublic], description=docs.GET_IMAGES,
             dependencies=[Depends(RateLimiter(times=30, seconds=60))])
 async def get_images(
+        response: Response,
         skip: int = 0,
         limit: int = Query(default=10, ge=1, le=100),
+        cursor: Optional[str] = Query(default=None, max_length=200),
         description: Optional[str] = Query(default=None, min_length=3, max_length=1200),
         tags: Optional[list[str]] = Query(default=None, max_length=50),
+        tags_mode: TagsMode = TagsMode.all,
+        sort: ImagesSort = ImagesSort.newest,
         image_id: Optional[int] = Query(default=None, ge=1),
         user_id: Optional[int] = Query(default=None, ge=1),
-        db: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        db: AsyncSession = Depends(get_read_db),
+        current_user: Principal = Depends(get_current_active_user)
 ) -> Any:
     """
-    The get_images function is used to retrieve images from the database.
-        The function takes in a skip, limit, description, tags and user_id as parameters.
-        The skip parameter is used to determine how many images should be skipped before returning results.
-        The limit parameter determines how many results should be returned after skipping the specified number of images.
+    The get_images function is used to retrieve images from the database, newest first.
+        The function takes in a skip, limit, cursor, description, tags and user_id as parameters.
+        The cursor parameter is the X-Next-Cursor header of the previous page; pages fetched this way
+        take the same time however far the user has scrolled.
+        The description parameter is a full-text search; its results are ranked, best match first.
+        The sort parameter orders the images by average rating, best first, instead.
+        The skip parameter is the legacy offset mode: it determines how many images should be skipped before returning results.
+        The limit parameter determines how many results should be returned.
         If no value for limit is provided then 10 will be assumed by default (max 100).
 
+    :param response: Response: Set the X-Next-Cursor header
     :param skip: int: Skip a number of images when returning the list
     :param limit: int: Limit the number of images returned
-    :param description: Optional[str]: Filter the images by description
-    :param tags: Optional[list[str]]: Filter the images by tags
+    :param cursor: Optional[str]: Continue after the last image of the previous page
+    :param description: Optional[str]: Search the images by description
+    :param tags: Optional[list[str]]: Filter the images by tag names
+    :param tags_mode: TagsMode: Whether an image needs all of the tags or any of them
+    :param sort: ImagesSort: Order the images by creation time or by average rating
     :param image_id: Optional[int]: Get the image by id
     :param user_id: Optional[int]: Filter the images by user_id
     :param db: AsyncSession: Get the database session
-    :param current_user: User: Get the current user from the database
+    :param current_user: Principal: Get the current user from the database
     :return: A list of images
     """
-    return await repository_images.get_images(skip, limit, description, tags, image_id, user_id, db)
+    # The cursor of a page only continues pages in the same order
+    mode = "search" if description and sort == ImagesSort.newest else sort.value
+
+    after = None
+    if cursor:
+        if skip:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                                detail="Use either skip or cursor")
+        try:
+            after = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Invalid cursor")
+        # Ranked pages (search results or the rating sort) carry the score in their cursors
+        if after.mode != mode or (after.rank is None) != (mode == ImagesSort.newest):
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Invalid cursor")
+
+    images = await repository_images.get_images(skip, limit, description, tags, image_id, user_id, db, after,
+                                                tags_mode, sort)
+
+    if len(images) == limit:
+        last = images[-1]
+        rank = last.rating_avg if sort == ImagesSort.rating else last.search_rank
+        response.headers["X-Next-Cursor"] = encode_cursor(last.created_at, last.id, rank, mode)
+
+    return images
 
 
 @router.get("/{image_id}", response_model=ImagePublic)
 async def get_image(
         image_id: int,
-        db: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        db: AsyncSession = Depends(get_read_db),
+        current_user: Principal = Depends(get_current_active_user)
 ) -> Any:
     """
     The get_image function returns an image by its id.
 
     :param image_id: int: Get the image id from the url
     :param db: AsyncSession: Pass the database session to the function
-    :param current_user: User: Get the current user from the database
+    :param current_user: Principal: Get the current user from the database
     :return: The image object
     """
     image = await repository_images.get_image_by_id(image_id, db)
@@ -122,7 +313,7 @@ async def update_image_data(
         description: str = Body(min_length=10, max_length=1200),
         tags: Optional[list[str]] = Body(None, min_length=3, max_length=50),
         db: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        current_user: Principal = Depends(get_current_active_user)
 ) -> Any:
     """
     The update_description function updates the description of an image.
@@ -131,7 +322,7 @@ async def update_image_data(
     :param description: str: Update the description of an image
     :param tags: Optional[list[str]]: Get the tags from the request body
     :param db: AsyncSession: Get the database session
-    :param current_user: User: Get the user who is currently logged in
+    :param current_user: Principal: Get the user who is currently logged in
     :return: An image with a new description and tags
     """
     if tags and len(tags) > 5:
@@ -146,7 +337,7 @@ async def update_image_data(
     if current_user.role != UserRole.admin and image.user_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
 
-    updated_image = await repository_images.update_description(image_id, description, tags, db)
+    updated_image = await repository_images.update_description(image, description, tags, db)
 
     return updated_image
 
@@ -156,14 +347,14 @@ async def update_image_data(
 async def delete_image(
         image_id: int,
         db: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        current_user: Principal = Depends(get_current_active_user)
 ) -> Any:
     """
-    The delete_image function deletes an image from the database and cloudinary.
+    The delete_image function deletes an image from the database and queues its file for removal from cloudinary.
 
     :param image_id: int: Get the image id from the url
     :param db: AsyncSession: Get the database session
-    :param current_user: User: Get the current user
+    :param current_user: Principal: Get the current user
     :return: A dictionary with the message key and value
     """
     image = await repository_images.get_image_by_id(image_id, db)
@@ -174,8 +365,6 @@ async def delete_image(
     if current_user.role != UserRole.admin and image.user_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
 
-    loop = asyncio.get_event_loop()
-    await loop.run_in_executor(None, cloudinary.remove_image, image.public_id)
     await repository_images.delete_image(image, db)
 
     return {"message": "Image successfully deleted"}
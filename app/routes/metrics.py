@@ -0,0 +1,32 @@
+from typing import Any
+
+from fastapi import APIRouter, Depends
+
+from app.database.connect import async_engine
+from app.database.models import UserRole
+from app.services.auth import AuthService
+from app.services.cloudinary import build_image_url
+from app.services.password_hasher import password_hasher
+from app.services.upload_pool import upload_pool
+from app.services.user_cache import UserCache
+from app.utils.filters import UserRoleFilter
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+
+@router.get("/", dependencies=[Depends(UserRoleFilter(UserRole.admin))])
+async def get_metrics() -> Any:
+    """
+    The get_metrics function returns the counters of the database pool and of the in-process caches and pools
+    of this worker. Every worker keeps its own counters, so each request shows a single worker.
+
+    :return: A dictionary with the counters of every component
+    """
+    return {
+        "db_pool": async_engine.pool.stats(),
+        "password_hasher": password_hasher.stats(),
+        "upload_pool": upload_pool.stats(),
+        "user_cache": UserCache.local.stats(),
+        "token_cache": AuthService.token_cache.stats(),
+        "image_url_cache": build_image_url.cache_info()._asdict(),
+    }
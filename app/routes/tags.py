@@ -3,14 +3,15 @@ from typing import Any
 from fastapi import APIRouter, HTTPException, Depends, status, Body
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database.models import UserRole, User
+from app.database.models import UserRole
 from app.database.connect import get_db
 
 from app.schemas.tag import TagUpdate, TagResponse
 from app.repository import tags as repository_tags
 
 from app.utils.filters import UserRoleFilter
-from app.services.auth import get_current_active_user
+from app.services.auth import Principal, get_current_active_user
+from app.services.read_replica import get_read_db
 
 router = APIRouter(prefix='/tags', tags=["tags"])
 
@@ -19,14 +20,14 @@ router = APIRouter(prefix='/tags', tags=["tags"])
 async def get_or_create_tags(
         tags: list[str] = Body(min_length=3, max_length=50),
         db: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        current_user: Principal = Depends(get_current_active_user)
 ) -> Any:
     """
     The get_or_create_tags function is used to get or create tags.
 
     :param tags: Get the tags from the database
     :param db: AsyncSession: Pass the database session to the function
-    :param current_user: User: Get the current user who is logged in
+    :param current_user: Principal: Get the current user who is logged in
     :return: A list of tag objects
     """
     tags = await repository_tags.get_or_create_tags(tags, db)
@@ -37,8 +38,8 @@ async def get_or_create_tags(
 async def read_tags(
         skip: int = 0,
         limit: int = 100,
-        db: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        db: AsyncSession = Depends(get_read_db),
+        current_user: Principal = Depends(get_current_active_user)
 ) -> Any:
     """
     The read_tags function returns a list of tags.
@@ -46,7 +47,7 @@ async def read_tags(
     :param skip: int: Skip the first n tags
     :param limit: int: Limit the number of tags returned
     :param db: AsyncSession: Pass the database connection to the function
-    :param current_user: User: Get the current user
+    :param current_user: Principal: Get the current user
     :return: A list of tag objects
     """
     return await repository_tags.get_tags(skip, limit, db)
@@ -55,8 +56,8 @@ async def read_tags(
 @router.get("/{tag_id}", response_model=TagResponse)
 async def get_tag(
         tag_id: int,
-        db: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        db: AsyncSession = Depends(get_read_db),
+        current_user: Principal = Depends(get_current_active_user)
 ) -> Any:
     """
     The get_tag function is a GET request that returns the tag with the given ID.
@@ -64,7 +65,7 @@ async def get_tag(
 
     :param tag_id: int: Get the tag id from the url
     :param db: AsyncSession: Get the database session
-    :param current_user: User: Get the current user
+    :param current_user: Principal: Get the current user
     :return: A tag object
     """
     tag = await repository_tags.get_tag_by_id(tag_id, db)
@@ -81,7 +82,7 @@ async def get_tag(
 async def update_tag(
         body: TagUpdate,
         db: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        current_user: Principal = Depends(get_current_active_user)
 ) -> Any:
     """
     The update_tag function updates a tag in the database.
@@ -91,7 +92,7 @@ async def update_tag(
     :param body: TagBase: Define the body of the request
     :param tag_id: int: Identify the tag to be deleted
     :param db: AsyncSession: Pass the database session to the function
-    :param current_user: User: Get the current user
+    :param current_user: Principal: Get the current user
     :return: A tag object
     """
     tag = await repository_tags.update_tag(body.tag_id, body, db)
@@ -109,14 +110,14 @@ async def update_tag(
 async def remove_tag(
         tag_id: int,
         db: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        current_user: Principal = Depends(get_current_active_user)
 ) -> Any:
     """
     The remove_tag function removes a tag from the database.
 
     :param tag_id: int: Specify the id of the tag to be removed
     :param db: AsyncSession: Get the database session
-    :param current_user: User: Get the user that is currently logged in
+    :param current_user: Principal: Get the user that is currently logged in
     :return: The tag that was just deleted
     """
     tag = await repository_tags.remove_tag(tag_id, db)
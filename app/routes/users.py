@@ -1,4 +1,3 @@
-import asyncio
 from typing import Any
 
 from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, status
@@ -6,30 +5,35 @@ from fastapi_limiter.depends import RateLimiter
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database.connect import get_db
-from app.database.models import User, UserRole
+from app.database.models import UserRole
 from app.repository import users as repository_users
 from app.schemas.user import UserPublic, ProfileUpdate
 
 from app.schemas import user as user_schemas
 from app.services import cloudinary
-from app.services.auth import AuthService, get_current_active_user
+from app.services.auth import AuthService, Principal, get_current_active_user
+from app.services.read_replica import get_read_db
+from app.services.remote_deletes import discard_uploads_on_failure
+from app.services.upload_pool import upload_pool
 from app.utils.filters import UserRoleFilter
-from config import settings
+from app.utils.image_info import read_image_info
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
 
 @router.get("/me/", response_model=user_schemas.UserPublic, dependencies=[Depends(RateLimiter(times=30, seconds=60))])
 async def get_me(
-        current_user: User = Depends(get_current_active_user)
+        db: AsyncSession = Depends(get_db),
+        current_user: Principal = Depends(get_current_active_user)
 ) -> Any:
     """
-    The get_me function returns the current user.
+    The get_me function returns the profile of the current user.
 
-    :param current_user: User: Get the current user
+    :param db: AsyncSession: Get the database session
+    :param current_user: Principal: Get the current user
     :return: The current user object
     """
-    return current_user
+    return await repository_users.get_user_by_id(current_user.id, db)
 
 
 @router.patch("/avatar", response_model=user_schemas.UserPublic,
@@ -37,31 +41,27 @@ async def get_me(
 async def update_avatar(
         file: UploadFile = File(),
         db: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        current_user: Principal = Depends(get_current_active_user)
 ) -> Any:
     """
     The update_avatar function updates the avatar of a user.
 
     :param file: UploadFile: Get the file that is uploaded
     :param db: AsyncSession: Get the database session
-    :param current_user: User: Get the current user
+    :param current_user: Principal: Get the current user
     :return: The updated user object
     """
-    link, public_id = current_user.avatar.rsplit('/', maxsplit=1)
-    if not link.endswith(settings.cloudinary_folder):
-        public_id = None
-
-    loop = asyncio.get_event_loop()
-    image = await loop.run_in_executor(
-        None, cloudinary.upload_image, file.file, public_id
-    )
+    # The new avatar gets a new file, the previous one is removed in the background once the change is committed
+    await read_image_info(file)
+    image = await upload_pool.run(cloudinary.upload_image, file.file)
 
     if image is None:
         raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Invalid image file")
 
     avatar = cloudinary.formatting_image_url(image['public_id'], cloudinary.FORMAT_AVATAR, image['version'])
 
-    return await repository_users.update_avatar(current_user.id, avatar['url'], db)
+    async with discard_uploads_on_failure([image['public_id']], db):
+        return await repository_users.update_avatar(current_user.id, avatar['url'], db)
 
 
 @router.patch("/email", response_model=user_schemas.UserPublic,
@@ -69,7 +69,7 @@ async def update_avatar(
 async def update_email(
         body: user_schemas.EmailModel,
         db: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        current_user: Principal = Depends(get_current_active_user)
 ) -> Any:
     """
     The update_email function updates the email of a user.
@@ -78,7 +78,7 @@ async def update_email(
 
     :param body: EmailModel: Get the email from the request body
     :param db: AsyncSession: Get the database session
-    :param current_user: User: Get the current user from the database
+    :param current_user: Principal: Get the current user from the database
     :return: A user object
     """
     updated_user = await repository_users.update_email(current_user.id, body.email, db)
@@ -94,20 +94,22 @@ async def update_email(
 async def update_password(
         body: user_schemas.UserPasswordUpdate,
         db: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        current_user: Principal = Depends(get_current_active_user)
 ) -> Any:
     """
     The update_password function updates the password of a user.
 
     :param body: UserPasswordUpdate: Get the old and new password from the request body
     :param db: AsyncSession: Get the database session
-    :param current_user: User: Get the user object from the database
+    :param current_user: Principal: Get the user object from the database
     :return: A json response with the updated user
     """
-    if not AuthService.verify_password(body.old_password, current_user.password):
+    user = await repository_users.get_user_by_id(current_user.id, db)
+
+    if not await AuthService.verify_password(body.old_password, user.password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid old password")
 
-    password = AuthService.get_password_hash(body.new_password)
+    password = await AuthService.get_password_hash(body.new_password)
 
     return await repository_users.update_password(current_user.id, password, db)
 
@@ -120,14 +122,14 @@ async def update_password(
 async def change_user_role(
         body: user_schemas.ChangeRole,
         db: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        current_user: Principal = Depends(get_current_active_user)
 ) -> Any:
     """
     The change_user_role function is used to change the role of a user.
 
     :param body: user_schemas.ChangeRole: Validate the request body
     :param db: AsyncSession: Pass the database session to the repository layer
-    :param current_user: User: Get the current user
+    :param current_user: Principal: Get the current user
     :return: A dictionary with the user_id and role
     """
     user = await repository_users.get_user_by_id(body.user_id, db)
@@ -143,8 +145,8 @@ async def change_user_role(
             dependencies=[Depends(RateLimiter(times=10, seconds=60))])
 async def get_user_profile(
         username: str,
-        db: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        db: AsyncSession = Depends(get_read_db),
+        current_user: Principal = Depends(get_current_active_user)
 ) -> Any:
     """
     The get_user_profile function is a GET endpoint that returns the user profile of a given username.
@@ -153,7 +155,7 @@ async def get_user_profile(
 
     :param username: str: Get the username from the url
     :param db: AsyncSession: Pass the database session to the function
-    :param current_user: User: Get the current user
+    :param current_user: Principal: Get the current user
     :return: A userprofile object
     """
     user_profile = await repository_users.get_user_profile_by_username(username, db)
@@ -167,14 +169,14 @@ async def get_user_profile(
 async def update_user_profile(
         body: user_schemas.ProfileUpdate,
         db: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_active_user)
+        current_user: Principal = Depends(get_current_active_user)
 ) -> Any:
     """
     The update_user_profile function updates the user's profile.
 
     :param body: ProfileUpdate: Pass the data from the request body to this function
     :param db: AsyncSession: Pass the database session to the repository layer
-    :param current_user: User: Get the current user from the database
+    :param current_user: Principal: Get the current user from the database
     :return: A dictionary with the updated user information
     """
     if body.username and await repository_users.get_user_by_username(username=body.username, db=db):
@@ -190,19 +192,21 @@ async def update_user_profile(
 async def ban_user(
         user_id: int,
         db: AsyncSession = Depends(get_db),
-        current_user: UserRole = Depends(get_current_active_user)
+        current_user: Principal = Depends(get_current_active_user)
 ) -> Any:
     """
     The ban_user function is used to ban a user.
     :param user_id: int: Specify the user id of the user to be banned
     :param db: AsyncSession: Pass the database session to the function
-    :param current_user: UserRole: Get the current user's role
+    :param current_user: Principal: Get the current user
     :return: A dictionary with a message, which is not the right way to return data
     """
     user = await repository_users.get_user_by_id(user_id, db)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
+    await AuthService.revoke_user_tokens(user.id, user.email)
+
     return await repository_users.user_update_is_active(user, False, db)
 
 
@@ -210,14 +214,14 @@ async def ban_user(
 async def unban_user(
         user_id: int,
         db: AsyncSession = Depends(get_db),
-        current_user: UserRole = Depends(get_current_active_user)
+        current_user: Principal = Depends(get_current_active_user)
 ) -> Any:
     """
     The unban_user function is used to unban a user.
 
     :param user_id: int: Get the user id from the request
     :param db: AsyncSession: Get the database connection
-    :param current_user: UserRole: Get the current user from the database
+    :param current_user: Principal: Get the current user from the database
     :return: A dict
     """
     user = await repository_users.get_user_by_id(user_id, db)
@@ -1,3 +1,6 @@
+from enum import Enum
+from typing import Optional
+
 from pydantic import utils, root_validator
 
 from .core import CoreModel, IDModelMixin, DateTimeModelMixin
@@ -16,7 +19,8 @@ class ImageBase(CoreModel):
 
     @root_validator(pre=True)
     def update_model(cls, values: utils.GetterDict):
-        if 'url' not in values.keys():
+        # GetterDict.keys() runs dir() on the ORM object, get() is a single getattr
+        if values.get('url') is None:
             values._obj.url = cls.format_url(values._obj.public_id)  # noqa
         return values
 
@@ -25,7 +29,20 @@ class ImageBase(CoreModel):
         return formatting_image_url(public_id)['url']
 
 
+class TagsMode(str, Enum):
+    all = 'all'
+    any = 'any'
+
+
+class ImagesSort(str, Enum):
+    newest = 'newest'
+    rating = 'rating'
+
+
 class ImagePublic(DateTimeModelMixin, ImageBase, IDModelMixin):
+    rating_count: int
+    rating_avg: float
+
     class Config:
         orm_mode = True
 
@@ -35,5 +52,17 @@ class ImageCreateResponse(CoreModel):
     message: str = "Image successfully uploaded"
 
 
+class ImageUploadResult(CoreModel):
+    filename: Optional[str]
+    status_code: int
+    image: Optional[ImagePublic] = None
+    detail: Optional[str] = None
+
+
+class ImagesBulkCreateResponse(CoreModel):
+    images: list[ImageUploadResult]
+    message: str
+
+
 class ImageRemoveResponse(CoreModel):
     message: str = "Image successfully deleted"
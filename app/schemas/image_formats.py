@@ -27,7 +27,8 @@ class FormattedImageBase(CoreModel):
 
     @root_validator(pre=True)
     def update_model(cls, values: utils.GetterDict):
-        if 'url' not in values.keys():
+        # GetterDict.keys() runs dir() on the ORM object, get() is a single getattr
+        if values.get('url') is None:
             values._obj.url = cls.format_url(values._obj.public_id, values._obj.format)  # noqa
         return values
 
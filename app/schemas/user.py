@@ -64,6 +64,8 @@ class UserProfile(IDModelMixin):
     last_name: str
     avatar: str
     number_of_images: int
+    number_of_comments: int
+    number_of_ratings: int
     created_at: datetime
 
     class Config:
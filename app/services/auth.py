@@ -1,33 +1,43 @@
-import pickle
+import hashlib
+import time
 from calendar import timegm
 from datetime import datetime, timedelta
 from typing import Optional
+from uuid import uuid4
 
-import redis as redis_db
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.database.cache import redis_client
 from app.database.connect import get_db
 from app.repository import users as repository_users
-from app.database.models import User
+from app.services.password_hasher import password_hasher
+from app.services.principal import Principal
+from app.services.user_cache import UserCache
+from app.utils.cache import TTLCache
 from config import settings
 
 
 class AuthService:
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    password_hasher = password_hasher
     SECRET_KEY = settings.secret_key_jwt
     ALGORITHM = settings.algorithm
+    REFRESH_TOKEN_TTL = 7 * 24 * 60 * 60
     oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
-    redis = redis_db.Redis(host=settings.redis_host, port=settings.redis_port, db=0, password=settings.redis_password)
+    redis = redis_client
+    token_cache = TTLCache(
+        max_items=settings.token_cache_max_items,
+        max_bytes=settings.token_cache_max_bytes,
+        ttl=settings.token_cache_ttl,
+    )
 
     @classmethod
-    def verify_password(cls, plain_password, hashed_password) -> bool:
+    async def verify_password(cls, plain_password, hashed_password) -> bool:
         """
         The verify_password function takes a plain-text password and hashed password as arguments.
-        It then uses the verify method of the pwd_context object to check if they match.
+        The bcrypt check runs in the password hasher process pool, so it never blocks the event loop.
         The result is returned as a boolean value.
 
         :param cls: Represent the class itself
@@ -35,19 +45,19 @@ class AuthService:
         :param hashed_password: Check if the password is hashed
         :return: True if the plain_password matches the hashed_password
         """
-        return cls.pwd_context.verify(plain_password, hashed_password)
+        return await cls.password_hasher.verify(plain_password, hashed_password)
 
     @classmethod
-    def get_password_hash(cls, password: str) -> str:
+    async def get_password_hash(cls, password: str) -> str:
         """
         The get_password_hash function takes a password as input and returns the hashed version of that password.
-        The hashing algorithm used is PBKDF2, which is considered secure for most applications.
+        The bcrypt hashing runs in the password hasher process pool, so it never blocks the event loop.
 
         :param cls: Represent the class itself
         :param password: str: Pass in the password that is being hashed
         :return: A hashed password
         """
-        return cls.pwd_context.hash(password)
+        return await cls.password_hasher.hash(password)
 
     @classmethod
     def __decode_jwt(cls, token: str) -> dict:
@@ -61,12 +71,90 @@ class AuthService:
         """
         return jwt.decode(token, cls.SECRET_KEY, algorithms=[cls.ALGORITHM])
 
+    @staticmethod
+    def token_digest(token: str) -> bytes:
+        """
+        The token_digest function returns the key of a token in the decode cache,
+        so the cache never holds the bearer tokens themselves.
+
+        :param token: str: The encoded jwt
+        :return: The sha256 digest of the token
+        """
+        return hashlib.sha256(token.encode('utf-8')).digest()
+
+    @classmethod
+    def token_id(cls, payload: dict, token: str) -> str:
+        """
+        The token_id function returns the id the blacklist knows a token by.
+        Tokens issued before the jti claim existed are identified by their digest.
+
+        :param cls: Represent the class itself
+        :param payload: dict: The decoded payload of the token
+        :param token: str: The encoded jwt
+        :return: The jti of the token
+        """
+        return payload.get('jti') or cls.token_digest(token).hex()
+
+    @classmethod
+    def is_revoked(cls, payload: dict, blacklisted: int, valid_after: Optional[bytes]) -> bool:
+        """
+        The is_revoked function tells whether a token was revoked, either on its own (logout, used reset link)
+        or together with every other token of the user issued before the "tokens valid after" timestamp.
+
+        :param cls: Represent the class itself
+        :param payload: dict: The decoded payload of the token
+        :param blacklisted: int: The EXISTS reply for the jti of the token
+        :param valid_after: Optional[bytes]: The "tokens valid after" timestamp of the user, if any
+        :return: True if the token can no longer be used
+        """
+        if blacklisted:
+            return True
+
+        # Both are whole seconds: a token issued in the second of the revocation stays valid
+        return valid_after is not None and payload.get('iat', 0) < int(valid_after)
+
+    @staticmethod
+    def valid_after_key(payload: dict) -> str:
+        """
+        The valid_after_key function returns the Redis key of the "tokens valid after" timestamp that applies to a token.
+        Tokens are matched by the id of their user, so a revocation survives a change of email;
+        the tokens without a uid claim (refresh tokens, which have to fit the refresh_token column,
+        and tokens issued before the claim existed) fall back to their email.
+
+        :param payload: dict: The decoded payload of the token
+        :return: The redis key
+        """
+        uid = payload.get('uid')
+        return f"tokens-valid-after:{uid}" if uid is not None else f"tokens-valid-after:{payload.get('sub')}"
+
+    @classmethod
+    def __decode_access_jwt(cls, token: str) -> dict:
+        """
+        The __decode_access_jwt function decodes a bearer token, verifying its signature only the first time
+        this worker sees it. Verified payloads are cached by token digest until the token expires.
+
+        :param cls: Represent the class itself
+        :param token: str: Pass the token to the function
+        :return: The verified payload of the token
+        """
+        digest = cls.token_digest(token)
+        payload = cls.token_cache.get(digest)
+
+        if payload is None:
+            payload = cls.__decode_jwt(token)
+            expires_in = payload.get('exp', 0) - time.time()
+            if expires_in > 0:
+                cls.token_cache.set(digest, payload, len(token), ttl=min(expires_in, cls.token_cache.ttl))
+
+        return payload
+
     @classmethod
     def __encode_jwt(cls, data: dict, iat: datetime, exp: datetime, scope: str) -> str:
         """
         The __encode_jwt function takes in a dictionary of data, an issued at time (iat),
         an expiration time (exp), and a scope. It then creates a copy of the data dictionary
-        and adds the iat, exp, and scope to it. Finally it returns the encoded JWT.
+        and adds the iat, exp, scope and a unique token id (jti) to it. Finally it returns the encoded JWT.
+        Refresh tokens get no jti: they are stored in users.refresh_token and are identified by their digest.
 
         :param cls: Represent the class itself
         :param data: dict: Pass in the data that will be encoded into the jwt
@@ -77,6 +165,8 @@ class AuthService:
         """
         to_encode = data.copy()
         to_encode.update({"iat": iat, "exp": exp, "scope": scope})
+        if scope != "refresh_token":
+            to_encode["jti"] = uuid4().hex
 
         return jwt.encode(to_encode, cls.SECRET_KEY, algorithm=cls.ALGORITHM)
 
@@ -106,9 +196,7 @@ class AuthService:
         :param expires_delta: Optional[float]: Set the time to live for the refresh token
         :return: A jwt token
         """
-        expire = datetime.utcnow() + (
-            timedelta(seconds=expires_delta) if expires_delta else timedelta(days=7)
-        )
+        expire = datetime.utcnow() + timedelta(seconds=expires_delta or cls.REFRESH_TOKEN_TTL)
         return cls.__encode_jwt(data, datetime.utcnow(), expire, "refresh_token")
 
     @classmethod
@@ -153,16 +241,17 @@ class AuthService:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Could not validate credentials')
 
     @classmethod
-    async def get_current_user(cls, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> User:
+    async def get_current_user(cls, token: str = Depends(oauth2_scheme),
+                               db: AsyncSession = Depends(get_db)) -> Principal:
         """
         The get_current_user function is a dependency that will be used in the
-            UserRouter class. It takes an access token as input and returns the user
-            associated with that token. If no user is found, it raises an exception.
+            UserRouter class. It takes an access token as input and returns the principal
+            of the user associated with that token. If no user is found, it raises an exception.
 
         :param cls: Represent the class itself
         :param token: str: Get the token from the request header
         :param db: AsyncSession: Get the database session
-        :return: The user object that matches the email in the jwt
+        :return: The principal of the user that matches the uid (or the email of older tokens) in the jwt
         """
         credentials_exception = HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -172,31 +261,50 @@ class AuthService:
 
         try:
             # Decode JWT
-            payload = cls.__decode_jwt(token)
+            payload = cls.__decode_access_jwt(token)
 
             if payload.get('scope') == 'access_token':
                 email = payload.get("sub")
-                if email is None or await cls.token_is_blacklist(email, token):
+                user_id = payload.get("uid")
+                if email is None:
                     raise credentials_exception
             else:
                 raise credentials_exception
         except JWTError as e:
             raise credentials_exception
 
-        user = cls.redis.get(f"user:{email}")
-        if user is None:
+        principal = UserCache.get_local(user_id) if user_id is not None else None
+
+        # Revocation checks and cached user lookup (on a local miss) share a single round trip
+        pipe = cls.redis.pipeline(transaction=False)
+        pipe.exists(f"black-list:{cls.token_id(payload, token)}")
+        pipe.get(cls.valid_after_key(payload))
+        if user_id is not None and principal is None:
+            pipe.get(UserCache.key(user_id))
+        blacklisted, valid_after, *snapshot = await pipe.execute()
+
+        if cls.is_revoked(payload, blacklisted, valid_after):
+            cls.token_cache.pop(cls.token_digest(token))
+            raise credentials_exception
+
+        if snapshot:
+            principal = UserCache.load(snapshot[0])
+        if principal is None:
 
-            user = await repository_users.get_user_by_email(email, db)
+            if user_id is not None:
+                user = await repository_users.get_user_by_id(user_id, db)
+            else:
+                # Tokens issued before the uid claim existed
+                user = await repository_users.get_user_by_email(email, db)
             if user is None:
                 raise credentials_exception
 
-            cls.redis.set(f"user:{email}", pickle.dumps(user))
-            cls.redis.expire(f"user:{email}", 900)
+            principal = await UserCache.fill(user)
 
-        else:
-            user = pickle.loads(user)
+        # Lets the request find out who wrote, for the read-your-writes routing
+        db.info["user_id"] = principal.id
 
-        return user
+        return principal
 
     @classmethod
     async def get_email_from_token(cls, token: str) -> str:
@@ -223,55 +331,70 @@ class AuthService:
                                 detail="Invalid token for email verification")
 
     @classmethod
-    async def token_is_blacklist(cls, email: str, jwt_token: str) -> bool:
+    async def token_is_blacklist(cls, jwt_token: str) -> bool:
         """
-        The token_is_blacklist function checks if the access token is in the blacklist.
-            Args:
-                email (str): The user's email address.
-                token (str): The user's access token.
+        The token_is_blacklist function checks if a token was revoked.
+        Both the blacklist entry of the token and the "tokens valid after" timestamp of its owner
+        are read in one round trip, and the lookup is by the short jti instead of the whole jwt.
 
         :param cls: Represent the class itself
-        :param email: str: Get the token from redis, and the token: str parameter is used to check if it matches
-        :param jwt_token: str: Check if the token is blacklisted
+        :param jwt_token: str: The token to check
         :return: A boolean value
         """
-        rd_token = cls.redis.get(f"black-list:{email}")
+        payload = cls.__decode_jwt(jwt_token)
 
-        if rd_token and jwt_token == rd_token.decode('utf-8'):
-            return True
+        pipe = cls.redis.pipeline(transaction=False)
+        pipe.exists(f"black-list:{cls.token_id(payload, jwt_token)}")
+        pipe.get(cls.valid_after_key(payload))
+        blacklisted, valid_after = await pipe.execute()
 
-        return False
+        return cls.is_revoked(payload, blacklisted, valid_after)
 
     @classmethod
     async def add_token_to_blacklist(cls, jwt_token: str) -> None:
         """
-        The logout function takes an access token and adds it to the black list.
-        The function first decodes the JWT, then gets the email from it.
-        It also calculates how many seconds are left until expiration of that token.
-        Then, we add a key-value pair to Redis where the key is "black-list:{email}" and
-        the value is "access_token". We set an expiration time on this key equal to
-        the number of seconds remaining until expiration.
+        The add_token_to_blacklist function takes a token and adds its jti to the black list.
+        Every token has its own "black-list:{jti}" key that expires together with the token,
+        so logging out of one session never un-revokes another.
 
         :param cls: Represent the class itself
-        :param jwt_token: str: Get the email from the token
+        :param jwt_token: str: The token to revoke
         :return: None
         """
         payload = cls.__decode_jwt(jwt_token)
-
-        email: str = payload.get('sub')
         expire_seconds = payload.get('exp') - timegm(datetime.utcnow().utctimetuple())
 
-        cls.redis.set(f"black-list:{email}", jwt_token.encode('utf-8'))
-        cls.redis.expire(f"black-list:{email}", expire_seconds)
-        
+        await cls.redis.set(f"black-list:{cls.token_id(payload, jwt_token)}", 1, ex=max(expire_seconds, 1))
+        cls.token_cache.pop(cls.token_digest(jwt_token))
+
+    @classmethod
+    async def revoke_user_tokens(cls, user_id: int, email: str) -> None:
+        """
+        The revoke_user_tokens function revokes every token of the user issued so far.
+        It stores a "tokens valid after" timestamp, in whole seconds like the iat claim, that outlives
+        the longest-lived token, the refresh token. The timestamp is kept under the user id and, for the tokens
+        without a uid claim, under the current email.
+
+        :param cls: Represent the class itself
+        :param user_id: int: The id of the user, the uid claim of its tokens
+        :param email: str: The email of the user, the sub claim of its tokens
+        :return: None
+        """
+        valid_after = int(time.time())
+
+        pipe = cls.redis.pipeline(transaction=False)
+        pipe.set(cls.valid_after_key({"uid": user_id}), valid_after, ex=cls.REFRESH_TOKEN_TTL)
+        pipe.set(cls.valid_after_key({"sub": email}), valid_after, ex=cls.REFRESH_TOKEN_TTL)
+        await pipe.execute()
+
 
-async def get_current_active_user(current_user: User = Depends(AuthService.get_current_user)) -> User:
+async def get_current_active_user(current_user: Principal = Depends(AuthService.get_current_user)) -> Principal:
     """
-    The get_current_active_user function is a dependency that returns the current user,
+    The get_current_active_user function is a dependency that returns the principal of the current user,
     if it exists and is active. If not, an HTTPException with status code 400 (Bad Request)
     is raised.
 
-    :param current_user: User: Pass the user object to the function
+    :param current_user: Principal: Pass the principal of the user to the function
     :return: The current_user if it is active
     """
     if not current_user.is_active:
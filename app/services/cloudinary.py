@@ -1,10 +1,12 @@
 import uuid
 import enum
+from functools import lru_cache
 
 from typing import BinaryIO, Optional
 
 import cloudinary
-from cloudinary.uploader import upload
+import cloudinary.api
+import cloudinary.uploader
 from pydantic import BaseModel
 
 from config import settings
@@ -97,22 +99,45 @@ class CroppingOrResizingTransformation(BaseModel):
 def upload_image(file: BinaryIO, public_id: Optional[str] = None) -> Optional[dict]:
     """
     The upload_image function uploads an image to Cloudinary.
+    The file is streamed in chunks of cloudinary_upload_chunk_size, one request each,
+    so only a single chunk is held in memory however large the file is.
 
     :param file: BinaryIO: Pass the image file to be uploaded
     :param public_id: Optional[str]: Set a custom name for the image
-    :return: A tuple of three values:
+    :return: A dictionary with the url, public_id and version of the image, None if the upload failed
     """
     try:
-        image = cloudinary.uploader.upload_image(
-            file=file,
+        image = cloudinary.uploader.upload_large(
+            file,
+            resource_type="image",
             public_id=public_id or uuid.uuid4().hex,
             folder=settings.cloudinary_folder,
-            owerwrite=True,
+            overwrite=True,
+            chunk_size=settings.cloudinary_upload_chunk_size,
         )
     except cloudinary.exceptions.Error:
         return
 
-    return {'url': image.url, 'public_id': image.public_id, 'version': image.version}
+    if image is None:
+        # Empty file
+        return
+
+    return {'url': image['secure_url'], 'public_id': image['public_id'], 'version': image['version']}
+
+
+@lru_cache(maxsize=settings.cloudinary_url_cache_size)
+def build_image_url(public_id: str, transformation: tuple, version: Optional[str] = None) -> str:
+    """
+    The build_image_url function builds the delivery url of an image, memoized by its arguments.
+    The url only depends on them and on the static Cloudinary config, so a page of images
+    usually skips the CloudinaryImage construction entirely.
+
+    :param public_id: str: Specify the public_id of the image
+    :param transformation: tuple: The items of the transformation, sorted by name
+    :param version: Optional[str]: Specify the version of the image to be used
+    :return: The url of the image
+    """
+    return cloudinary.CloudinaryImage(public_id=public_id, version=version, url_options=dict(transformation)).url
 
 
 def formatting_image_url(public_id: str,
@@ -129,29 +154,43 @@ def formatting_image_url(public_id: str,
     """
     if isinstance(transformation, CroppingOrResizingTransformation):
         transformation = transformation.dict()
+    transformation = transformation or {}
 
-    image = cloudinary.CloudinaryImage(
-        public_id=public_id,
-        version=version,
-        url_options=transformation
-    )
+    try:
+        url = build_image_url(public_id, tuple(sorted(transformation.items())), version)
+    except TypeError:
+        # Nested (unhashable) transformation values can't be memoized
+        url = build_image_url.__wrapped__(public_id, tuple(sorted(transformation.items())), version)
+
+    return {'url': url, 'format': transformation}
 
-    return {'url': image.url, 'format': image.url_options}
 
+def get_public_id(url: str) -> Optional[str]:
+    """
+    The get_public_id function finds the public id of a file uploaded by the application from its url.
 
-def remove_image(public_id: str) -> bool:
+    :param url: str: The url of the image, as built by formatting_image_url
+    :return: The public id, None if the file isn't in the folder of the application (e.g. a gravatar)
     """
-    The remove_image function takes in a public_id string and returns True if the image was successfully removed from
-    Cloudinary. If the image is not found, or there is an error removing it, False will be returned.
+    link, name = url.rsplit('/', maxsplit=1)
+
+    return f"{settings.cloudinary_folder}/{name}" if link.endswith(settings.cloudinary_folder) else None
+
 
-    :param public_id: str: Specify the public id of the image to be deleted
-    :return: A boolean value indicating whether the image was successfully removed
+def remove_images(public_ids: list[str]) -> list[str]:
     """
-    result = cloudinary.uploader.destroy(public_id=public_id)
-    if result['result'] == "ok":
-        return True
+    The remove_images function removes up to 100 images from Cloudinary in a single Admin API call.
+    Images that are already missing count as removed.
+
+    :param public_ids: list[str]: Specify the public ids of the images to be deleted
+    :return: The public ids that are gone, empty if the call failed
+    """
+    try:
+        result = cloudinary.api.delete_resources(public_ids, resource_type="image")
+    except cloudinary.exceptions.Error:
+        return []
 
-    return False
+    return [public_id for public_id, state in result['deleted'].items() if state in ("deleted", "not_found")]
 
 
 FORMAT_AVATAR = CroppingOrResizingTransformation(
@@ -21,7 +21,7 @@ conf = ConnectionConfig(
 )
 
 
-async def send_email_reset_password(email: EmailStr, username: str, host: str) -> None:
+async def send_email_reset_password(email: EmailStr, username: str, host: str, user_id: int) -> None:
     """
     The send_email_reset_password function sends an email to the user with a link to reset their password.
         Args:
@@ -32,10 +32,11 @@ async def send_email_reset_password(email: EmailStr, username: str, host: str) -
     :param email: EmailStr: Get the email address of the user and send an email to that address
     :param username: str: Get the username of the user who is requesting a password reset
     :param host: str: Create the link to reset password
+    :param user_id: int: Bind the link to the user, so revoking the user's tokens revokes it too
     :return: None
     """
     try:
-        token_verification = await AuthService.create_email_token({"sub": email})
+        token_verification = await AuthService.create_email_token({"sub": email, "uid": user_id})
 
         message = MessageSchema(
             subject="Reset password ",
@@ -50,7 +51,7 @@ async def send_email_reset_password(email: EmailStr, username: str, host: str) -
         print(err)
 
 
-async def send_email_confirmed(email: EmailStr, username: str, host: str) -> None:
+async def send_email_confirmed(email: EmailStr, username: str, host: str, user_id: int) -> None:
     """
     The send_email_confirmed function sends an email to the user with a link to confirm their email address.
         The function takes in three parameters:
@@ -61,10 +62,11 @@ async def send_email_confirmed(email: EmailStr, username: str, host: str) -> Non
     :param email: EmailStr: Specify the email address of the user
     :param username: str: Pass the username to the template
     :param host: str: Pass the hostname of the server to the template
+    :param user_id: int: Bind the link to the user, so revoking the user's tokens revokes it too
     :return: Nothing
     """
     try:
-        token_verification = await AuthService.create_email_token({"sub": email})
+        token_verification = await AuthService.create_email_token({"sub": email, "uid": user_id})
 
         message = MessageSchema(
             subject="Confirm your email ",
@@ -0,0 +1,146 @@
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Optional
+
+from passlib.context import CryptContext
+
+from config import settings
+
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def hash_password(password: str) -> str:
+    """
+    The hash_password function hashes a password with bcrypt. It runs in a worker process.
+
+    :param password: str: The plain-text password
+    :return: A hashed password
+    """
+    return pwd_context.hash(password)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """
+    The verify_password function checks a password against a bcrypt hash. It runs in a worker process.
+
+    :param plain_password: str: The password entered by the user
+    :param hashed_password: str: The stored hash
+    :return: True if the password matches the hash
+    """
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+class PasswordHasher:
+    """
+    Bounded process pool for bcrypt
+
+    bcrypt is deliberately slow, so it runs outside the event loop in worker processes. At most
+    max_concurrency calls are handed to the pool at a time; the rest wait on a semaphore, and the
+    depth of that queue is what stats reports as waiting.
+    """
+
+    def __init__(self, max_workers: Optional[int], max_concurrency: int) -> None:
+        """
+        The __init__ function sets the size of the pool and the concurrency cap.
+        The worker processes are only started by the first call.
+
+        :param self: Represent the instance of the object itself
+        :param max_workers: Optional[int]: Number of worker processes, the number of CPUs if None
+        :param max_concurrency: int: Maximum number of calls submitted to the pool at a time
+        :return: Nothing
+        """
+        self.max_workers = max_workers
+        self.max_concurrency = max_concurrency
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.waiting = 0
+        self.running = 0
+        self.peak_waiting = 0
+        self.completed = 0
+        self.wait_time = 0.0
+
+    async def run(self, func: Callable, *args):
+        """
+        The run function calls func in the pool once a slot under the concurrency cap is free.
+
+        :param self: Represent the instance of the object itself
+        :param func: Callable: A module-level function, so it can be sent to the worker processes
+        :param args: Arguments of func
+        :return: The result of func
+        """
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        self.peak_waiting = max(self.peak_waiting, self.waiting)
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.wait_time += time.perf_counter() - queued_at
+
+        self.running += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self.running -= 1
+            self.completed += 1
+            self.semaphore.release()
+
+    async def hash(self, password: str) -> str:
+        """
+        The hash function hashes a password in the pool.
+
+        :param self: Represent the instance of the object itself
+        :param password: str: The plain-text password
+        :return: A hashed password
+        """
+        return await self.run(hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """
+        The verify function checks a password against a hash in the pool.
+
+        :param self: Represent the instance of the object itself
+        :param plain_password: str: The password entered by the user
+        :param hashed_password: str: The stored hash
+        :return: True if the password matches the hash
+        """
+        return await self.run(verify_password, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        """
+        The stats function returns the queue depth and throughput counters of the pool.
+
+        :param self: Represent the instance of the object itself
+        :return: A dictionary with the counters
+        """
+        return {
+            "workers": self.max_workers,
+            "max_concurrency": self.max_concurrency,
+            "running": self.running,
+            "waiting": self.waiting,
+            "peak_waiting": self.peak_waiting,
+            "completed": self.completed,
+            "avg_wait_ms": self.wait_time / self.completed * 1000 if self.completed else 0.0,
+        }
+
+    def shutdown(self) -> None:
+        """
+        The shutdown function stops the worker processes.
+
+        :param self: Represent the instance of the object itself
+        :return: Nothing
+        """
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+
+password_hasher = PasswordHasher(
+    max_workers=settings.password_hash_workers,
+    max_concurrency=settings.password_hash_concurrency,
+)
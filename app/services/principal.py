@@ -0,0 +1,73 @@
+import json
+from dataclasses import dataclass
+from typing import Optional
+
+from app.database.models import User, UserRole
+
+
+SNAPSHOT_VERSION = 1
+
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """
+    Lightweight snapshot of the authenticated user
+
+    Holds only the fields that auth and the routes read on every request, so it can be cached
+    and shared without keeping a SQLAlchemy instance (and its session state) alive.
+    """
+    id: int
+    role: UserRole
+    is_active: bool
+    email_verified: bool
+    avatar: Optional[str] = None
+
+    @classmethod
+    def from_user(cls, user: User) -> 'Principal':
+        """
+        The from_user function builds a principal from a User entity.
+
+        :param user: User: The user loaded from the database
+        :return: A principal object
+        """
+        return cls(
+            id=user.id,
+            role=UserRole(user.role),
+            is_active=user.is_active,
+            email_verified=user.email_verified,
+            avatar=user.avatar,
+        )
+
+
+def dump_principal(principal: Principal) -> bytes:
+    """
+    The dump_principal function serializes a principal into a compact, versioned JSON array.
+
+    :param principal: Principal: The principal to serialize
+    :return: The serialized snapshot
+    """
+    return json.dumps(
+        [SNAPSHOT_VERSION, principal.id, principal.role.value, principal.is_active, principal.email_verified,
+         principal.avatar],
+        separators=(',', ':'),
+    ).encode('utf-8')
+
+
+def load_principal(data: bytes) -> Optional[Principal]:
+    """
+    The load_principal function restores a principal serialized by dump_principal.
+    Snapshots written by another version of the format are treated as missing, so a deploy
+    never has to flush the cache.
+
+    :param data: bytes: The serialized snapshot
+    :return: A principal object, or None if the snapshot can't be read
+    """
+    try:
+        version, *fields = json.loads(data)
+        if version != SNAPSHOT_VERSION:
+            return
+
+        user_id, role, is_active, email_verified, avatar = fields
+        return Principal(user_id, UserRole(role), is_active, email_verified, avatar)
+    except (ValueError, TypeError):
+        return
@@ -0,0 +1,91 @@
+from typing import Optional
+
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import connect
+from app.database.cache import redis_client
+from app.services.auth import Principal, get_current_active_user
+from config import settings
+
+
+class ReadYourWrites:
+    """
+    Routing of the reads of the users who have just written
+
+    A replica lags behind the primary, so a user who has just changed something could read the old
+    version back. Every request that commits marks its user in Redis for a few seconds, and during that
+    window get_read_db gives them the primary instead of the replica.
+    """
+    redis = redis_client
+    window = settings.db_replica_sticky_seconds
+
+    @staticmethod
+    def key(user_id: int) -> str:
+        """
+        The key function returns the Redis key of the mark of a user.
+
+        :param user_id: int: Identify the user
+        :return: The redis key
+        """
+        return f"read-primary:{user_id}"
+
+    @classmethod
+    async def mark(cls, user_id: int) -> None:
+        """
+        The mark function sends the reads of the user to the primary for the next window seconds.
+
+        :param cls: Represent the class itself
+        :param user_id: int: Identify the user who has written
+        :return: Nothing
+        """
+        await cls.redis.set(cls.key(user_id), 1, ex=cls.window)
+
+    @classmethod
+    async def is_marked(cls, user_id: int) -> bool:
+        """
+        The is_marked function checks whether the user has written within the last window seconds.
+
+        :param cls: Represent the class itself
+        :param user_id: int: Identify the user
+        :return: True if the reads of the user must go to the primary
+        """
+        return bool(await cls.redis.exists(cls.key(user_id)))
+
+    @classmethod
+    async def after_request(cls, db: Optional[AsyncSession]) -> None:
+        """
+        The after_request function marks the user of a request whose session has committed.
+        It does nothing without a replica.
+
+        :param cls: Represent the class itself
+        :param db: Optional[AsyncSession]: The primary session of the request, if it opened one
+        :return: Nothing
+        """
+        if connect.AsyncReadSessionLocal is None or db is None:
+            return
+
+        user_id = db.info.get("user_id")
+        if user_id is not None and db.info.get("committed"):
+            await cls.mark(user_id)
+
+
+async def get_read_db(
+        current_user: Principal = Depends(get_current_active_user),
+        db: AsyncSession = Depends(connect.get_db),
+):
+    """
+    The get_read_db function is a dependency that returns a session for the read-only routes.
+    The session reads from the replica, unless there is none or the user has just written;
+    then it is the primary session the request already holds.
+
+    :param current_user: Principal: The user making the request
+    :param db: AsyncSession: The primary session of the request
+    :return: A database session
+    """
+    if connect.AsyncReadSessionLocal is None or await ReadYourWrites.is_marked(current_user.id):
+        yield db
+        return
+
+    async with connect.AsyncReadSessionLocal() as session:
+        yield session
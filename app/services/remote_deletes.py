@@ -0,0 +1,94 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.connect import AsyncSessionLocal
+from app.repository import remote_deletes as repository_remote_deletes
+from app.services import cloudinary
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def discard_uploads_on_failure(public_ids: list[str], db: AsyncSession) -> AsyncIterator[None]:
+    """
+    The discard_uploads_on_failure function guards the write that references files just uploaded to Cloudinary.
+    If the block fails, the files would be referenced by nothing: the transaction is rolled back
+    and they are queued for removal in a new one. When even that fails, e.g. the database is down,
+    they are removed from Cloudinary right away.
+
+    :param public_ids: list[str]: The public ids of the files uploaded by the request, read when the block fails
+    :param db: AsyncSession: The session of the write
+    :return: Nothing, the exception of the block is raised again
+    """
+    try:
+        yield
+    except Exception:
+        if public_ids:
+            try:
+                await db.rollback()
+                await repository_remote_deletes.enqueue_remote_deletes(public_ids, db)
+                await db.commit()
+            except (SQLAlchemyError, OSError):
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, cloudinary.remove_images, public_ids)
+        raise
+
+
+async def remove_pending_files(db: AsyncSession, batch_size: int = settings.remote_deletes_batch_size) -> int:
+    """
+    The remove_pending_files function removes one batch of queued files from Cloudinary.
+    The rows of the removed files, and of the files still used by an image, are deleted;
+    the others are retried later with a backoff.
+
+    :param db: AsyncSession: Pass the database session to the function
+    :param batch_size: int: Maximum number of files, the Admin API takes 100 per call
+    :return: The number of rows claimed, 0 when nothing is due
+    """
+    rows = await repository_remote_deletes.claim_remote_deletes(batch_size, settings.remote_deletes_lease, db)
+    if not rows:
+        return 0
+
+    # Files that images still share are kept, their rows are done as well
+    settled = await repository_remote_deletes.get_referenced_public_ids([row.public_id for row in rows], db)
+    unreferenced = [row.public_id for row in rows if row.public_id not in settled]
+    if unreferenced:
+        loop = asyncio.get_running_loop()
+        settled.update(await loop.run_in_executor(None, cloudinary.remove_images, unreferenced))
+
+    done = [row.id for row in rows if row.public_id in settled]
+    failed = [row.id for row in rows if row.public_id not in settled]
+    if done:
+        await repository_remote_deletes.complete_remote_deletes(done, db)
+    if failed:
+        await repository_remote_deletes.retry_remote_deletes(failed, settings.remote_deletes_retry_base,
+                                                              settings.remote_deletes_retry_max, db)
+
+    return len(rows)
+
+
+async def process_remote_deletes(interval: int = settings.remote_deletes_interval) -> None:
+    """
+    The process_remote_deletes function empties the outbox of Cloudinary files every interval seconds.
+    Deletes commit without waiting for Cloudinary; this is where their files actually go. It runs for the lifetime
+    of the application, and every worker may run it: the rows are claimed with SKIP LOCKED.
+
+    :param interval: int: Seconds between two runs
+    :return: Nothing, it runs until cancelled
+    """
+    while True:
+        await asyncio.sleep(interval)
+
+        try:
+            async with AsyncSessionLocal() as db:
+                while await remove_pending_files(db) == settings.remote_deletes_batch_size:
+                    # A full batch, more may be due
+                    continue
+        except Exception:  # noqa
+            # Whatever failed (the database, Cloudinary, a bug), the next run will catch up: the task must not die
+            logger.exception("Removing the pending Cloudinary files failed")
@@ -0,0 +1,111 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from fastapi import HTTPException, status
+
+from config import settings
+
+
+class UploadPool:
+    """
+    Dedicated, bounded thread pool for the uploads to Cloudinary
+
+    Every upload holds a thread for the whole network transfer, so the uploads get their own pool
+    instead of the default executor shared with everything else. When every thread is busy, up to
+    max_waiting uploads queue for one; the next ones are refused with 503 and a Retry-After header,
+    which tells the client to back off instead of piling more requests on the worker.
+    """
+
+    def __init__(self, max_workers: int, max_waiting: int, retry_after: int) -> None:
+        """
+        The __init__ function sets the size of the pool and of its queue.
+        The threads are only started by the first call.
+
+        :param self: Represent the instance of the object itself
+        :param max_workers: int: Number of threads, so of uploads running at a time
+        :param max_waiting: int: Number of uploads allowed to wait for a thread
+        :param retry_after: int: Seconds the refused clients are asked to wait
+        :return: Nothing
+        """
+        self.max_workers = max_workers
+        self.max_waiting = max_waiting
+        self.retry_after = retry_after
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.semaphore = asyncio.Semaphore(max_workers)
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_time = 0.0
+
+    async def run(self, func: Callable, *args):
+        """
+        The run function calls func in the pool once a thread is free.
+
+        :param self: Represent the instance of the object itself
+        :param func: Callable: The blocking upload function
+        :param args: Arguments of func
+        :return: The result of func
+        :raise HTTPException: 503 with a Retry-After header if the queue is full
+        """
+        if self.semaphore.locked() and self.waiting >= self.max_waiting:
+            self.rejected += 1
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail="Too many uploads in progress, try again later",
+                                headers={"Retry-After": str(self.retry_after)})
+
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="upload")
+
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.wait_time += time.perf_counter() - queued_at
+
+        self.running += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self.running -= 1
+            self.completed += 1
+            self.semaphore.release()
+
+    def stats(self) -> dict:
+        """
+        The stats function returns the queue depth and throughput counters of the pool.
+
+        :param self: Represent the instance of the object itself
+        :return: A dictionary with the counters
+        """
+        return {
+            "workers": self.max_workers,
+            "max_waiting": self.max_waiting,
+            "running": self.running,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": self.wait_time / self.completed * 1000 if self.completed else 0.0,
+        }
+
+    def shutdown(self) -> None:
+        """
+        The shutdown function stops the threads, after the uploads in progress.
+
+        :param self: Represent the instance of the object itself
+        :return: Nothing
+        """
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+
+upload_pool = UploadPool(
+    max_workers=settings.upload_workers,
+    max_waiting=settings.upload_max_waiting,
+    retry_after=settings.upload_retry_after,
+)
@@ -0,0 +1,130 @@
+import asyncio
+from typing import Optional
+
+from redis.exceptions import ConnectionError, TimeoutError
+
+from app.database.cache import redis_client, redis_pubsub_client
+from app.database.models import User
+from app.services.principal import Principal, dump_principal, load_principal
+from app.utils.cache import TTLCache
+from config import settings
+
+
+class UserCache:
+    """
+    Two-tier cache of user principals keyed by user id
+
+    Principals are kept in a bounded in-process LRU in front of Redis. Every repository function
+    that changes a cached field writes the new snapshot through to Redis and publishes the user id,
+    so the other workers drop their local copy. The short local TTL only bounds staleness when an
+    invalidation is lost, e.g. while the subscriber reconnects.
+    """
+    redis = redis_client
+    subscriber = redis_pubsub_client
+    ttl = settings.user_cache_ttl
+    channel = "user-cache:invalidate"
+    local = TTLCache(
+        max_items=settings.user_cache_local_max_items,
+        max_bytes=settings.user_cache_local_max_bytes,
+        ttl=settings.user_cache_local_ttl,
+    )
+
+    @staticmethod
+    def key(user_id: int) -> str:
+        """
+        The key function returns the Redis key of the cached principal.
+
+        :param user_id: int: Identify the user
+        :return: The redis key
+        """
+        return f"user:{user_id}"
+
+    @classmethod
+    def get_local(cls, user_id: int) -> Optional[Principal]:
+        """
+        The get_local function looks the principal up in the in-process tier.
+
+        :param cls: Represent the class itself
+        :param user_id: int: Identify the user
+        :return: A principal object, or None on a miss
+        """
+        return cls.local.get(user_id)
+
+    @classmethod
+    def load(cls, snapshot: Optional[bytes]) -> Optional[Principal]:
+        """
+        The load function turns a value read from Redis into a principal
+        and keeps it in the in-process tier.
+
+        :param cls: Represent the class itself
+        :param snapshot: Optional[bytes]: The cached value, None on a cache miss
+        :return: A principal object, or None on a miss
+        """
+        if snapshot is None:
+            return
+
+        principal = load_principal(snapshot)
+        if principal is not None:
+            cls.local.set(principal.id, principal, len(snapshot))
+
+        return principal
+
+    @classmethod
+    async def fill(cls, user: User) -> Principal:
+        """
+        The fill function caches a user read from the database after a cache miss.
+        The value is only written to Redis if the key is absent, so a slow reader can never overwrite
+        a snapshot that a concurrent mutation has just written through.
+
+        :param cls: Represent the class itself
+        :param user: User: The user loaded from the database
+        :return: The principal of the user
+        """
+        principal = Principal.from_user(user)
+        snapshot = dump_principal(principal)
+        await cls.redis.set(cls.key(user.id), snapshot, ex=cls.ttl, nx=True)
+        cls.local.set(user.id, principal, len(snapshot))
+
+        return principal
+
+    @classmethod
+    async def store(cls, user: User) -> Principal:
+        """
+        The store function writes the fresh snapshot of a user that has just been changed
+        and tells the other workers to drop their local copy.
+
+        :param cls: Represent the class itself
+        :param user: User: The user with committed changes
+        :return: The principal of the user
+        """
+        principal = Principal.from_user(user)
+        snapshot = dump_principal(principal)
+
+        pipe = cls.redis.pipeline(transaction=False)
+        pipe.set(cls.key(user.id), snapshot, ex=cls.ttl)
+        pipe.publish(cls.channel, user.id)
+        await pipe.execute()
+        cls.local.set(user.id, principal, len(snapshot))
+
+        return principal
+
+    @classmethod
+    async def listen(cls) -> None:
+        """
+        The listen function evicts the local copies of the users changed by other workers.
+        It runs for the lifetime of the application and resubscribes after a lost connection.
+        Invalidations published while unsubscribed are lost, so the local tier is cleared on every subscribe.
+
+        :param cls: Represent the class itself
+        :return: Nothing, it runs until cancelled
+        """
+        while True:
+            try:
+                async with cls.subscriber.pubsub(ignore_subscribe_messages=True) as pubsub:
+                    await pubsub.subscribe(cls.channel)
+                    cls.local.clear()
+
+                    async for message in pubsub.listen():
+                        cls.local.pop(int(message["data"]))
+            except (ConnectionError, TimeoutError):
+                await asyncio.sleep(1)
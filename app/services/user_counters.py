@@ -0,0 +1,27 @@
+import asyncio
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.database.connect import AsyncSessionLocal
+from app.repository.users import reconcile_user_counters
+from config import settings
+
+
+async def repair_user_counters(interval: int = settings.user_counters_repair_interval) -> None:
+    """
+    The repair_user_counters function recounts the images, comments and ratings of the users every interval seconds.
+    The counters are kept up to date on every write; this only catches the drift left by the rows removed
+    in cascades. It runs for the lifetime of the application, and every worker may run it: the fix is idempotent.
+
+    :param interval: int: Seconds between two runs
+    :return: Nothing, it runs until cancelled
+    """
+    while True:
+        await asyncio.sleep(interval)
+
+        try:
+            async with AsyncSessionLocal() as db:
+                await reconcile_user_counters(db)
+        except (SQLAlchemyError, OSError):
+            # The database is unavailable, the next run will catch up
+            continue
@@ -0,0 +1,122 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+class TTLCache:
+    """
+    In-process LRU cache with per-entry expiry and a memory budget
+
+    Entries are evicted least recently used first as soon as either the number of entries or
+    the sum of their declared sizes goes over the limit. The cache is meant for a single event
+    loop, so it takes no locks.
+    """
+
+    def __init__(self, max_items: int, max_bytes: int, ttl: float,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        The __init__ function sets the limits of the cache.
+
+        :param self: Represent the instance of the object itself
+        :param max_items: int: Maximum number of entries
+        :param max_bytes: int: Maximum total size of the entries
+        :param ttl: float: Default lifetime of an entry in seconds
+        :param clock: Callable[[], float]: Source of the current time
+        :return: Nothing
+        """
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[Hashable, tuple[Any, float, int]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        The get function returns a live entry and marks it as the most recently used.
+
+        :param self: Represent the instance of the object itself
+        :param key: Hashable: Identify the entry
+        :return: The cached value, or None if it is missing or expired
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return
+
+        value, expires_at, _ = entry
+        if expires_at <= self.clock():
+            self.pop(key)
+            self.misses += 1
+            return
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, size: int, ttl: Optional[float] = None) -> None:
+        """
+        The set function stores an entry and evicts the least recently used ones over the limits.
+
+        :param self: Represent the instance of the object itself
+        :param key: Hashable: Identify the entry
+        :param value: Any: The value to cache
+        :param size: int: Approximate size of the value in bytes
+        :param ttl: Optional[float]: Lifetime of the entry, the cache default if omitted
+        :return: Nothing
+        """
+        if size > self.max_bytes:
+            self.pop(key)
+            return
+
+        self.pop(key)
+        self._entries[key] = (value, self.clock() + (self.ttl if ttl is None else ttl), size)
+        self.size += size
+
+        while len(self._entries) > self.max_items or self.size > self.max_bytes:
+            _, (_, _, evicted_size) = self._entries.popitem(last=False)
+            self.size -= evicted_size
+            self.evictions += 1
+
+    def pop(self, key: Hashable) -> None:
+        """
+        The pop function removes an entry if it is present.
+
+        :param self: Represent the instance of the object itself
+        :param key: Hashable: Identify the entry
+        :return: Nothing
+        """
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[2]
+
+    def clear(self) -> None:
+        """
+        The clear function removes every entry, keeping the counters.
+
+        :param self: Represent the instance of the object itself
+        :return: Nothing
+        """
+        self._entries.clear()
+        self.size = 0
+
+    def stats(self) -> dict:
+        """
+        The stats function returns the counters of the cache.
+
+        :param self: Represent the instance of the object itself
+        :return: A dictionary with the size and the hit, miss and eviction counters
+        """
+        return {
+            "items": len(self._entries),
+            "bytes": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -1,7 +1,7 @@
 from fastapi import Depends, HTTPException, status
 
-from app.database.models import UserRole, User
-from app.services.auth import get_current_active_user
+from app.database.models import UserRole
+from app.services.auth import Principal, get_current_active_user
 
 
 class UserRoleFilter:
@@ -18,7 +18,7 @@ class UserRoleFilter:
             raise ValueError(f"Invalid role: {role}")
         self.role = role
 
-    async def __call__(self, current_user: User = Depends(get_current_active_user)) -> User:
+    async def __call__(self, current_user: Principal = Depends(get_current_active_user)) -> Principal:
         """
         The __call__ function is a decorator that allows us to use the class as a function.
         It's used in this case because we want to be able to pass the current_user into it,
@@ -26,7 +26,7 @@ class UserRoleFilter:
         to access.
 
         :param self: Access the class attributes
-        :param current_user: User: Get the current user
+        :param current_user: Principal: Get the principal of the current user
         :return: A function that takes a current_user and returns none
         """
         if current_user.role == UserRole.admin:
@@ -0,0 +1,181 @@
+import asyncio
+import hashlib
+import io
+import struct
+from typing import BinaryIO, NamedTuple, Optional
+
+from fastapi import HTTPException, UploadFile, status
+
+from config import settings
+
+
+# JPEG keeps its dimensions after the metadata segments, which can take a few of their 64 KB maximum;
+# when they take more, the rest of the file is walked
+HEADER_SIZE = 256 * 1024
+
+# Start of frame markers, the only JPEG segments holding the dimensions
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+# Start of scan: the compressed data follows, a JPEG without a start of frame before it is broken
+JPEG_SOS_MARKER = 0xDA
+# Real files have a few dozen segments before the start of frame, a crafted one can't make the walk read every byte
+JPEG_MAX_SEGMENTS = 1024
+
+# Brands of the ISO media files holding a HEIF or an AVIF image
+HEIF_BRANDS = {
+    b'heic': 'heic', b'heix': 'heic', b'hevc': 'heic', b'hevx': 'heic',
+    b'mif1': 'heif', b'msf1': 'heif',
+    b'avif': 'avif', b'avis': 'avif',
+}
+
+
+class ImageInfo(NamedTuple):
+    """Format and dimensions of an image, read from its header; the dimensions of some formats aren't read"""
+    format: str
+    width: Optional[int] = None
+    height: Optional[int] = None
+
+
+def jpeg_size(stream: BinaryIO) -> Optional[tuple[int, int]]:
+    """
+    The jpeg_size function walks the segments of a JPEG up to its start of frame.
+    Only the marker of each segment is read, the payloads are skipped.
+
+    :param stream: BinaryIO: The file, or its first bytes
+    :return: The width and height, or None if the stream ends or breaks before the start of frame
+    """
+    offset = 2
+    for _ in range(JPEG_MAX_SEGMENTS):
+        stream.seek(offset)
+        segment = stream.read(9)
+        if len(segment) < 9 or segment[0] != 0xFF:
+            return
+        marker = segment[1]
+        if marker == 0xFF:
+            # Fill byte
+            offset += 1
+            continue
+        if marker in JPEG_SOF_MARKERS:
+            height, width = struct.unpack('>HH', segment[5:9])
+            return width, height
+        if marker == JPEG_SOS_MARKER:
+            return
+        if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+            # Markers without a payload
+            offset += 2
+            continue
+
+        offset += 2 + struct.unpack('>H', segment[2:4])[0]
+
+
+def bmp_size(header: bytes) -> Optional[tuple[int, int]]:
+    """
+    The bmp_size function reads the dimensions from the DIB header of a BMP.
+
+    :param header: bytes: The first bytes of the file
+    :return: The width and height, or None if the header is cut short
+    """
+    if header[14:18] == struct.pack('<I', 12) and len(header) >= 22:
+        # The OS/2 header, with 16 bit dimensions
+        return struct.unpack('<HH', header[18:22])
+    if len(header) >= 26:
+        width, height = struct.unpack('<ii', header[18:26])
+        # A negative height stores the rows top-down
+        return width, abs(height)
+
+
+def webp_size(header: bytes) -> Optional[tuple[int, int]]:
+    """
+    The webp_size function reads the dimensions from the first chunk of a WebP.
+
+    :param header: bytes: The first bytes of the file
+    :return: The width and height, or None if the chunk is unknown
+    """
+    chunk = header[12:16]
+    if chunk == b'VP8 ' and len(header) >= 30:
+        width, height = struct.unpack('<HH', header[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b'VP8L' and len(header) >= 25:
+        bits = int.from_bytes(header[21:25], 'little')
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b'VP8X' and len(header) >= 30:
+        return int.from_bytes(header[24:27], 'little') + 1, int.from_bytes(header[27:30], 'little') + 1
+
+
+def sniff_image(header: bytes) -> Optional[ImageInfo]:
+    """
+    The sniff_image function recognizes an image by its magic number and reads its dimensions, without decoding it.
+    The dimensions of a PNG, JPEG, GIF, WebP or BMP are read; a TIFF, HEIC or AVIF is recognized without them.
+
+    :param header: bytes: The first bytes of the file
+    :return: The format and dimensions, or None if the bytes are not a supported image
+    """
+    size = None
+    if header.startswith(b'\x89PNG\r\n\x1a\n') and header[12:16] == b'IHDR':
+        image_format, size = 'png', struct.unpack('>II', header[16:24])
+    elif header.startswith(b'\xff\xd8\xff'):
+        image_format, size = 'jpeg', jpeg_size(io.BytesIO(header))
+    elif header[:6] in (b'GIF87a', b'GIF89a') and len(header) >= 10:
+        image_format, size = 'gif', struct.unpack('<HH', header[6:10])
+    elif header.startswith(b'RIFF') and header[8:12] == b'WEBP':
+        image_format, size = 'webp', webp_size(header)
+    elif header.startswith(b'BM'):
+        image_format, size = 'bmp', bmp_size(header)
+    elif header[:4] in (b'II*\x00', b'MM\x00*'):
+        return ImageInfo('tiff')
+    elif header[4:8] == b'ftyp' and header[8:12] in HEIF_BRANDS:
+        return ImageInfo(HEIF_BRANDS[header[8:12]])
+
+    if not size or not all(size):
+        return
+
+    return ImageInfo(image_format, *size)
+
+
+async def read_image_info(file: UploadFile) -> ImageInfo:
+    """
+    The read_image_info function checks an uploaded file before it is sent anywhere.
+    Only the header is read, then the file is rewound for the upload.
+
+    :param file: UploadFile: The uploaded file
+    :return: The format and dimensions of the image, without dimensions for a TIFF, HEIC or AVIF
+    :raise HTTPException: 413 if the file or the image is too large, 422 if it isn't a supported image
+    """
+    size = file.size
+    if size is None:
+        file.file.seek(0, 2)
+        size = file.file.tell()
+    if size > settings.upload_max_bytes:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Image file is too large")
+
+    await file.seek(0)
+    header = await file.read(HEADER_SIZE)
+    info = sniff_image(header)
+
+    if info is None and header.startswith(b'\xff\xd8\xff') and len(header) == HEADER_SIZE:
+        # Large metadata segments can push the start of frame past the header: walk the rest of the file
+        size = await asyncio.get_running_loop().run_in_executor(None, jpeg_size, file.file)
+        info = ImageInfo('jpeg', *size) if size and all(size) else None
+    await file.seek(0)
+
+    if info is None:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Invalid image file")
+    if info.width and max(info.width, info.height) > settings.upload_max_dimension:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="Image is too large")
+
+    return info
+
+
+async def read_content_hash(file: UploadFile) -> str:
+    """
+    The read_content_hash function computes the SHA-256 of an uploaded file.
+    The file is read in chunks in a thread, so neither the event loop nor the memory hold the whole file,
+    then it is rewound for the upload.
+
+    :param file: UploadFile: The uploaded file
+    :return: The hex digest of the content
+    """
+    await file.seek(0)
+    digest = await asyncio.get_running_loop().run_in_executor(None, hashlib.file_digest, file.file, 'sha256')
+    await file.seek(0)
+
+    return digest.hexdigest()
@@ -0,0 +1,55 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+
+class Cursor(NamedTuple):
+    """
+    Sort key of the last row of a page
+
+    rank is only set for pages ordered by a score first: the search rank of ranked search results,
+    or the average rating of the images sorted by rating. mode names the order the cursor was made for,
+    a cursor of one order can't continue another one.
+    """
+    created_at: datetime
+    id: int
+    rank: Optional[float] = None
+    mode: str = "newest"
+
+
+def encode_cursor(created_at: datetime, id_: int, rank: Optional[float] = None, mode: str = "newest") -> str:
+    """
+    The encode_cursor function packs the sort key of the last row of a page into an opaque cursor.
+
+    :param created_at: datetime: The creation time of the last row
+    :param id_: int: The id of the last row, which breaks ties between rows created at the same time
+    :param rank: Optional[float]: The score of the last row, for pages ordered by a score
+    :param mode: str: The order of the pages
+    :return: A url-safe cursor string
+    """
+    key = [mode, created_at.isoformat(), id_] + ([] if rank is None else [rank])
+    data = json.dumps(key, separators=(',', ':')).encode('utf-8')
+
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    """
+    The decode_cursor function restores the sort key packed by encode_cursor.
+
+    :param cursor: str: The cursor received from the client
+    :return: The sort key of the last row of the previous page
+    :raise ValueError: If the cursor is malformed
+    """
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        mode, created_at, id_, *rank = json.loads(data)
+
+        if len(rank) > 1 or not isinstance(mode, str):
+            raise ValueError("Invalid cursor")
+
+        return Cursor(datetime.fromisoformat(created_at), int(id_), float(rank[0]) if rank else None, mode)
+    except (binascii.Error, TypeError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
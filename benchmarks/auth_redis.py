@@ -0,0 +1,85 @@
+"""
+Compares the latency of the Redis lookups done by AuthService.get_current_user for every authenticated request.
+
+before: a synchronous redis.Redis client, GET black-list + GET user one after another, blocking the event loop
+after:  the shared asyncio connection pool, both GETs pipelined into a single round trip
+
+Run against the Redis configured in .env:
+
+    python -m benchmarks.auth_redis --requests 5000 --concurrency 200
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import redis as redis_sync
+import redis.asyncio as redis_async
+
+from config import settings
+
+
+EMAIL = "benchmark@test.com"
+
+
+def percentile(values: list[float], pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def report(name: str, latencies: list[float], elapsed: float) -> None:
+    print(f"{name:>7}: {len(latencies) / elapsed:9.0f} req/s   "
+          f"p50 {statistics.median(latencies) * 1000:7.2f} ms   "
+          f"p99 {percentile(latencies, 99) * 1000:7.2f} ms")
+
+
+async def run(lookup, requests: int, concurrency: int) -> tuple[list[float], float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def request():
+        async with semaphore:
+            started = time.perf_counter()
+            await lookup()
+            # Other work of the handler that has to wait for the event loop
+            await asyncio.sleep(0)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(request() for _ in range(requests)))
+
+    return latencies, time.perf_counter() - started
+
+
+async def main(requests: int, concurrency: int) -> None:
+    client = redis_sync.Redis(host=settings.redis_host, port=settings.redis_port, password=settings.redis_password)
+    pool = redis_async.ConnectionPool(host=settings.redis_host, port=settings.redis_port,
+                                      password=settings.redis_password, max_connections=concurrency)
+    async_client = redis_async.Redis(connection_pool=pool)
+
+    client.set(f"user:{EMAIL}", b"x" * 600, ex=60)
+
+    async def before():
+        client.get(f"black-list:{EMAIL}")
+        client.get(f"user:{EMAIL}")
+
+    async def after():
+        pipe = async_client.pipeline(transaction=False)
+        pipe.get(f"black-list:{EMAIL}")
+        pipe.get(f"user:{EMAIL}")
+        await pipe.execute()
+
+    report("before", *await run(before, requests, concurrency))
+    report("after", *await run(after, requests, concurrency))
+
+    client.delete(f"user:{EMAIL}")
+    await pool.disconnect()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.requests, args.concurrency))
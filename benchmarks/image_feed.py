@@ -0,0 +1,97 @@
+"""
+Compares offset and keyset (cursor) pagination of the image feed on a seeded dataset.
+
+before: ORDER BY created_at DESC, id DESC OFFSET n LIMIT 10, the database reads and discards n rows
+after:  WHERE (created_at, id) < cursor ORDER BY created_at DESC, id DESC LIMIT 10, an index seek
+
+The benchmark seeds --rows images for a throwaway user in the database configured in .env
+(it needs the ix_images_created_at_id index, i.e. the latest migration) and removes them afterwards.
+
+    python -m benchmarks.image_feed --rows 200000 --pages 1 100 10000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from sqlalchemy import text
+
+from app.database.connect import AsyncSessionLocal
+from app.repository.images import get_images
+
+
+PAGE_SIZE = 10
+EMAIL = "feed-benchmark@test.com"
+
+
+async def seed(rows: int) -> int:
+    async with AsyncSessionLocal() as db:
+        user_id = await db.scalar(text(
+            "INSERT INTO users (username, email, password, first_name, last_name, role, is_active, email_verified, "
+            "created_at) VALUES ('feed_benchmark', :email, '-', 'Feed', 'Benchmark', 'user', true, true, now()) "
+            "RETURNING id"
+        ), {"email": EMAIL})
+        # Several images per timestamp, so the id tie-breaker is exercised too
+        await db.execute(text(
+            "INSERT INTO images (public_id, description, created_at, user_id) "
+            "SELECT 'feed-benchmark', 'Image ' || n, now() - (n / 3) * interval '1 second', :user_id "
+            "FROM generate_series(1, :rows) AS n"
+        ), {"user_id": user_id, "rows": rows})
+        await db.commit()
+        await db.execute(text("ANALYZE images"))
+
+        return user_id
+
+
+async def cleanup() -> None:
+    async with AsyncSessionLocal() as db:
+        await db.execute(text("DELETE FROM users WHERE email = :email"), {"email": EMAIL})
+        await db.commit()
+
+
+async def measure(fetch, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fetch()
+        timings.append(time.perf_counter() - started)
+
+    return statistics.median(timings) * 1000
+
+
+async def main(rows: int, pages: list[int], repeat: int) -> None:
+    await cleanup()
+    user_id = await seed(rows)
+
+    try:
+        async with AsyncSessionLocal() as db:
+            for page in pages:
+                skip = (page - 1) * PAGE_SIZE
+                # The cursor the client would hold after reading the previous pages
+                after = None
+                if skip:
+                    row = (await db.execute(
+                        text("SELECT created_at, id FROM images ORDER BY created_at DESC, id DESC OFFSET :n LIMIT 1"),
+                        {"n": skip - 1},
+                    )).one()
+                    after = (row.created_at, row.id)
+
+                offset_ms = await measure(
+                    lambda: get_images(skip, PAGE_SIZE, None, None, None, None, db), repeat)
+                keyset_ms = await measure(
+                    lambda: get_images(0, PAGE_SIZE, None, None, None, None, db, after), repeat)
+                db.expunge_all()
+
+                print(f"page {page:>6}: offset {offset_ms:8.2f} ms   cursor {keyset_ms:8.2f} ms")
+    finally:
+        await cleanup()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 100, 10_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.rows, args.pages, args.repeat))
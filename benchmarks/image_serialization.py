@@ -0,0 +1,73 @@
+"""
+Measures the serialization of a GET /api/images/?limit=100 page (response_model=list[ImagePublic]).
+
+before: every ImagePublic builds its url with a new CloudinaryImage, and its root_validator looks for
+        an existing url with GetterDict.keys(), i.e. dir() on the ORM object
+after:  urls come from the memoized build_image_url and the validator does a single getattr;
+        "cold" is the first page after a restart, "warm" every later request for images already seen
+
+The "validate" column is the response_model validation that runs the root_validator, "total" adds
+jsonable_encoder, which FastAPI runs next.
+
+    python -m benchmarks.image_serialization --limit 100 --repeat 200
+"""
+import argparse
+import statistics
+import time
+from datetime import datetime
+from unittest import mock
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import parse_obj_as
+
+from app.database.models import Image, Tag
+from app.schemas.image import ImagePublic
+from app.services import cloudinary
+
+
+def page(limit: int) -> list[Image]:
+    tags = [Tag(id=n, name=f"tag{n}", created_at=datetime.now()) for n in range(5)]
+
+    return [Image(id=n, public_id=f"media/{n:032x}", description="Image description", user_id=1, tags=tags,
+                  created_at=datetime.now()) for n in range(limit)]
+
+
+def serialize(limit: int) -> tuple[float, float]:
+    images = page(limit)
+
+    started = time.perf_counter()
+    models = parse_obj_as(list[ImagePublic], images)
+    validated = time.perf_counter()
+    jsonable_encoder(models)
+
+    return validated - started, time.perf_counter() - started
+
+
+def measure(name: str, limit: int, repeat: int, setup=lambda: None) -> None:
+    validate, total = [], []
+    for _ in range(repeat):
+        setup()
+        timings = serialize(limit)
+        validate.append(timings[0])
+        total.append(timings[1])
+
+    print(f"{name:>10}: validate p50 {statistics.median(validate) * 1000:7.2f} ms   "
+          f"total p50 {statistics.median(total) * 1000:7.2f} ms")
+
+
+def main(limit: int, repeat: int) -> None:
+    with mock.patch.object(cloudinary, "build_image_url", cloudinary.build_image_url.__wrapped__):
+        measure("uncached", limit, repeat)
+
+    measure("cold", limit, repeat, setup=cloudinary.build_image_url.cache_clear)
+    measure("warm", limit, repeat)
+    print(f"{'':>10}  {cloudinary.build_image_url.cache_info()}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    main(args.limit, args.repeat)
@@ -0,0 +1,84 @@
+"""
+Load test of password hashing during a burst of logins.
+
+before: bcrypt verified inline in the handler, blocking the event loop for every other request
+after:  bcrypt verified in the PasswordHasher process pool
+
+While the logins run, a "ping" coroutine stands in for the other endpoints of the worker: it measures
+how late the event loop serves it. Login throughput should scale with --workers up to the number of cores,
+while the ping latency stays near zero.
+
+    python -m benchmarks.password_hashing --logins 64 --workers 1 2 4
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from app.services.password_hasher import PasswordHasher, pwd_context
+
+
+PING_INTERVAL = 0.01
+
+
+def percentile(values: list[float], pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def ping(latencies: list[float], done: asyncio.Event) -> None:
+    while not done.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(PING_INTERVAL)
+        latencies.append(time.perf_counter() - started - PING_INTERVAL)
+
+
+async def run(verify, logins: int) -> tuple[float, list[float]]:
+    latencies = []
+    done = asyncio.Event()
+    pinger = asyncio.create_task(ping(latencies, done))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(verify() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+
+    done.set()
+    await pinger
+
+    return elapsed, latencies
+
+
+def report(name: str, logins: int, elapsed: float, latencies: list[float]) -> None:
+    latencies = latencies or [0.0]
+    print(f"{name:>10}: {logins / elapsed:7.1f} logins/s   "
+          f"ping p50 {statistics.median(latencies) * 1000:8.2f} ms   "
+          f"p99 {percentile(latencies, 99) * 1000:8.2f} ms")
+
+
+async def main(logins: int, workers: list[int], concurrency: int) -> None:
+    hashed = pwd_context.hash("password")
+
+    async def inline():
+        pwd_context.verify("password", hashed)
+
+    report("inline", logins, *await run(inline, logins))
+
+    for count in workers:
+        hasher = PasswordHasher(max_workers=count, max_concurrency=concurrency)
+        # Start the worker processes outside of the measurement
+        await asyncio.gather(*(hasher.verify("password", hashed) for _ in range(count)))
+
+        report(f"{count} workers", logins, *await run(lambda: hasher.verify("password", hashed), logins))
+        print(f"{'':>10}  {hasher.stats()}")
+        hasher.shutdown()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, os.cpu_count()])
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.logins, args.workers, args.concurrency))
@@ -0,0 +1,55 @@
+"""
+Compares the cached user formats used by AuthService.get_current_user.
+
+before: the whole SQLAlchemy User entity, pickled
+after:  the versioned Principal snapshot (id, role, is_active, email_verified, avatar)
+
+No external services are needed:
+
+    python -m benchmarks.user_snapshot --rounds 100000
+"""
+import argparse
+import pickle
+import timeit
+from datetime import datetime
+
+from app.database.models import User, UserRole
+from app.services.principal import Principal, dump_principal, load_principal
+
+
+def make_user() -> User:
+    return User(
+        id=1024,
+        username="benchmark_user",
+        email="benchmark.user@example.com",
+        password="$2b$12$" + "x" * 53,
+        first_name="Benchmark",
+        last_name="User",
+        avatar="https://res.cloudinary.com/demo/image/upload/c_fill,h_250,w_250/v1678785308/media/"
+               "2f1c0d3c4b5a69788796a5b4c3d2e1f0",
+        role=UserRole.user,
+        refresh_token="x" * 180,
+        email_verified=True,
+        is_active=True,
+        created_at=datetime.utcnow(),
+        updated_at=datetime.utcnow(),
+    )
+
+
+def main(rounds: int) -> None:
+    user = make_user()
+
+    pickled = pickle.dumps(user)
+    snapshot = dump_principal(Principal.from_user(user))
+
+    for name, data, loads in (("pickle", pickled, pickle.loads), ("snapshot", snapshot, load_principal)):
+        seconds = timeit.timeit(lambda: loads(data), number=rounds)
+        print(f"{name:>8}: {len(data):5d} bytes   decode {seconds / rounds * 1e6:6.2f} us")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=100_000)
+    args = parser.parse_args()
+
+    main(args.rounds)
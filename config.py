@@ -1,6 +1,7 @@
 from dataclasses import dataclass
 from pathlib import Path
 from ipaddress import ip_address
+from typing import Optional
 
 from pydantic import BaseSettings, EmailStr
 from fastapi.templating import Jinja2Templates
@@ -28,6 +29,19 @@ class Template:
 
 class Settings(BaseSettings):
     db_url: str = "{DB_TYPE}+{DB_CONNECTOR}://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}"
+    # Optional read replica for the read-only routes
+    db_replica_url: Optional[str] = None
+    # Seconds a user's reads stay on the primary after they wrote, longer than the replica lag
+    db_replica_sticky_seconds: int = 5
+    db_pool_size: int = 10
+    db_pool_max_overflow: int = 10
+    db_pool_timeout: int = 30
+    db_pool_recycle: int = 30 * 60
+    db_pool_pre_ping: bool = True
+    # Milliseconds, 0 disables the timeout
+    db_statement_timeout: int = 30_000
+    # None keeps the asyncpg default, 0 disables the cache (e.g. behind pgbouncer in transaction mode)
+    db_prepared_statement_cache_size: Optional[int] = None
 
     secret_key_jwt: str = "secret_key_jwt"
     algorithm: str = "HS256"
@@ -42,11 +56,44 @@ class Settings(BaseSettings):
     redis_host: str
     redis_port: int
     redis_password: str
+    redis_max_connections: int = 50
+    # Seconds a caller waits for a free connection when all of them are in use
+    redis_pool_timeout: int = 10
+    user_cache_ttl: int = 6 * 60 * 60
+    user_cache_local_ttl: int = 60
+    user_cache_local_max_items: int = 10_000
+    user_cache_local_max_bytes: int = 4 * 1024 * 1024
+    token_cache_ttl: int = 15 * 60
+    token_cache_max_items: int = 10_000
+    token_cache_max_bytes: int = 8 * 1024 * 1024
+
+    user_counters_repair_interval: int = 60 * 60
+
+    password_hash_workers: Optional[int] = None
+    password_hash_concurrency: int = 16
 
     cloudinary_name: str
     cloudinary_api_key: int
     cloudinary_api_secret: str
     cloudinary_folder: str = "media"
+    cloudinary_url_cache_size: int = 10_000
+    # Files are sent in chunks of this size, so an upload never holds the whole file in memory
+    cloudinary_upload_chunk_size: int = 6 * 1024 * 1024
+    # Files of deleted images and replaced avatars are removed in the background, in batches
+    remote_deletes_interval: int = 5
+    remote_deletes_batch_size: int = 100
+    remote_deletes_lease: int = 5 * 60
+    remote_deletes_retry_base: int = 30
+    remote_deletes_retry_max: int = 6 * 60 * 60
+
+    upload_max_bytes: int = 20 * 1024 * 1024
+    upload_max_dimension: int = 10_000
+    upload_workers: int = 8
+    upload_max_waiting: int = 16
+    upload_retry_after: int = 5
+    upload_bulk_max_files: int = 20
+    # Uploads of one bulk request running at a time, so a single album can't take the whole pool
+    upload_bulk_concurrency: int = 4
 
     class Config:
         env_file = BASE_DIR / '.env'
@@ -1,8 +1,8 @@
+import asyncio
 from ipaddress import ip_address
 from typing import Callable
 
 import uvicorn
-import redis.asyncio as redis
 from fastapi import FastAPI, Depends, HTTPException, status, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
@@ -10,10 +10,16 @@ from fastapi_limiter import FastAPILimiter
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 
+from app.database.cache import redis_client, redis_pool, redis_pubsub_pool
 from app.database.connect import get_db
 from app.routes import router
+from app.services.password_hasher import password_hasher
+from app.services.read_replica import ReadYourWrites
+from app.services.remote_deletes import process_remote_deletes
+from app.services.upload_pool import upload_pool
+from app.services.user_cache import UserCache
+from app.services.user_counters import repair_user_counters
 from config import (
-    settings,
     PROJECT_NAME,
     VERSION,
     API_PREFIX,
@@ -37,6 +43,8 @@ def get_application():
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        # The next page of the images feed is given by this header, the frontend has to read it
+        expose_headers=["X-Next-Cursor"],
     )
 
     return app
@@ -62,6 +70,22 @@ async def ban_ips(request: Request, call_next: Callable):
     return response
 
 
+@app.middleware("http")
+async def read_your_writes(request: Request, call_next: Callable):
+    """
+    The read_your_writes function is a middleware function that marks the users whose request has written
+    to the database, so their next reads are served by the primary instead of the replica.
+    The mark is set before the response is sent, so the next request of the client already sees it.
+
+    :param request: Request: Access the request object
+    :param call_next: Callable: Pass the next function in the middleware chain
+    :return: The response from the next function in the pipeline
+    """
+    response = await call_next(request)
+    await ReadYourWrites.after_request(getattr(request.state, 'db', None))
+    return response
+
+
 @app.on_event("startup")
 async def startup():
     """
@@ -70,10 +94,29 @@ async def startup():
 
     :return: A coroutine, so we need to call it with await
     """
-    await FastAPILimiter.init(
-        await redis.Redis(host=settings.redis_host, port=settings.redis_port, password=settings.redis_password,
-                          db=0, encoding="utf-8", decode_responses=True)
-    )
+    await FastAPILimiter.init(redis_client)
+    app.state.user_cache_listener = asyncio.create_task(UserCache.listen())
+    app.state.user_counters_repair = asyncio.create_task(repair_user_counters())
+    app.state.remote_deletes = asyncio.create_task(process_remote_deletes())
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """
+    The shutdown function is called when the application stops.
+    It stops the user cache invalidation listener, the user counters repair job, the remote deletes worker,
+    the password hasher processes and the upload threads, and closes every connection of the shared Redis pool
+    used by the rate limiter and the auth service, and of the subscriber's own pool.
+
+    :return: None
+    """
+    app.state.user_cache_listener.cancel()
+    app.state.user_counters_repair.cancel()
+    app.state.remote_deletes.cancel()
+    password_hasher.shutdown()
+    upload_pool.shutdown()
+    await redis_pool.disconnect()
+    await redis_pubsub_pool.disconnect()
 
 
 @app.get("/", name="Images app team_3_project")
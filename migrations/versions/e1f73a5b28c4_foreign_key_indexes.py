@@ -0,0 +1,42 @@
+"""Foreign key indexes
+
+Revision ID: e1f73a5b28c4
+Revises: b6d2e94f1c37
+Create Date: 2026-10-18 13:48:19.371052
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1f73a5b28c4'
+down_revision = 'b6d2e94f1c37'
+branch_labels = None
+depends_on = None
+
+
+# Built and dropped concurrently, so the tables stay writable; CONCURRENTLY can't run inside a transaction
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(op.f('ix_image_comments_image_id'), 'image_comments', ['image_id'], unique=False,
+                        postgresql_concurrently=True)
+        op.create_index(op.f('ix_image_comments_user_id'), 'image_comments', ['user_id'], unique=False,
+                        postgresql_concurrently=True)
+        op.create_index(op.f('ix_image_ratings_image_id'), 'image_ratings', ['image_id'], unique=False,
+                        postgresql_concurrently=True)
+        op.create_index('ix_images_user_id_created_at_id', 'images', ['user_id', 'created_at', 'id'], unique=False,
+                        postgresql_concurrently=True)
+        op.create_index('ix_image_m2m_tag_image_id', 'image_m2m_tag', ['image_id'], unique=False,
+                        postgresql_concurrently=True)
+        op.drop_index('ix_image_comments_data', table_name='image_comments', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_image_comments_data', 'image_comments', ['data'], unique=False,
+                        postgresql_concurrently=True)
+        op.drop_index('ix_image_m2m_tag_image_id', table_name='image_m2m_tag', postgresql_concurrently=True)
+        op.drop_index('ix_images_user_id_created_at_id', table_name='images', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_image_ratings_image_id'), table_name='image_ratings', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_image_comments_user_id'), table_name='image_comments', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_image_comments_image_id'), table_name='image_comments', postgresql_concurrently=True)
@@ -1,4 +1,6 @@
 import asyncio
+import struct
+import zlib
 from unittest import mock
 
 import pytest
@@ -13,6 +15,7 @@ from sqlalchemy.orm import sessionmaker
 from app.database.connect import get_db
 from app.database.models import Base, User
 from app.services.auth import AuthService
+from app.services.user_cache import UserCache
 from config import settings
 from main import app
 from sqlalchemy.pool import NullPool
@@ -76,16 +79,51 @@ def user() -> dict:
     }
 
 
+@pytest.fixture(scope="session")
+def png() -> bytes:
+    """A 1x1 PNG, the uploads are sniffed before they reach the mocked cloudinary"""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', 1, 1, 8, 0, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(b'\x00\x00'))
+            + chunk(b'IEND', b''))
+
+
 @pytest.fixture(scope="function")
 def mock_rate_limit(mocker):
     mock_rate_limit = mocker.patch.object(RateLimiter, '__call__', autospec=True)
     mock_rate_limit.return_value = False
 
 
+class RedisPipelineStub:
+    """Stages any command and answers every one of them with a cache miss"""
+
+    def __init__(self):
+        self.commands = 0
+
+    def __getattr__(self, name):
+        def stage(*args, **kwargs):
+            self.commands += 1
+            return self
+
+        return stage
+
+    async def execute(self) -> list:
+        return [None] * self.commands
+
+
 @pytest_asyncio.fixture(autouse=True)
 async def mock_auth_redis(mocker):
-    mock_redis = mocker.patch.object(AuthService, 'redis', autospec=True)
+    mock_redis = mocker.patch.object(AuthService, 'redis', new_callable=mocker.AsyncMock)
     mock_redis.get.return_value = None
+    mock_redis.pipeline = mocker.MagicMock(side_effect=lambda *args, **kwargs: RedisPipelineStub())
+    mocker.patch.object(UserCache, 'redis', mock_redis)
+    UserCache.local.clear()
+    AuthService.token_cache.clear()
+
+    return mock_redis
 
 
 @pytest_asyncio.fixture(scope="class")
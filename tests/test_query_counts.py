@@ -0,0 +1,156 @@
+from contextlib import contextmanager
+
+import pytest_asyncio
+from pytest import mark
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.models import Image, Tag, User, UserRole
+from app.repository.images import get_images, get_image_by_id
+from app.repository.tags import get_or_create_tags, get_tags_by_list_values
+from app.repository.image_ratings import create_rating, update_rating, remove_rating
+from app.repository.users import get_user_profile_by_username, reconcile_user_counters
+
+
+@contextmanager
+def count_queries(session):
+    """Collects the statements sent to the database and the number of rows each of them returned"""
+    statements = []
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, cursor.rowcount))
+
+    engine = session.bind.engine.sync_engine
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "after_cursor_execute", after_cursor_execute)
+
+
+@pytest_asyncio.fixture(scope='module')
+async def db(session):
+    """A session whose rows are rolled back, so they don't leak into the other test modules"""
+    async with session.bind.connect() as conn:
+        transaction = await conn.begin()
+        yield AsyncSession(bind=conn)
+        await transaction.rollback()
+
+
+@pytest_asyncio.fixture(scope='module')
+async def images(db) -> list[int]:
+    # Explicit ids leave the sequences alone; other modules rely on the ids they get
+    user = User(id=10_000, username="query_counts", email="query.counts@test.com", password="-", first_name="Query",
+                last_name="Counts", role=UserRole.user)
+    tags = [Tag(id=10_000 + n, name=f"query-counts-{n}") for n in range(3)]
+    images = [Image(id=10_000 + n, public_id=f"query-counts-{n}", description="Query counts image", user=user,
+                    tags=tags)
+              for n in range(5)]
+    db.add_all(images)
+    await db.flush()
+
+    return [image.id for image in images]
+
+
+@mark.asyncio
+class TestImageLoaders:
+    async def test_page_loads_tags_in_one_query(self, db, images):
+        db.expunge_all()
+
+        with count_queries(db) as statements:
+            page = await get_images(0, 5, None, None, None, None, db)
+            assert all(len(image.tags) == 3 for image in page)
+
+        assert len(statements) == 2
+        # The page is not multiplied by the tags of its images
+        assert statements[0][1] == len(page) == 5
+        assert "tags" not in statements[0][0].split("FROM", 1)[0]
+
+    async def test_single_image_joins_tags(self, db, images):
+        db.expunge_all()
+
+        with count_queries(db) as statements:
+            image = await get_image_by_id(images[0], db)
+            assert len(image.tags) == 3
+
+        assert len(statements) == 1
+
+
+@mark.asyncio
+class TestTagsUpsert:
+    async def test_get_or_create_tags_in_one_insert_and_one_select(self, db, images):
+        with count_queries(db) as statements:
+            tags = await get_or_create_tags([" Query-Counts-0 ", "query-counts-new", "QUERY-COUNTS-NEW", " "], db)
+
+        assert sorted(tag.name for tag in tags) == ["query-counts-0", "query-counts-new"]
+        assert [statement.split(maxsplit=1)[0] for statement, _ in statements] == ["INSERT", "SELECT"]
+        assert "ON CONFLICT" in statements[0][0]
+
+    async def test_get_or_create_tags_is_idempotent(self, db, images):
+        first = await get_or_create_tags(["query-counts-again"], db)
+        second = await get_or_create_tags(["Query-Counts-Again"], db)
+
+        assert [tag.id for tag in first] == [tag.id for tag in second]
+        assert second[0].created_at is not None
+
+    async def test_tags_stored_with_another_case_are_reused(self, db, images):
+        # Written before the names were normalized
+        legacy = Tag(id=10_010, name="Query-Counts-Legacy")
+        db.add(legacy)
+        await db.flush()
+
+        tags = await get_or_create_tags(["query-counts-legacy"], db)
+
+        assert [tag.id for tag in tags] == [legacy.id]
+        assert [tag.id for tag in await get_tags_by_list_values(["QUERY-COUNTS-LEGACY"], db)] == [legacy.id]
+
+
+@mark.asyncio
+class TestRatingAggregates:
+    async def aggregates(self, db, image_id: int) -> tuple:
+        image = await db.get(Image, image_id, populate_existing=True)
+        return image.rating_count, image.rating_sum, image.rating_avg
+
+    async def test_aggregates_follow_ratings(self, db, images):
+        first = await create_rating(10_000, 4, images[1], db)
+        assert await self.aggregates(db, images[1]) == (1, 4, 4.0)
+
+        await create_rating(10_000, 1, images[2], db)
+        assert await self.aggregates(db, images[2]) == (1, 1, 1.0)
+
+        await db.refresh(first)
+        await update_rating(first, 3, db)
+        assert await self.aggregates(db, images[1]) == (1, 3, 3.0)
+
+        await remove_rating(first, db)
+        assert await self.aggregates(db, images[1]) == (0, 0, 0.0)
+
+
+@mark.asyncio
+class TestUserCounters:
+    async def test_reconcile_fixes_drift_and_profile_is_one_row(self, db, images):
+        # The fixture inserts the images directly, bypassing the counters
+        assert await reconcile_user_counters(db) >= 1
+        assert await reconcile_user_counters(db) == 0
+
+        with count_queries(db) as statements:
+            profile = await get_user_profile_by_username("query_counts", db)
+
+        assert len(statements) == 1
+        assert "GROUP BY" not in statements[0][0]
+        assert profile['number_of_images'] == len(images)
+
+
+@mark.asyncio
+class TestSignupRole:
+    async def test_role_hook_checks_existence(self, db, images):
+        user = User(id=10_001, username="query_counts_2", email="query.counts.2@test.com", password="-",
+                    first_name="Query", last_name="Counts")
+        db.add(user)
+
+        with count_queries(db) as statements:
+            await db.flush()
+
+        assert "EXISTS" in statements[0][0]
+        assert "count(" not in statements[0][0]
+        assert user.role == UserRole.user
@@ -0,0 +1,115 @@
+from datetime import datetime
+
+from pytest import mark
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.repository import comments, image_formats, image_ratings, images, remote_deletes, tags, users
+from app.repository.images import images_query
+from app.schemas.image import TagsMode, ImagesSort
+from app.utils.pagination import Cursor
+
+
+async def explain(session, query) -> str:
+    """
+    Plans the query with sequential scans disabled: the test tables are tiny, so the planner would
+    otherwise prefer a sequential scan even when the index can serve the query.
+    """
+    async with session.bind.connect() as conn:
+        compiled = query.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+
+        await conn.exec_driver_sql("SET enable_seqscan = off")
+        plan = (await conn.exec_driver_sql(f"EXPLAIN {compiled}", params)).scalars().all()
+
+    return "\n".join(plan)
+
+
+async def explain_calls(session, call) -> list[str]:
+    """
+    Runs a repository function and plans every SELECT it sent, with sequential scans disabled as in explain.
+    The rows it may write are rolled back.
+    """
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    async with session.bind.connect() as conn:
+        transaction = await conn.begin()
+        await conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+
+        event.listen(conn.sync_connection, "before_cursor_execute", before_cursor_execute)
+        try:
+            await call(AsyncSession(bind=conn))
+        finally:
+            event.remove(conn.sync_connection, "before_cursor_execute", before_cursor_execute)
+
+        plans = ["\n".join((await conn.exec_driver_sql(f"EXPLAIN {statement}", parameters)).scalars().all())
+                 for statement, parameters in statements]
+        await transaction.rollback()
+
+    return plans
+
+
+@mark.asyncio
+class TestImagesQueryPlan:
+    async def test_description_search_uses_index(self, session):
+        plan = await explain(session, images_query(0, 10, "image descr", None, None, None))
+
+        assert "ix_images_description_tsv" in plan
+        assert "Seq Scan on images" not in plan
+
+    @mark.parametrize("tags_mode", (TagsMode.all, TagsMode.any))
+    async def test_tag_filter_uses_indexes(self, session, tags_mode):
+        plan = await explain(session, images_query(0, 10, None, ["Tag1", "tag2"], None, None, tags_mode=tags_mode))
+
+        assert "ix_tags_name_lower" in plan
+        assert "ix_image_m2m_tag_tag_id_image_id" in plan
+        assert "Seq Scan" not in plan
+
+    async def test_rating_sort_uses_index(self, session):
+        after = Cursor(datetime(2026, 1, 1), 10, 4.5)
+        plan = await explain(session, images_query(0, 10, None, None, None, None, after, sort=ImagesSort.rating))
+
+        assert "ix_images_rating_avg_created_at_id" in plan
+        assert "Seq Scan" not in plan
+
+
+# Every read of the repositories, with the index it must seek in when a full scan of another index would also
+# avoid a sequential scan
+REPOSITORY_READS = {
+    "comments by image": (lambda db: comments.get_comments_by_image_or_user_id(None, 1, 0, 10, db),
+                          "ix_image_comments_image_id"),
+    "comments by user": (lambda db: comments.get_comments_by_image_or_user_id(1, None, 0, 10, db),
+                         "ix_image_comments_user_id"),
+    "comment": (lambda db: comments.get_comment_by_id(1, db), None),
+    "image formats": (lambda db: image_formats.get_image_formats_by_image_id(1, 1, db), None),
+    "image ratings": (lambda db: image_ratings.get_all_image_ratings(1, db), "ix_image_ratings_image_id"),
+    "user rating": (lambda db: image_ratings.get_rating_by_image_id_and_user(1, 1, db), None),
+    "image": (lambda db: images.get_image_by_id(1, db), None),
+    "feed": (lambda db: images.get_images(0, 10, None, None, None, None, db), "ix_images_created_at_id"),
+    "user feed": (lambda db: images.get_images(0, 10, None, None, None, 1, db), "ix_images_user_id_created_at_id"),
+    "files by content": (lambda db: images.get_public_ids_by_content_hash(["0" * 64], db), "ix_images_content_hash"),
+    "referenced files": (lambda db: remote_deletes.get_referenced_public_ids(["media/a"], db), "ix_images_public_id"),
+    "tags by name": (lambda db: tags.get_tags_by_list_values(["tag1", "tag2"], db), None),
+    "tag": (lambda db: tags.get_tag_by_id(1, db), None),
+    "user by email": (lambda db: users.get_user_by_email("email@test.com", db), None),
+    "user by username": (lambda db: users.get_user_by_username("username", db), None),
+    "user by id": (lambda db: users.get_user_by_id(1, db), None),
+    "profile": (lambda db: users.get_user_profile_by_username("username", db), None),
+}
+
+
+@mark.asyncio
+class TestRepositoryQueryPlans:
+    @mark.parametrize("call, index", REPOSITORY_READS.values(), ids=REPOSITORY_READS.keys())
+    async def test_no_sequential_scans(self, session, call, index):
+        plans = await explain_calls(session, call)
+
+        assert plans
+        for plan in plans:
+            assert "Seq Scan" not in plan, plan
+        if index:
+            assert index in plans[0], plans[0]
@@ -1,9 +1,18 @@
+import asyncio
+import time
+
 from pytest import mark, fixture
 
 from fastapi import status
-from sqlalchemy import select
+from fastapi.testclient import TestClient
+from sqlalchemy import select, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
 
-from app.database.models import Image, UserRole, User
+from app.database.models import Image, PendingRemoteDelete, UserRole, User
+from app.repository.images import delete_image, get_image_by_id
+from config import ORIGINS, settings
 
 
 @fixture(scope='module')
@@ -33,6 +42,20 @@ def image() -> dict:
     }
 
 
+def count_images_share_locks() -> int:
+    """Counts the FOR SHARE locks on the images table, called from the upload thread while a file uploads"""
+    async def count() -> int:
+        engine = create_async_engine(settings.db_url, poolclass=NullPool)
+        async with engine.connect() as conn:
+            locks = await conn.scalar(text(
+                "SELECT count(*) FROM pg_locks WHERE relation = 'images'::regclass AND mode = 'RowShareLock'"
+            ))
+        await engine.dispose()
+        return locks
+
+    return asyncio.run(count())
+
+
 @mark.asyncio
 class TestUploadImage:
     url_path = "api/images/"
@@ -80,7 +103,7 @@ class TestUploadImage:
         assert response.json()['detail'] == detail
 
     @mark.usefixtures('mock_rate_limit')
-    async def test_was_successfully(self, client, access_token, image, mocker):
+    async def test_was_successfully(self, client, access_token, image, mocker, png):
         mock_image = {
             "url": image['url'],
             "public_id": image['public_id'],
@@ -91,7 +114,7 @@ class TestUploadImage:
         response = client.post(
             self.url_path,
             headers={"Authorization": f"Bearer {access_token}"},
-            files={"file": ("test.png", b"image", "image/png")},
+            files={"file": ("test.png", png, "image/png")},
             data={"description": image['description'], "tags": image['tags']}
         )
 
@@ -101,6 +124,183 @@ class TestUploadImage:
         assert response.json()['message'] == "Image successfully uploaded"
         assert response.json()['image']['url'] == mock_image['url']
 
+    @mark.usefixtures('mock_rate_limit')
+    async def test_failed_insert_queues_the_uploaded_file(self, client, access_token, image, mocker, png, session):
+        mocker.patch("app.services.cloudinary.upload_image",
+                     return_value={"url": "-", "public_id": "media/orphan", "version": "1"})
+        mocker.patch("app.repository.images.create_image", side_effect=SQLAlchemyError("insert failed"))
+
+        response = TestClient(client.app, raise_server_exceptions=False).post(
+            self.url_path,
+            headers={"Authorization": f"Bearer {access_token}"},
+            files={"file": ("orphan.png", png + b"orphan", "image/png")},
+            data={"description": image['description']}
+        )
+        assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR, response.text
+
+        queued = await session.scalar(select(PendingRemoteDelete).filter(PendingRemoteDelete.public_id == "media/orphan"))
+        assert queued is not None
+
+        await session.delete(queued)
+        await session.commit()
+
+    @mark.usefixtures('mock_rate_limit')
+    async def test_no_lock_is_held_during_the_upload(self, client, access_token, image, mocker, png, session):
+        locks = []
+
+        def upload_image(file):
+            locks.append(count_images_share_locks())
+            return {"url": "-", "public_id": "media/unlocked", "version": "1"}
+
+        mocker.patch("app.services.cloudinary.upload_image", side_effect=upload_image)
+
+        response = client.post(
+            self.url_path,
+            headers={"Authorization": f"Bearer {access_token}"},
+            files={"file": ("unlocked.png", png + b"unlocked", "image/png")},
+            data={"description": image['description']}
+        )
+
+        assert response.status_code == status.HTTP_201_CREATED, response.text
+        assert locks == [0]
+
+        await delete_image(await get_image_by_id(response.json()['image']['id'], session), session)
+
+    @mark.usefixtures('mock_rate_limit')
+    async def test_same_content_reuses_the_file(self, client, access_token, image, mocker, png, session):
+        upload_image = mocker.patch("app.services.cloudinary.upload_image")
+
+        response = client.post(
+            self.url_path,
+            headers={"Authorization": f"Bearer {access_token}"},
+            files={"file": ("copy.png", png, "image/png")},
+            data={"description": image['description']}
+        )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.json()['image']['url'] == image['url']
+        upload_image.assert_not_called()
+
+        await delete_image(await get_image_by_id(response.json()['image']['id'], session), session)
+
+
+@mark.asyncio
+class TestUploadImages:
+    url_path = "api/images/bulk"
+
+    @mark.usefixtures('mock_rate_limit')
+    @mark.parametrize(
+        "status_code, detail, files_count, tags",
+        (
+                (status.HTTP_422_UNPROCESSABLE_ENTITY, "Maximum 20 files can be uploaded", 21, None),
+                (status.HTTP_422_UNPROCESSABLE_ENTITY, "Invalid length tag: ta", 2, ['ta']),
+        )
+    )
+    async def test_exceptions(self, client, access_token, png, mocker, status_code, detail, files_count, tags):
+        upload_image = mocker.patch("app.services.cloudinary.upload_image")
+
+        response = client.post(
+            self.url_path,
+            headers={"Authorization": f"Bearer {access_token}"},
+            files=[("files", (f"{n}.png", png, "image/png")) for n in range(files_count)],
+            data={"description": "Album description", "tags": tags or []}
+        )
+
+        assert response.status_code == status_code
+        assert response.json()['detail'] == detail
+        upload_image.assert_not_called()
+
+    @mark.usefixtures('mock_rate_limit')
+    async def test_partial_success(self, client, access_token, png, mocker, session):
+        upload_image = mocker.patch(
+            "app.services.cloudinary.upload_image",
+            side_effect=lambda file: {"url": "-", "public_id": f"album-{file.read()[-1:].decode()}", "version": "1"}
+        )
+
+        response = client.post(
+            self.url_path,
+            headers={"Authorization": f"Bearer {access_token}"},
+            files=[("files", ("1.png", png + b"1", "image/png")), ("files", ("text.png", b"image", "image/png")),
+                   ("files", ("2.png", png + b"2", "image/png")), ("files", ("copy.png", png + b"1", "image/png")),
+                   ("files", ("stored.png", png, "image/png"))],
+            data={"description": "Album description", "tags": ["album"]}
+        )
+        results = response.json()['images']
+
+        assert response.status_code == status.HTTP_207_MULTI_STATUS
+        assert response.json()['message'] == "4 of 5 images successfully uploaded"
+        # The copy and the file uploaded by TestUploadImage aren't sent again
+        assert upload_image.call_count == 2
+        assert [result['filename'] for result in results] == ["1.png", "text.png", "2.png", "copy.png", "stored.png"]
+        assert [result['status_code'] for result in results] == [201, 422, 201, 201, 201]
+        assert results[1]['detail'] == "Invalid image file" and results[1]['image'] is None
+        assert [tag['name'] for tag in results[0]['image']['tags']] == ["album"]
+
+        image_ids = [result['image']['id'] for result in results if result['image']]
+        images = await session.scalars(select(Image).filter(Image.id.in_(image_ids)).order_by(Image.id))
+        images = images.all()
+        assert [image.public_id for image in images] == ["album-1", "album-2", "album-1", "cld-sample-5"]
+        assert all((image.format, image.width, image.height) == ("png", 1, 1) for image in images)
+        assert len({image.content_hash for image in images}) == 3
+
+        for image_id in image_ids:
+            await delete_image(await get_image_by_id(image_id, session), session)
+
+    @mark.usefixtures('mock_rate_limit')
+    async def test_no_lock_is_held_during_the_uploads(self, client, access_token, png, mocker, session):
+        locks = []
+
+        def upload_image(file):
+            locks.append(count_images_share_locks())
+            return {"url": "-", "public_id": "album-unlocked", "version": "1"}
+
+        mocker.patch("app.services.cloudinary.upload_image", side_effect=upload_image)
+
+        response = client.post(
+            self.url_path,
+            headers={"Authorization": f"Bearer {access_token}"},
+            files=[("files", ("new.png", png + b"unlocked", "image/png")), ("files", ("stored.png", png, "image/png"))],
+            data={"description": "Album description"}
+        )
+        results = response.json()['images']
+
+        assert response.status_code == status.HTTP_201_CREATED, response.text
+        # The stored image is only locked again once the upload is done
+        assert locks == [0]
+
+        images = await session.scalars(select(Image.public_id).filter(
+            Image.id.in_([result['image']['id'] for result in results])).order_by(Image.id))
+        assert images.all() == ["album-unlocked", "cld-sample-5"]
+
+        for result in results:
+            await delete_image(await get_image_by_id(result['image']['id'], session), session)
+
+    @mark.usefixtures('mock_rate_limit')
+    async def test_failed_upload_waits_for_the_others(self, client, access_token, png, mocker, session):
+        def upload_image(file):
+            if file.read().endswith(b"failing"):
+                raise RuntimeError("upload failed")
+            time.sleep(0.2)
+            return {"url": "-", "public_id": "album-late", "version": "1"}
+
+        mocker.patch("app.services.cloudinary.upload_image", side_effect=upload_image)
+
+        response = TestClient(client.app, raise_server_exceptions=False).post(
+            self.url_path,
+            headers={"Authorization": f"Bearer {access_token}"},
+            files=[("files", ("failing.png", png + b"failing", "image/png")),
+                   ("files", ("late.png", png + b"late", "image/png"))],
+            data={"description": "Album description"}
+        )
+        assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR, response.text
+
+        # The upload still in flight when the other one failed is discarded too
+        queued = await session.scalar(select(PendingRemoteDelete).filter(PendingRemoteDelete.public_id == "album-late"))
+        assert queued is not None
+
+        await session.delete(queued)
+        await session.commit()
+
 
 @mark.asyncio
 class TestGetImages:
@@ -138,6 +338,115 @@ class TestGetImages:
         assert isinstance(response.json(), list)
         assert len(response.json()) == 1
 
+    @mark.usefixtures('mock_rate_limit')
+    @mark.parametrize(
+        "tags, tags_mode, count",
+        (
+                (["TAG1", "tag2"], "all", 1),
+                (["tag1", "missing"], "all", 0),
+                (["tag1", "missing"], "any", 1),
+                (["missing"], "any", 0),
+        )
+    )
+    async def test_tags_mode(self, client, access_token, tags, tags_mode, count):
+        response = client.get(
+            self.url_path,
+            params={'tags': tags, 'tags_mode': tags_mode},
+            headers={"Authorization": f"Bearer {access_token}"}
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.json()) == count
+
+    @mark.usefixtures('mock_rate_limit')
+    @mark.parametrize("description, count", (("image descr", 1), ("descr missing", 0)))
+    async def test_description_search(self, client, access_token, description, count):
+        response = client.get(
+            self.url_path,
+            params={'description': description, 'limit': 1},
+            headers={"Authorization": f"Bearer {access_token}"}
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.json()) == count
+        assert ('X-Next-Cursor' in response.headers) == bool(count)
+
+    @mark.usefixtures('mock_rate_limit')
+    async def test_search_cursor(self, client, access_token):
+        headers = {"Authorization": f"Bearer {access_token}"}
+        first_page = client.get(self.url_path, params={'description': "image", 'limit': 1}, headers=headers)
+        cursor = first_page.headers['X-Next-Cursor']
+
+        response = client.get(self.url_path, params={'description': "image", 'cursor': cursor}, headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == []
+
+        response = client.get(self.url_path, params={'cursor': cursor}, headers=headers)
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        assert response.json()['detail'] == "Invalid cursor"
+
+        # A search cursor doesn't continue the rating sort, though both carry a score
+        response = client.get(self.url_path, params={'sort': "rating", 'cursor': cursor}, headers=headers)
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        assert response.json()['detail'] == "Invalid cursor"
+
+    @mark.usefixtures('mock_rate_limit')
+    async def test_cursor_header_is_exposed(self, client, access_token):
+        response = client.get(self.url_path, params={'limit': 1},
+                              headers={"Authorization": f"Bearer {access_token}", "Origin": ORIGINS[0]})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert 'X-Next-Cursor' in response.headers
+        assert response.headers['Access-Control-Expose-Headers'] == "X-Next-Cursor"
+
+    @mark.usefixtures('mock_rate_limit')
+    async def test_cursor(self, client, access_token):
+        headers = {"Authorization": f"Bearer {access_token}"}
+        first_page = client.get(self.url_path, params={'limit': 1}, headers=headers)
+
+        assert first_page.status_code == status.HTTP_200_OK
+        assert len(first_page.json()) == 1
+
+        response = client.get(self.url_path, params={'cursor': first_page.headers['X-Next-Cursor']}, headers=headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert first_page.json()[0]['id'] not in [image['id'] for image in response.json()]
+        assert 'X-Next-Cursor' not in response.headers
+
+    @mark.usefixtures('mock_rate_limit')
+    async def test_rating_sort(self, client, access_token):
+        headers = {"Authorization": f"Bearer {access_token}"}
+        first_page = client.get(self.url_path, params={'sort': "rating", 'limit': 1}, headers=headers)
+
+        assert first_page.status_code == status.HTTP_200_OK
+        assert first_page.json()[0]['rating_count'] == 0
+        assert first_page.json()[0]['rating_avg'] == 0.0
+
+        cursor = first_page.headers['X-Next-Cursor']
+        response = client.get(self.url_path, params={'sort': "rating", 'cursor': cursor}, headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == []
+
+        response = client.get(self.url_path, params={'cursor': cursor}, headers=headers)
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+        response = client.get(self.url_path, params={'description': "image", 'cursor': cursor}, headers=headers)
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    @mark.usefixtures('mock_rate_limit')
+    @mark.parametrize(
+        "detail, params",
+        (
+                ("Invalid cursor", {'cursor': "invalid_cursor"}),
+                ("Use either skip or cursor", {'cursor': "invalid_cursor", 'skip': 1}),
+        )
+    )
+    async def test_invalid_cursor(self, client, access_token, detail, params):
+        response = client.get(self.url_path, params=params, headers={"Authorization": f"Bearer {access_token}"})
+
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        assert response.json()['detail'] == detail
+
 
 @mark.asyncio
 class TestGetImageById:
@@ -256,6 +565,8 @@ class TestUpdateImageData:
         assert response.json()['id'] == image['id']
         assert response.json()['url'] == image['url']
         assert response.json()['description'] == image['description']
+        assert [tag['name'] for tag in response.json()['tags']] == image['tags']
+        assert response.json()['updated_at'] is not None
 
 
 @mark.asyncio
@@ -0,0 +1,37 @@
+from pytest import mark
+
+from fastapi import status
+from sqlalchemy import select
+
+from app.database.models import User, UserRole
+
+
+@mark.asyncio
+class TestMetrics:
+    url_path = "api/metrics/"
+
+    async def set_role(self, session, user: dict, role: UserRole) -> UserRole:
+        current_user: User = await session.scalar(select(User).filter(User.email == user['email']))
+        previous, current_user.role = current_user.role, role
+        await session.commit()
+
+        return previous
+
+    async def test_exceptions(self, client, access_token, user, session):
+        previous = await self.set_role(session, user, UserRole.user)
+
+        response = client.get(self.url_path, headers={"Authorization": f"Bearer {access_token}"})
+
+        await self.set_role(session, user, previous)
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    async def test_was_successfully(self, client, access_token, user, session):
+        previous = await self.set_role(session, user, UserRole.admin)
+
+        response = client.get(self.url_path, headers={"Authorization": f"Bearer {access_token}"})
+
+        await self.set_role(session, user, previous)
+        assert response.status_code == status.HTTP_200_OK
+        assert set(response.json()) == {"db_pool", "password_hasher", "upload_pool", "user_cache", "token_cache",
+                                        "image_url_cache"}
+        assert {"checked_out", "overflow", "avg_wait_ms", "timeouts"} <= set(response.json()['db_pool'])
@@ -74,7 +74,7 @@ class TestUpdateAvatar:
         assert response.json()['detail'] == detail
 
     @mark.usefixtures('mock_rate_limit')
-    async def test_was_successfully(self, client, access_token, user, mocker):
+    async def test_was_successfully(self, client, access_token, user, mocker, png):
         mock_image = {
             "url": "https://res.cloudinary.com/dlwnuqx3p/image/upload/v1678785308/cld-sample-5",
             "public_id": "cld-sample-5",
@@ -89,7 +89,7 @@ class TestUpdateAvatar:
 
         response = client.patch(
             self.url_path,
-            files={"file": ("test.png", b"image", "image/png")},
+            files={"file": ("test.png", png, "image/png")},
             headers={"Authorization": f"Bearer {access_token}"},
         )
 
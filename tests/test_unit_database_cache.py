@@ -0,0 +1,63 @@
+import asyncio
+import unittest
+
+import redis.asyncio as redis
+
+from app.database import cache
+from config import settings
+
+
+class FakeRedis:
+    """Answers every command with PONG after a short delay and records how many connections are open at once"""
+
+    def __init__(self):
+        self.connections = 0
+        self.peak_connections = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        self.peak_connections = max(self.peak_connections, self.connections)
+        try:
+            while True:
+                header = await reader.readline()
+                if not header:
+                    break
+                # *<n> followed by n bulk strings, each a $<len> line and a data line
+                for _ in range(int(header[1:]) * 2):
+                    await reader.readline()
+                await asyncio.sleep(0.01)
+                writer.write(b"+PONG\r\n")
+                await writer.drain()
+        finally:
+            self.connections -= 1
+            writer.close()
+
+
+class TestRedisPool(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.fake = FakeRedis()
+        self.server = await asyncio.start_server(self.fake.handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def test_callers_wait_for_a_free_connection(self):
+        pool = redis.BlockingConnectionPool(host="127.0.0.1", port=self.port, max_connections=3, timeout=5)
+        client = redis.Redis(connection_pool=pool)
+
+        results = await asyncio.gather(*(client.ping() for _ in range(20)))
+        await pool.disconnect()
+
+        self.assertEqual(results, [True] * 20)
+        self.assertLessEqual(self.fake.peak_connections, 3)
+
+    def test_shared_pool_blocks_and_subscriber_is_outside_it(self):
+        self.assertIsInstance(cache.redis_pool, redis.BlockingConnectionPool)
+        self.assertEqual(cache.redis_pool.max_connections, settings.redis_max_connections)
+        self.assertIsNot(cache.redis_pubsub_client.connection_pool, cache.redis_pool)
+
+
+if __name__ == '__main__':
+    unittest.main()
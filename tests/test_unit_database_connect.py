@@ -0,0 +1,41 @@
+import pytest
+from pytest import mark
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.database.connect import InstrumentedPool, connect_args
+from config import settings
+
+
+@mark.asyncio
+class TestInstrumentedPool:
+    async def test_stats_count_checkouts_and_timeouts(self):
+        engine = create_async_engine(settings.db_url, poolclass=InstrumentedPool, pool_size=1, max_overflow=0,
+                                     pool_timeout=0.05)
+        try:
+            async with engine.connect():
+                assert engine.pool.stats()['checked_out'] == 1
+
+                with pytest.raises(exc.TimeoutError):
+                    await engine.connect()
+
+            stats = engine.pool.stats()
+        finally:
+            await engine.dispose()
+
+        assert stats['checked_out'] == 0
+        assert stats['overflow'] == 0
+        assert stats['acquires'] == 2
+        assert stats['timeouts'] == 1
+        assert stats['max_wait_ms'] >= 50
+
+    async def test_connect_args_set_statement_timeout(self, monkeypatch):
+        monkeypatch.setattr(settings, 'db_statement_timeout', 1500)
+        engine = create_async_engine(settings.db_url, poolclass=InstrumentedPool, connect_args=connect_args())
+        try:
+            async with engine.connect() as conn:
+                timeout = await conn.scalar(text("SHOW statement_timeout"))
+        finally:
+            await engine.dispose()
+
+        assert timeout == "1500ms"
@@ -0,0 +1,64 @@
+import unittest
+from unittest.mock import MagicMock
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.models import Image, Tag
+from app.repository.images import create_image, update_description
+
+
+class TestRepositoryImages(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.session = MagicMock(spec=AsyncSession)
+        self.tags = [Tag(id=1, name="nature"), Tag(id=2, name="sea")]
+        self.tags_result = MagicMock()
+        self.tags_result.all.return_value = self.tags
+        self.image_result = MagicMock()
+        self.session.scalars.side_effect = [self.tags_result, self.image_result]
+
+    async def test_create_image_commits_once(self):
+        self.image_result.unique.return_value.first.return_value = "reloaded"
+
+        result = await create_image(2, "Image description", [" Nature", "sea", "SEA"], "public_id", self.session)
+
+        self.assertEqual(result, "reloaded")
+        image = self.session.add.call_args.args[0]
+        self.assertIsInstance(image, Image)
+        self.assertEqual(image.tags, self.tags)
+        # The tags insert and the images counter of the user
+        self.assertEqual(self.session.execute.await_count, 2)
+        self.session.flush.assert_awaited_once()
+        self.session.commit.assert_awaited_once()
+        self.session.refresh.assert_not_called()
+
+    async def test_create_image_without_tags(self):
+        self.session.scalars.side_effect = [self.image_result]
+
+        await create_image(2, "Image description", [], "public_id", self.session)
+
+        self.session.execute.assert_awaited_once()
+        self.session.commit.assert_awaited_once()
+
+    async def test_update_description(self):
+        image = Image(id=1, description="Old description", tags=[])
+
+        result = await update_description(image, "New description", ["nature", "sea"], self.session)
+
+        self.assertIs(result, image)
+        self.assertEqual(image.description, "New description")
+        self.assertEqual(image.tags, self.tags)
+        self.session.commit.assert_awaited_once()
+        # The image is refreshed in place instead of selected again
+        self.session.scalars.assert_awaited_once()
+        self.session.refresh.assert_awaited_once_with(image)
+
+    async def test_update_description_keeps_tags(self):
+        image = Image(id=1, description="Old description", tags=self.tags)
+
+        result = await update_description(image, "New description", None, self.session)
+
+        self.assertIs(result, image)
+        self.assertEqual(image.tags, self.tags)
+        self.session.execute.assert_not_called()
+        self.session.scalars.assert_not_called()
+        self.session.commit.assert_awaited_once()
@@ -1,10 +1,11 @@
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, AsyncMock, patch
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database.models import User, UserRole
 from app.schemas.user import UserCreate, ProfileUpdate
+from app.services.user_cache import UserCache
 from app.repository.users import (
     create_user,
     get_user_by_email,
@@ -25,6 +26,8 @@ from app.repository.users import (
 class TestRepositoryUsers(unittest.IsolatedAsyncioTestCase):
     def setUp(self):
         self.session = MagicMock(spec=AsyncSession)
+        self.cache_store = patch.object(UserCache, 'store', new_callable=AsyncMock).start()
+        self.addCleanup(patch.stopall)
         self.body = UserCreate(
             username="username",
             email="email@example.com",
@@ -60,6 +63,7 @@ class TestRepositoryUsers(unittest.IsolatedAsyncioTestCase):
         self.assertIsNone(result)
         self.assertTrue(user.email_verified)
         self.session.commit.assert_called_once()
+        self.cache_store.assert_awaited_once_with(user)
 
     async def test_get_user_by_id_found(self):
         mock_user = User()
@@ -104,12 +108,25 @@ class TestRepositoryUsers(unittest.IsolatedAsyncioTestCase):
 
     async def test_update_avatar_found(self):
         mock_user = User()
-        self.session.scalar.return_value = mock_user
+        self.session.scalar.return_value = "https://res.cloudinary.com/demo/image/upload/v1/media/previous"
+        self.session.get.return_value = mock_user
 
-        result = await update_avatar(user_id=1, url="new_avatar_url", db=self.session)
+        with patch("app.repository.users.enqueue_remote_deletes") as enqueue:
+            result = await update_avatar(user_id=1, url="new_avatar_url", db=self.session)
 
         self.assertEqual(result, mock_user)
+        enqueue.assert_awaited_once_with(["media/previous"], self.session)
         self.session.commit.assert_called_once()
+        self.cache_store.assert_awaited_once_with(mock_user)
+
+    async def test_update_avatar_from_gravatar(self):
+        self.session.scalar.return_value = "https://www.gravatar.com/avatar/04e8eec3aaba9fe9c1272d8f1a9cb62d"
+        self.session.get.return_value = User()
+
+        with patch("app.repository.users.enqueue_remote_deletes") as enqueue:
+            await update_avatar(user_id=1, url="new_avatar_url", db=self.session)
+
+        enqueue.assert_not_called()
 
     async def test_update_email_found(self):
         mock_user = User()
@@ -119,6 +136,7 @@ class TestRepositoryUsers(unittest.IsolatedAsyncioTestCase):
 
         self.assertEqual(result, mock_user)
         self.session.commit.assert_called_once()
+        self.cache_store.assert_awaited_once_with(mock_user)
 
     async def test_update_password_found(self):
         mock_user = User()
@@ -128,6 +146,7 @@ class TestRepositoryUsers(unittest.IsolatedAsyncioTestCase):
 
         self.assertEqual(result, mock_user)
         self.session.commit.assert_called_once()
+        self.cache_store.assert_not_awaited()
 
     async def test_get_user_by_email_or_username_found(self):
         mock_user = User()
@@ -167,6 +186,7 @@ class TestRepositoryUsers(unittest.IsolatedAsyncioTestCase):
 
         self.assertEqual(result, mock_user)
         self.session.commit.assert_called_once()
+        self.cache_store.assert_awaited_once_with(mock_user)
 
     async def test_user_update_is_active_found(self):
         mock_user = User()
@@ -176,6 +196,7 @@ class TestRepositoryUsers(unittest.IsolatedAsyncioTestCase):
 
         self.assertEqual(result, mock_user)
         self.session.commit.assert_called_once()
+        self.cache_store.assert_awaited_once_with(mock_user)
 
     async def test_update_user_profile_found(self):
         mock_user = User()
@@ -185,6 +206,7 @@ class TestRepositoryUsers(unittest.IsolatedAsyncioTestCase):
 
         self.assertEqual(result, mock_user)
         self.session.commit.assert_called_once()
+        self.cache_store.assert_awaited_once_with(mock_user)
 
 
 #TODO get_user_profile_by_username
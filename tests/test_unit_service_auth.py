@@ -0,0 +1,141 @@
+import unittest
+from unittest.mock import MagicMock, AsyncMock, patch
+
+from fastapi import HTTPException
+
+from app.services.auth import AuthService, jwt
+from app.services.user_cache import UserCache
+from app.utils.cache import TTLCache
+
+
+class TestAccessTokenCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.redis = MagicMock()
+        self.pipe = self.redis.pipeline.return_value
+        self.pipe.execute = AsyncMock(return_value=[0, None])
+        self.redis.set = AsyncMock()
+        patch.object(AuthService, 'redis', self.redis).start()
+        patch.object(AuthService, 'token_cache', TTLCache(max_items=10, max_bytes=4096, ttl=60)).start()
+        patch.object(UserCache, 'get_local', return_value=MagicMock()).start()
+        self.decode = patch('app.services.auth.jwt.decode', side_effect=jwt.decode).start()
+        self.addCleanup(patch.stopall)
+        self.session = MagicMock()
+
+    async def test_repeat_caller_is_verified_once(self):
+        token = await AuthService.create_access_token(data={"sub": "email@example.com", "uid": 1})
+
+        await AuthService.get_current_user(token, self.session)
+        await AuthService.get_current_user(token, self.session)
+
+        self.decode.assert_called_once()
+        self.assertEqual(AuthService.token_cache.hits, 1)
+
+    async def test_entry_expires_with_token(self):
+        token = await AuthService.create_access_token(data={"sub": "email@example.com", "uid": 1},
+                                                      expires_delta=30)
+
+        await AuthService.get_current_user(token, self.session)
+
+        _, expires_at, _ = AuthService.token_cache._entries[AuthService.token_digest(token)]
+        self.assertLessEqual(expires_at, AuthService.token_cache.clock() + 30)
+
+    async def test_invalid_token_is_not_cached(self):
+        with self.assertRaises(HTTPException):
+            await AuthService.get_current_user("not a token", self.session)
+
+        self.assertEqual(len(AuthService.token_cache), 0)
+
+    async def test_blacklist_hit_evicts(self):
+        token = await AuthService.create_access_token(data={"sub": "email@example.com", "uid": 1})
+        await AuthService.get_current_user(token, self.session)
+        self.pipe.execute.return_value = [1, None]
+
+        with self.assertRaises(HTTPException):
+            await AuthService.get_current_user(token, self.session)
+
+        self.assertEqual(len(AuthService.token_cache), 0)
+
+    async def test_logout_evicts(self):
+        token = await AuthService.create_access_token(data={"sub": "email@example.com", "uid": 1})
+        await AuthService.get_current_user(token, self.session)
+
+        await AuthService.add_token_to_blacklist(token)
+
+        self.assertEqual(len(AuthService.token_cache), 0)
+        self.redis.set.assert_awaited_once()
+
+
+class TestTokenRevocation(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.redis = MagicMock()
+        self.redis.set = AsyncMock()
+        self.pipe = self.redis.pipeline.return_value
+        self.pipe.execute = AsyncMock(return_value=[0, None])
+        patch.object(AuthService, 'redis', self.redis).start()
+        self.addCleanup(patch.stopall)
+
+    async def test_tokens_have_unique_jti(self):
+        first = jwt.get_unverified_claims(await AuthService.create_access_token(data={"sub": "email@example.com"}))
+        second = jwt.get_unverified_claims(await AuthService.create_access_token(data={"sub": "email@example.com"}))
+
+        self.assertEqual(len(first["jti"]), 32)
+        self.assertNotEqual(first["jti"], second["jti"])
+
+    async def test_add_token_to_blacklist_by_jti(self):
+        token = await AuthService.create_email_token(data={"sub": "email@example.com"})
+        jti = jwt.get_unverified_claims(token)["jti"]
+
+        await AuthService.add_token_to_blacklist(token)
+
+        key, _ = self.redis.set.await_args.args
+        self.assertEqual(key, f"black-list:{jti}")
+        self.assertGreater(self.redis.set.await_args.kwargs["ex"], 0)
+
+    async def test_token_is_blacklist(self):
+        token = await AuthService.create_email_token(data={"sub": "email@example.com"})
+        jti = jwt.get_unverified_claims(token)["jti"]
+
+        self.assertFalse(await AuthService.token_is_blacklist(token))
+        self.pipe.exists.assert_called_with(f"black-list:{jti}")
+        self.pipe.get.assert_called_with("tokens-valid-after:email@example.com")
+
+        self.pipe.execute.return_value = [1, None]
+        self.assertTrue(await AuthService.token_is_blacklist(token))
+
+    async def test_revocation_is_keyed_by_user_id(self):
+        token = await AuthService.create_email_token(data={"sub": "email@example.com", "uid": 1})
+
+        await AuthService.token_is_blacklist(token)
+
+        self.pipe.get.assert_called_with("tokens-valid-after:1")
+
+    async def test_tokens_valid_after(self):
+        payload = {"iat": 1000}
+
+        self.assertTrue(AuthService.is_revoked(payload, 0, b"1001"))
+        # Issued in the second of the revocation, e.g. a login right after a password reset
+        self.assertFalse(AuthService.is_revoked(payload, 0, b"1000"))
+        self.assertFalse(AuthService.is_revoked(payload, 0, b"999"))
+        self.assertFalse(AuthService.is_revoked(payload, 0, None))
+
+    async def test_revoke_user_tokens(self):
+        await AuthService.revoke_user_tokens(1, "email@example.com")
+
+        self.assertEqual([call.args[0] for call in self.pipe.set.call_args_list],
+                         ["tokens-valid-after:1", "tokens-valid-after:email@example.com"])
+        for call in self.pipe.set.call_args_list:
+            self.assertIsInstance(call.args[1], int)
+            self.assertEqual(call.kwargs["ex"], AuthService.REFRESH_TOKEN_TTL)
+        self.pipe.execute.assert_awaited_once()
+
+    async def test_token_issued_in_the_second_of_the_revocation(self):
+        await AuthService.revoke_user_tokens(1, "email@example.com")
+        valid_after = self.pipe.set.call_args.args[1]
+
+        token = await AuthService.create_access_token(data={"sub": "email@example.com", "uid": 1})
+        self.pipe.execute.return_value = [0, str(valid_after).encode()]
+
+        self.assertFalse(await AuthService.token_is_blacklist(token))
+
+if __name__ == '__main__':
+    unittest.main()
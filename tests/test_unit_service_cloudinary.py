@@ -0,0 +1,129 @@
+import io
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import cloudinary as cloudinary_sdk
+
+from app.services.cloudinary import (
+    CroppingOrResizingTransformation,
+    CropMode,
+    build_image_url,
+    formatting_image_url,
+    remove_images,
+    upload_image,
+)
+from config import settings
+
+
+class FakeCloudinary(BaseHTTPRequestHandler):
+    """Stands in for the Cloudinary upload API: records the chunks and answers like the last one of an upload"""
+    requests = []
+    status_code = 200
+
+    def do_POST(self):  # noqa
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.requests.append({"path": self.path, "content_range": self.headers.get('Content-Range'),
+                              "size": len(body)})
+
+        if self.status_code != 200:
+            response = {"error": {"message": "Invalid image file"}}
+        else:
+            response = {"public_id": "media/fake", "version": 1700000000,
+                        "secure_url": "https://res.cloudinary.com/fake/image/upload/v1700000000/media/fake.png"}
+
+        data = json.dumps(response).encode()
+        self.send_response(self.status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestFormattingImageUrl(unittest.TestCase):
+    def setUp(self):
+        build_image_url.cache_clear()
+
+    def test_same_url_as_sdk(self):
+        transformation = {"width": 250, "height": 250, "crop": "fill", "gravity": None}
+
+        result = formatting_image_url("cld-sample-5", transformation, "1678785308")
+
+        expected = cloudinary_sdk.CloudinaryImage("cld-sample-5", version="1678785308", url_options=transformation)
+        self.assertEqual(result["url"], expected.url)
+        self.assertEqual(result["format"], transformation)
+
+    def test_memoized(self):
+        first = formatting_image_url("cld-sample-5", CroppingOrResizingTransformation(crop=CropMode.FILL, width=250))
+        second = formatting_image_url("cld-sample-5", {"height": None, "gravity": None, "width": 250, "crop": "fill"})
+
+        self.assertEqual(first["url"], second["url"])
+        self.assertEqual(build_image_url.cache_info().hits, 1)
+
+    def test_unhashable_transformation(self):
+        transformation = {"width": 250, "overlay": {"public_id": "logo"}}
+
+        result = formatting_image_url("cld-sample-5", transformation)
+
+        self.assertIn("cld-sample-5", result["url"])
+        self.assertEqual(build_image_url.cache_info().currsize, 0)
+
+
+
+class TestUploadImage(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeCloudinary)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        FakeCloudinary.requests = []
+        FakeCloudinary.status_code = 200
+        upload_prefix = cloudinary_sdk.config().upload_prefix
+        cloudinary_sdk.config(upload_prefix=f"http://127.0.0.1:{self.server.server_port}")
+        self.addCleanup(cloudinary_sdk.config, upload_prefix=upload_prefix)
+
+    def test_streams_the_file_in_chunks(self):
+        with patch.object(settings, 'cloudinary_upload_chunk_size', 1024):
+            result = upload_image(io.BytesIO(b"x" * 2500))
+
+        self.assertEqual(result, {"url": "https://res.cloudinary.com/fake/image/upload/v1700000000/media/fake.png",
+                                  "public_id": "media/fake", "version": 1700000000})
+        self.assertEqual([request["content_range"] for request in FakeCloudinary.requests],
+                         ["bytes 0-1023/2500", "bytes 1024-2047/2500", "bytes 2048-2499/2500"])
+        self.assertTrue(all(request["path"].endswith("/image/upload") for request in FakeCloudinary.requests))
+        self.assertTrue(all(request["size"] < 2500 for request in FakeCloudinary.requests))
+
+    def test_rejected_file(self):
+        FakeCloudinary.status_code = 400
+
+        self.assertIsNone(upload_image(io.BytesIO(b"not an image")))
+        self.assertEqual(len(FakeCloudinary.requests), 1)
+
+
+class TestRemoveImages(unittest.TestCase):
+    def test_missing_images_count_as_removed(self):
+        result = {"deleted": {"media/a": "deleted", "media/b": "not_found", "media/c": "error"}}
+
+        with patch("cloudinary.api.delete_resources", return_value=result) as delete_resources:
+            self.assertEqual(remove_images(["media/a", "media/b", "media/c"]), ["media/a", "media/b"])
+
+        delete_resources.assert_called_once_with(["media/a", "media/b", "media/c"], resource_type="image")
+
+    def test_failed_call(self):
+        with patch("cloudinary.api.delete_resources", side_effect=cloudinary_sdk.exceptions.RateLimited):
+            self.assertEqual(remove_images(["media/a"]), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+import asyncio
+import time
+import unittest
+
+from app.services.password_hasher import PasswordHasher
+
+
+class TestPasswordHasher(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.hasher = PasswordHasher(max_workers=2, max_concurrency=1)
+        self.addCleanup(self.hasher.shutdown)
+
+    async def test_hash_and_verify(self):
+        hashed = await self.hasher.hash("password")
+
+        self.assertNotEqual(hashed, "password")
+        self.assertTrue(await self.hasher.verify("password", hashed))
+        self.assertFalse(await self.hasher.verify("wrong_password", hashed))
+
+    async def test_concurrency_cap(self):
+        await asyncio.gather(*(self.hasher.run(time.sleep, 0.05) for _ in range(3)))
+
+        stats = self.hasher.stats()
+        self.assertEqual(stats["completed"], 3)
+        self.assertEqual(stats["peak_waiting"], 2)
+        self.assertEqual(stats["waiting"], 0)
+        self.assertEqual(stats["running"], 0)
+        self.assertGreater(stats["avg_wait_ms"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+
+from app.database.models import User, UserRole
+from app.services.principal import Principal, dump_principal, load_principal
+
+
+class TestPrincipal(unittest.TestCase):
+    def setUp(self):
+        self.user = User(
+            id=1,
+            email="email@example.com",
+            password="hashed_password",
+            avatar="https://example.com/avatar.png",
+            role=UserRole.moderator,
+            email_verified=True,
+            is_active=False,
+        )
+
+    def test_from_user(self):
+        principal = Principal.from_user(self.user)
+
+        self.assertEqual(principal.id, self.user.id)
+        self.assertEqual(principal.role, UserRole.moderator)
+        self.assertFalse(principal.is_active)
+        self.assertTrue(principal.email_verified)
+        self.assertEqual(principal.avatar, self.user.avatar)
+        self.assertFalse(hasattr(principal, 'password'))
+
+    def test_round_trip(self):
+        principal = Principal.from_user(self.user)
+
+        self.assertEqual(load_principal(dump_principal(principal)), principal)
+
+    def test_unknown_version(self):
+        self.assertIsNone(load_principal(b'[0,1,"user",true,true,null]'))
+
+    def test_invalid_snapshot(self):
+        self.assertIsNone(load_principal(b'\x80\x04\x95'))
+        self.assertIsNone(load_principal(b'[1,1,"user"]'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import pytest
+import pytest_asyncio
+from pytest import mark
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.database import connect
+from app.database.models import UserRole
+from app.services.principal import Principal
+from app.services.read_replica import ReadYourWrites, get_read_db
+from config import settings
+
+
+@pytest_asyncio.fixture
+async def replica(mocker):
+    """The test database under a second, read-only engine stands in for the replica"""
+    engine = connect.create_engine(settings.db_url, read_only=True)
+    mocker.patch.object(connect, 'AsyncReadSessionLocal',
+                        sessionmaker(engine, autocommit=False, autoflush=False, class_=AsyncSession))
+    yield engine
+    await engine.dispose()
+
+
+@pytest.fixture
+def marks(mocker):
+    redis = mocker.patch.object(ReadYourWrites, 'redis', new_callable=mocker.AsyncMock)
+    redis.exists.return_value = 0
+    return redis
+
+
+@mark.asyncio
+class TestReadReplica:
+    principal = Principal(id=7, role=UserRole.user, is_active=True, email_verified=True)
+
+    async def test_reads_go_to_the_replica(self, session, replica, marks):
+        dependency = get_read_db(self.principal, session)
+        db = await dependency.__anext__()
+
+        assert db is not session
+        assert await db.scalar(text("SHOW transaction_read_only")) == "on"
+        marks.exists.assert_awaited_once_with("read-primary:7")
+        await dependency.aclose()
+
+    async def test_reads_after_a_write_go_to_the_primary(self, session, replica, marks):
+        marks.exists.return_value = 1
+
+        dependency = get_read_db(self.principal, session)
+
+        assert await dependency.__anext__() is session
+        await dependency.aclose()
+
+    async def test_without_replica_reads_go_to_the_primary(self, session, marks):
+        dependency = get_read_db(self.principal, session)
+
+        assert await dependency.__anext__() is session
+        marks.exists.assert_not_called()
+        await dependency.aclose()
+
+    async def test_committed_request_marks_its_user(self, replica, marks, mocker):
+        db = mocker.MagicMock(spec=AsyncSession)
+        db.info = {"user_id": 7}
+
+        await ReadYourWrites.after_request(db)
+        marks.set.assert_not_called()
+
+        db.info["committed"] = True
+        await ReadYourWrites.after_request(db)
+        marks.set.assert_awaited_once_with("read-primary:7", 1, ex=settings.db_replica_sticky_seconds)
@@ -0,0 +1,169 @@
+import asyncio
+
+import pytest_asyncio
+from pytest import mark, raises
+from sqlalchemy import select, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.models import Image, PendingRemoteDelete, User, UserRole
+from app.repository.images import create_image, delete_image, get_image_by_id, get_public_ids_by_content_hash
+from app.repository.remote_deletes import enqueue_remote_deletes, claim_remote_deletes
+from app.repository.users import update_avatar
+from app.services.remote_deletes import discard_uploads_on_failure, process_remote_deletes, remove_pending_files
+from app.services.user_cache import UserCache
+
+
+@pytest_asyncio.fixture
+async def db(session):
+    """A session whose rows are rolled back, with an outbox emptied of what the route tests queued"""
+    async with session.bind.connect() as conn:
+        transaction = await conn.begin()
+        db = AsyncSession(bind=conn)
+        await db.execute(delete(PendingRemoteDelete))
+        yield db
+        await transaction.rollback()
+
+
+async def pending(db: AsyncSession) -> dict[str, tuple[int, bool]]:
+    rows = await db.execute(
+        select(PendingRemoteDelete.public_id, PendingRemoteDelete.attempts,
+               PendingRemoteDelete.next_attempt_at <= func.now())
+    )
+    return {public_id: (attempts, due) for public_id, attempts, due in rows}
+
+
+@mark.asyncio
+class TestRemoteDeletes:
+    async def test_enqueue_is_idempotent(self, db):
+        await enqueue_remote_deletes(["media/a", "media/b"], db)
+        await enqueue_remote_deletes(["media/a"], db)
+
+        assert await pending(db) == {"media/a": (0, True), "media/b": (0, True)}
+
+    async def test_claimed_rows_are_leased(self, db):
+        await enqueue_remote_deletes(["media/a", "media/b", "media/c"], db)
+
+        first = await claim_remote_deletes(2, 60, db)
+        second = await claim_remote_deletes(2, 60, db)
+
+        assert len(first) == 2 and [row.attempts for row in first] == [1, 1]
+        assert [row.public_id for row in second] == sorted({"media/a", "media/b", "media/c"}
+                                                           - {row.public_id for row in first})
+        assert await claim_remote_deletes(2, 60, db) == []
+
+    async def test_removed_files_are_dropped_and_failures_backed_off(self, db, mocker):
+        remove_images = mocker.patch("app.services.cloudinary.remove_images", return_value=["media/a"])
+        await enqueue_remote_deletes(["media/a", "media/b"], db)
+
+        assert await remove_pending_files(db) == 2
+
+        remove_images.assert_called_once()
+        assert sorted(remove_images.call_args.args[0]) == ["media/a", "media/b"]
+        assert await pending(db) == {"media/b": (1, False)}
+
+    async def test_shared_files_are_kept(self, db, mocker):
+        remove_images = mocker.patch("app.services.cloudinary.remove_images", return_value=["media/a"])
+        user = User(id=20_000, username="remote_deletes", email="remote.deletes@test.com", password="-",
+                    first_name="Remote", last_name="Deletes", role=UserRole.user)
+        db.add(Image(public_id="media/shared", description="Uploaded with the same content", user=user))
+        await enqueue_remote_deletes(["media/a", "media/shared"], db)
+
+        assert await remove_pending_files(db) == 2
+
+        remove_images.assert_called_once_with(["media/a"])
+        assert await pending(db) == {}
+
+    async def test_failed_write_queues_the_uploads(self, mocker):
+        enqueue = mocker.patch("app.repository.remote_deletes.enqueue_remote_deletes")
+        db = mocker.AsyncMock(spec=AsyncSession)
+
+        with raises(ValueError):
+            async with discard_uploads_on_failure(["media/orphan"], db):
+                raise ValueError
+
+        db.rollback.assert_awaited_once()
+        enqueue.assert_awaited_once_with(["media/orphan"], db)
+        db.commit.assert_awaited_once()
+
+    async def test_uploads_are_removed_when_they_cant_be_queued(self, mocker):
+        remove_images = mocker.patch("app.services.cloudinary.remove_images", return_value=["media/orphan"])
+        db = mocker.AsyncMock(spec=AsyncSession)
+        db.rollback.side_effect = OSError("connection lost")
+
+        with raises(ValueError):
+            async with discard_uploads_on_failure(["media/orphan"], db):
+                raise ValueError
+
+        remove_images.assert_called_once_with(["media/orphan"])
+
+    async def test_replaced_avatars_are_read_from_the_row(self, db, mocker):
+        mocker.patch.object(UserCache, 'store')
+        url = "https://res.cloudinary.com/dlwnuqx3p/image/upload/c_fill,h_250,w_250/v1/media/{}"
+        db.add(User(id=20_000, username="remote_deletes", email="remote.deletes@test.com", password="-",
+                    first_name="Remote", last_name="Deletes", role=UserRole.user,
+                    avatar="https://www.gravatar.com/avatar/remote-deletes"))
+        await db.flush()
+
+        await update_avatar(20_000, url.format("first"), db)
+        assert await pending(db) == {}
+
+        await update_avatar(20_000, url.format("second"), db)
+        user = await update_avatar(20_000, url.format("third"), db)
+
+        assert user.avatar == url.format("third")
+        assert set(await pending(db)) == {"media/first", "media/second"}
+
+    async def test_worker_survives_any_error(self, mocker, caplog):
+        remove = mocker.patch("app.services.remote_deletes.remove_pending_files",
+                              side_effect=[RuntimeError("cloudinary is down"), asyncio.CancelledError])
+
+        with raises(asyncio.CancelledError):
+            await process_remote_deletes(interval=0)
+
+        assert remove.await_count == 2
+        assert "Removing the pending Cloudinary files failed" in caplog.text
+
+    async def test_nothing_due(self, db, mocker):
+        remove_images = mocker.patch("app.services.cloudinary.remove_images")
+
+        assert await remove_pending_files(db) == 0
+        remove_images.assert_not_called()
+
+
+@mark.asyncio
+class TestSharedFileRace:
+    content_hash = "race" * 16
+
+    async def test_delete_waits_for_the_upload_reusing_the_file(self, session, mocker):
+        remove_images = mocker.patch("app.services.cloudinary.remove_images", return_value=[])
+        engine = session.bind
+        user = User(id=20_001, username="remote_deletes_race", email="remote.deletes.race@test.com", password="-",
+                    first_name="Remote", last_name="Deletes", role=UserRole.user)
+        original = Image(id=20_001, public_id="media/race", description="Original", user=user,
+                         content_hash=self.content_hash)
+        async with AsyncSession(engine) as db:
+            # Only this test's file in the outbox
+            await db.execute(delete(PendingRemoteDelete))
+            db.add(original)
+            await db.commit()
+
+        async with AsyncSession(engine) as uploader, AsyncSession(engine) as deleter:
+            # The upload finds the file, then the owner deletes the only image using it
+            stored = await get_public_ids_by_content_hash([self.content_hash], uploader)
+            deleting = asyncio.create_task(delete_image(await get_image_by_id(20_001, deleter), deleter))
+            await asyncio.sleep(0.2)
+            assert not deleting.done()
+
+            copy = await create_image(20_001, "Copy", [], stored[self.content_hash], uploader,
+                                      content_hash=self.content_hash)
+            await asyncio.wait_for(deleting, 5)
+
+        async with AsyncSession(engine) as db:
+            await remove_pending_files(db)
+            assert all("media/race" not in call.args[0] for call in remove_images.call_args_list)
+            assert await pending(db) == {}
+
+            await delete_image(await get_image_by_id(copy.id, db), db)
+            await db.execute(delete(PendingRemoteDelete))
+            await db.delete(await db.get(User, 20_001))
+            await db.commit()
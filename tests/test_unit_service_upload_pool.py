@@ -0,0 +1,39 @@
+import asyncio
+import time
+import unittest
+
+from fastapi import HTTPException, status
+
+from app.services.upload_pool import UploadPool
+
+
+class TestUploadPool(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.pool = UploadPool(max_workers=1, max_waiting=1, retry_after=7)
+        self.addCleanup(self.pool.shutdown)
+
+    async def test_run(self):
+        self.assertEqual(await self.pool.run(sum, [1, 2]), 3)
+        self.assertEqual(self.pool.stats()["completed"], 1)
+
+    async def test_rejects_when_saturated(self):
+        running = asyncio.create_task(self.pool.run(time.sleep, 0.1))
+        await asyncio.sleep(0.01)
+        waiting = asyncio.create_task(self.pool.run(time.sleep, 0))
+        await asyncio.sleep(0.01)
+
+        with self.assertRaises(HTTPException) as error:
+            await self.pool.run(time.sleep, 0)
+
+        self.assertEqual(error.exception.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(error.exception.headers, {"Retry-After": "7"})
+
+        await asyncio.gather(running, waiting)
+        stats = self.pool.stats()
+        self.assertEqual(stats["completed"], 2)
+        self.assertEqual(stats["rejected"], 1)
+        self.assertEqual(stats["waiting"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
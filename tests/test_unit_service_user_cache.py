@@ -0,0 +1,53 @@
+import unittest
+from unittest.mock import MagicMock, AsyncMock, patch
+
+from app.database.models import User, UserRole
+from app.services.principal import Principal, dump_principal
+from app.services.user_cache import UserCache
+from app.utils.cache import TTLCache
+
+
+class TestUserCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.redis = MagicMock()
+        self.redis.set = AsyncMock()
+        self.pipe = self.redis.pipeline.return_value
+        self.pipe.execute = AsyncMock()
+        patch.object(UserCache, 'redis', self.redis).start()
+        patch.object(UserCache, 'local', TTLCache(max_items=10, max_bytes=1024, ttl=60)).start()
+        self.addCleanup(patch.stopall)
+        self.user = User(id=1, role=UserRole.user, is_active=True, email_verified=True)
+
+    def test_load_keeps_local_copy(self):
+        principal = Principal.from_user(self.user)
+
+        result = UserCache.load(dump_principal(principal))
+
+        self.assertEqual(result, principal)
+        self.assertEqual(UserCache.get_local(1), principal)
+
+    def test_load_miss(self):
+        self.assertIsNone(UserCache.load(None))
+        self.assertIsNone(UserCache.load(b"not a snapshot"))
+        self.assertEqual(len(UserCache.local), 0)
+
+    async def test_fill(self):
+        principal = await UserCache.fill(self.user)
+
+        self.redis.set.assert_awaited_once_with("user:1", dump_principal(principal), ex=UserCache.ttl, nx=True)
+        self.assertEqual(UserCache.get_local(1), principal)
+
+    async def test_store_publishes_invalidation(self):
+        UserCache.local.set(1, Principal.from_user(self.user), 10)
+        self.user.role = UserRole.admin
+
+        principal = await UserCache.store(self.user)
+
+        self.pipe.set.assert_called_once_with("user:1", dump_principal(principal), ex=UserCache.ttl)
+        self.pipe.publish.assert_called_once_with(UserCache.channel, 1)
+        self.pipe.execute.assert_awaited_once()
+        self.assertEqual(UserCache.get_local(1).role, UserRole.admin)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+
+from app.utils.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = TTLCache(max_items=3, max_bytes=100, ttl=10, clock=self.clock)
+
+    def test_get_hit_and_miss(self):
+        self.cache.set("a", 1, size=10)
+
+        self.assertEqual(self.cache.get("a"), 1)
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.hits, 1)
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_expired_entry(self):
+        self.cache.set("a", 1, size=10)
+        self.cache.set("b", 2, size=10, ttl=30)
+        self.clock.now = 10
+
+        self.assertIsNone(self.cache.get("a"))
+        self.assertEqual(self.cache.get("b"), 2)
+        self.assertEqual(self.cache.size, 10)
+
+    def test_evicts_least_recently_used(self):
+        for key in "abc":
+            self.cache.set(key, key, size=10)
+        self.cache.get("a")
+        self.cache.set("d", "d", size=10)
+
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.get("a"), "a")
+        self.assertEqual(len(self.cache), 3)
+        self.assertEqual(self.cache.evictions, 1)
+
+    def test_memory_limit(self):
+        self.cache.set("a", 1, size=60)
+        self.cache.set("b", 2, size=60)
+
+        self.assertIsNone(self.cache.get("a"))
+        self.assertEqual(self.cache.size, 60)
+
+    def test_oversized_value_is_not_cached(self):
+        self.cache.set("a", 1, size=10)
+        self.cache.set("a", 2, size=101)
+
+        self.assertIsNone(self.cache.get("a"))
+        self.assertEqual(self.cache.size, 0)
+
+    def test_replace_and_pop(self):
+        self.cache.set("a", 1, size=10)
+        self.cache.set("a", 2, size=20)
+
+        self.assertEqual(self.cache.get("a"), 2)
+        self.assertEqual(self.cache.size, 20)
+
+        self.cache.pop("a")
+        self.cache.pop("missing")
+
+        self.assertEqual(self.cache.stats(), {"items": 0, "bytes": 0, "hits": 1, "misses": 0, "evictions": 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import hashlib
+import io
+import struct
+import unittest
+
+from fastapi import HTTPException, UploadFile, status
+
+from app.utils.image_info import HEADER_SIZE, ImageInfo, read_content_hash, read_image_info, sniff_image
+from config import settings
+
+
+def png(width: int, height: int) -> bytes:
+    return b'\x89PNG\r\n\x1a\n' + struct.pack('>I', 13) + b'IHDR' + struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)
+
+
+def jpeg(width: int, height: int, metadata: int = 0) -> bytes:
+    app0 = b'\xff\xe0' + struct.pack('>H', 16) + b'JFIF\x00' + bytes(9)
+    # Full APP2 segments, the way a large ICC profile is stored
+    app2 = (b'\xff\xe2' + struct.pack('>H', 0xFFFF) + bytes(0xFFFD)) * metadata
+    sof = b'\xff\xc2' + struct.pack('>HBHHB', 11, 8, height, width, 1) + bytes(3)
+    return b'\xff\xd8' + app0 + app2 + sof + b'\xff\xd9'
+
+
+class TestSniffImage(unittest.TestCase):
+    def test_png(self):
+        self.assertEqual(sniff_image(png(640, 480)), ImageInfo('png', 640, 480))
+
+    def test_jpeg(self):
+        self.assertEqual(sniff_image(jpeg(1920, 1080)), ImageInfo('jpeg', 1920, 1080))
+
+    def test_gif(self):
+        self.assertEqual(sniff_image(b'GIF89a' + struct.pack('<HH', 32, 16) + bytes(4)), ImageInfo('gif', 32, 16))
+
+    def test_webp(self):
+        vp8x = b'RIFF' + bytes(4) + b'WEBP' + b'VP8X' + bytes(8) + (99).to_bytes(3, 'little') + (49).to_bytes(3, 'little')
+        vp8l = b'RIFF' + bytes(4) + b'WEBPVP8L' + bytes(5) + ((99) | (49 << 14)).to_bytes(4, 'little')
+
+        self.assertEqual(sniff_image(vp8x), ImageInfo('webp', 100, 50))
+        self.assertEqual(sniff_image(vp8l), ImageInfo('webp', 100, 50))
+
+    def test_bmp(self):
+        info = b'BM' + bytes(12) + struct.pack('<Iii', 40, 64, -32)
+        os2 = b'BM' + bytes(12) + struct.pack('<IHH', 12, 64, 32)
+
+        self.assertEqual(sniff_image(info), ImageInfo('bmp', 64, 32))
+        self.assertEqual(sniff_image(os2), ImageInfo('bmp', 64, 32))
+
+    def test_formats_without_dimensions(self):
+        self.assertEqual(sniff_image(b'II*\x00' + bytes(4)), ImageInfo('tiff'))
+        self.assertEqual(sniff_image(b'MM\x00*' + bytes(4)), ImageInfo('tiff'))
+        self.assertEqual(sniff_image(bytes(4) + b'ftypheic' + bytes(4)), ImageInfo('heic'))
+        self.assertEqual(sniff_image(bytes(4) + b'ftypavif' + bytes(4)), ImageInfo('avif'))
+
+    def test_jpeg_start_of_frame_after_the_header(self):
+        self.assertIsNone(sniff_image(jpeg(1920, 1080, metadata=5)[:HEADER_SIZE]))
+
+    def test_not_an_image(self):
+        for header in (b'', b'image', b'%PDF-1.7', png(0, 10), jpeg(10, 10)[:20], b'RIFF' + bytes(4) + b'WAVE',
+                       bytes(4) + b'ftypisom' + bytes(4)):
+            self.assertIsNone(sniff_image(header))
+
+
+class TestReadImageInfo(unittest.IsolatedAsyncioTestCase):
+    async def test_rewinds_the_file(self):
+        file = UploadFile(io.BytesIO(png(10, 20) + bytes(100)), filename='test.png')
+
+        info = await read_image_info(file)
+
+        self.assertEqual(info, ImageInfo('png', 10, 20))
+        self.assertEqual(file.file.tell(), 0)
+
+    async def test_jpeg_with_large_metadata(self):
+        file = UploadFile(io.BytesIO(jpeg(1920, 1080, metadata=5)), filename='test.jpg')
+
+        self.assertEqual(await read_image_info(file), ImageInfo('jpeg', 1920, 1080))
+        self.assertEqual(file.file.tell(), 0)
+
+    async def test_image_without_dimensions(self):
+        file = UploadFile(io.BytesIO(bytes(4) + b'ftypheic' + bytes(300 * 1024)), filename='test.heic')
+
+        self.assertEqual(await read_image_info(file), ImageInfo('heic'))
+
+    async def test_jpeg_with_too_many_segments(self):
+        comment = b'\xff\xfe' + struct.pack('>H', 2)
+        file = UploadFile(io.BytesIO(b'\xff\xd8' + comment * (HEADER_SIZE // 4 + 1) + jpeg(10, 10)[2:]),
+                          filename='test.jpg')
+
+        with self.assertRaises(HTTPException) as context:
+            await read_image_info(file)
+
+        self.assertEqual(context.exception.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    async def test_invalid_image(self):
+        with self.assertRaises(HTTPException) as context:
+            await read_image_info(UploadFile(io.BytesIO(b'image'), filename='test.png'))
+
+        self.assertEqual(context.exception.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    async def test_too_many_bytes(self):
+        file = UploadFile(io.BytesIO(png(10, 10)), filename='test.png', size=settings.upload_max_bytes + 1)
+
+        with self.assertRaises(HTTPException) as context:
+            await read_image_info(file)
+
+        self.assertEqual(context.exception.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        self.assertEqual(context.exception.detail, "Image file is too large")
+
+    async def test_too_many_pixels(self):
+        file = UploadFile(io.BytesIO(png(settings.upload_max_dimension + 1, 10)), filename='test.png')
+
+        with self.assertRaises(HTTPException) as context:
+            await read_image_info(file)
+
+        self.assertEqual(context.exception.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        self.assertEqual(context.exception.detail, "Image is too large")
+
+
+class TestReadContentHash(unittest.IsolatedAsyncioTestCase):
+    async def test_hashes_the_whole_file_and_rewinds(self):
+        content = png(10, 20) + bytes(300 * 1024)
+        file = UploadFile(io.BytesIO(content), filename='test.png')
+        await file.read(100)
+
+        self.assertEqual(await read_content_hash(file), hashlib.sha256(content).hexdigest())
+        self.assertEqual(file.file.tell(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+from datetime import datetime
+
+from app.utils.pagination import Cursor, encode_cursor, decode_cursor
+
+
+class TestCursor(unittest.TestCase):
+    def test_round_trip(self):
+        created_at = datetime(2023, 4, 10, 18, 17, 49, 346865)
+
+        cursor = encode_cursor(created_at, 42)
+
+        self.assertNotIn('=', cursor)
+        self.assertEqual(decode_cursor(cursor), Cursor(created_at, 42))
+
+    def test_round_trip_with_rank(self):
+        created_at = datetime(2023, 4, 10, 18, 17, 49, 346865)
+
+        cursor = decode_cursor(encode_cursor(created_at, 42, 0.0607927106320858))
+
+        self.assertEqual(cursor, Cursor(created_at, 42, 0.0607927106320858))
+
+    def test_round_trip_with_mode(self):
+        created_at = datetime(2023, 4, 10, 18, 17, 49, 346865)
+
+        cursor = decode_cursor(encode_cursor(created_at, 42, 4.5, "rating"))
+
+        self.assertEqual(cursor, Cursor(created_at, 42, 4.5, "rating"))
+
+    def test_invalid_cursor(self):
+        for cursor in ("", "not a cursor", encode_cursor(datetime.now(), 1)[:-3], "WzEsMl0", "WyIyMDIzLTA0LTEwIiwxLDIsM10"):
+            with self.assertRaises(ValueError):
+                decode_cursor(cursor)
+
+
+if __name__ == '__main__':
+    unittest.main()